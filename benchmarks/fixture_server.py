@@ -0,0 +1,212 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .fixtures import SCHEDULES_PATH
+
+
+class FixtureServer:
+    """
+    A local HTTP server serving a `FixtureSite` in a background thread, standing in for
+    both Instagram and MBS.
+
+    Parameters
+    ----------
+    site : FixtureSite
+        The site to serve.
+    latency : float, default=0
+        The time (milliseconds) added to every response, to simulate network latency.
+    host : str, default="127.0.0.1"
+        The host to listen on.
+    port : int, default=0
+        The port to listen on. If 0, a free port is picked.
+
+    Attributes
+    ----------
+    site : FixtureSite
+        The site to serve.
+    latency : float
+        The time (milliseconds) added to every response.
+    request_count : int
+        The number of requests served.
+    """
+
+    def __init__(self, site, latency=0, host="127.0.0.1", port=0):
+        self.site = site
+        self.latency = latency
+        self.request_count = 0
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer((host, port), self.__create_handler())
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def url(self):
+        """
+        str : The base URL of the server.
+        """
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Start serving in a background thread.
+        """
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="fixture-server", daemon=True
+        )
+        self.__thread.start()
+
+        print(f"Serving fixtures at {self.url}")
+
+    def close(self):
+        """
+        Stop serving.
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __route(self, path, query):
+        site = self.site
+
+        if path == "/":
+            return "text/html", site.get_home_page()
+
+        if path == f"/{site.username}/saved/":
+            return "text/html", site.get_saved_page()
+
+        collection_match = re.fullmatch(rf"/{site.username}/saved/([^/]+)/\d+/", path)
+        if collection_match is not None:
+            collection_name = unquote(collection_match.group(1))
+            if collection_name in site.collections:
+                return "text/html", site.get_collection_page(collection_name)
+
+        post_match = re.fullmatch(r"/p/([^/]+)/", path)
+        if post_match is not None and post_match.group(1) in site.posts:
+            code = post_match.group(1)
+            if "__a" in query:
+                return "application/json", site.get_post_json(code, self.url)
+            return "text/html", site.get_post_page(code, self.url)
+
+        media_match = re.fullmatch(r"/media/(.+)_(\d+)(\.jpg|\.mp4)", path)
+        if media_match is not None:
+            name, width, extension = media_match.groups()
+            content_type = "image/jpeg" if extension == ".jpg" else "video/mp4"
+            return content_type, site.get_media(name, int(width), extension)
+
+        if path == "/latest/posts/scheduled_posts":
+            return "text/html", site.get_scheduled_dates_page("post")
+
+        if path == "/latest/posts/scheduled_stories":
+            return "text/html", site.get_scheduled_dates_page("story")
+
+        if path == "/latest/home":
+            return "text/html", site.get_planner_page()
+
+        return None
+
+    def respond(self, request_path):
+        """
+        Get the response to a request.
+
+        Parameters
+        ----------
+        request_path : str
+            The path and query string of the request.
+
+        Returns
+        -------
+        tuple of (str, bytes) or None
+            The content type and content of the response, or `None` if not found.
+        """
+        with self.__lock:
+            self.request_count += 1
+
+        if self.latency > 0:
+            time.sleep(self.latency / 1000)
+
+        url = urlsplit(request_path)
+        response = self.__route(url.path, parse_qs(url.query))
+        if response is None:
+            return None
+
+        content_type, content = response
+        if isinstance(content, str):
+            return f"{content_type}; charset=utf-8", content.encode()
+
+        return content_type, content
+
+    def receive(self, request_path, content):
+        """
+        Handle a request posting content, such as an item published with the MBS
+        composer.
+
+        Parameters
+        ----------
+        request_path : str
+            The path and query string of the request.
+        content : bytes
+            The content of the request.
+
+        Returns
+        -------
+        bool
+            Whether the request was handled, or `False` if not found.
+        """
+        with self.__lock:
+            self.request_count += 1
+
+        if urlsplit(request_path).path != SCHEDULES_PATH:
+            return False
+
+        scheduled_item = self.site.record_schedule(json.loads(content))
+        print(f"Recorded scheduled {scheduled_item.kind} ({scheduled_item.date})")
+
+        return True
+
+    def __create_handler(self):
+        fixture_server = self
+
+        class FixtureRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                response = fixture_server.respond(self.path)
+                if response is None:
+                    self.send_error(404)
+                    return
+
+                content_type, content = response
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_POST(self):
+                content_length = int(self.headers.get("Content-Length", 0))
+                if not fixture_server.receive(
+                    self.path, self.rfile.read(content_length)
+                ):
+                    self.send_error(404)
+                    return
+
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return FixtureRequestHandler
@@ -0,0 +1,938 @@
+import ffmpeg
+import html
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from ig_mbs_scheduler.drivers.ig import post
+from ig_mbs_scheduler.drivers.ig.constants import xpaths as ig_xpaths
+from ig_mbs_scheduler.drivers.mbs.constants import xpaths as mbs_xpaths
+from ig_mbs_scheduler.drivers.mbs.mbs_driver import SCHEDULED_DATE_FORMATS
+
+RAW_TEXT_TAGS = {"script", "style"}
+VOID_TAGS = {"img", "input"}
+# The widths of the renditions of each photo, with a 4:5 aspect ratio
+PHOTO_WIDTHS = [1440, 1080, 750, 640, 480, 320]
+# The widths of the renditions of each video, with a 9:16 aspect ratio, so videos are
+# cropped when downloaded
+VIDEO_WIDTHS = [1080, 720, 480]
+VIDEO_DURATION = 5
+ROW_HEIGHT = 120
+
+# Appends the next page of rows when scrolled to the bottom, like an infinite list
+LOAD_MORE_ROWS_SCRIPT = """
+(() => {
+    const container = document.querySelector("[data-fixture-rows]");
+    const pages = JSON.parse(document.getElementById("fixture-pages").textContent);
+    let isLoading = false;
+    window.addEventListener("scroll", () => {
+        const scrollBottom = window.innerHeight + window.scrollY;
+        if (isLoading || pages.length === 0 || scrollBottom < document.body.scrollHeight - 10) {
+            return;
+        }
+        isLoading = true;
+        setTimeout(() => {
+            container.insertAdjacentHTML("beforeend", pages.shift());
+            isLoading = false;
+        }, %d);
+    });
+})();
+"""
+# Records the item scheduled with the composer when published, and resets the composer,
+# like the MBS composer closing
+COMPOSER_SCRIPT = """
+(() => {
+    const schedulesPath = %s;
+    let kind = null;
+
+    function getFields(selector) {
+        return Array.from(document.querySelectorAll(selector));
+    }
+
+    function setPublishable(isPublishable) {
+        for (const publishDiv of getFields("[data-fixture-publish]")) {
+            publishDiv.setAttribute("aria-disabled", String(!isPublishable));
+        }
+    }
+
+    function publish() {
+        const schedule = {
+            kind: kind,
+            date: Object.fromEntries(
+                getFields("[data-fixture-date-input]").map(
+                    (input) => [input.dataset.fixtureDateInput, input.value]
+                )
+            ),
+            placement: getFields("[data-fixture-placement]").map(
+                (input) => input.getAttribute("aria-checked") === "true"
+            ),
+            caption: kind === "post"
+                ? document.querySelector("[data-fixture-caption]").innerText
+                : null,
+            fileNames: getFields("input[type=file]").flatMap(
+                (input) => Array.from(input.files, (file) => file.name)
+            ),
+        };
+
+        // Record synchronously, so the item is recorded once the click returns
+        const request = new XMLHttpRequest();
+        request.open("POST", schedulesPath, false);
+        request.setRequestHeader("Content-Type", "application/json");
+        request.send(JSON.stringify(schedule));
+
+        kind = null;
+        for (const input of getFields("[data-fixture-date-input], input[type=file]")) {
+            input.value = "";
+        }
+        for (const input of getFields("[data-fixture-placement]")) {
+            input.setAttribute("aria-checked", "false");
+        }
+        document.querySelector("[data-fixture-caption]").textContent = "";
+        setPublishable(false);
+    }
+
+    document.addEventListener("click", (event) => {
+        const kindDiv = event.target.closest("[data-fixture-kind]");
+        if (kindDiv !== null) {
+            kind = kindDiv.dataset.fixtureKind;
+        }
+
+        if (event.target.matches("[data-fixture-placement]")) {
+            const isChecked = event.target.getAttribute("aria-checked") === "true";
+            event.target.setAttribute("aria-checked", String(!isChecked));
+        }
+
+        const publishDiv = event.target.closest("[data-fixture-publish]");
+        if (publishDiv !== null && publishDiv.getAttribute("aria-disabled") !== "true") {
+            publish();
+        }
+    });
+
+    document.addEventListener("change", (event) => {
+        if (event.target.matches("input[type=file]")) {
+            setPublishable(
+                getFields("input[type=file]").some((input) => input.files.length > 0)
+            );
+        }
+    });
+})();
+"""
+# The path to which the composer posts scheduled items
+SCHEDULES_PATH = "/fixture/schedules"
+# The MBS composer's date input fields, and the format of their values
+SCHEDULE_DATE_FIELDS = [
+    ("date", mbs_xpaths.SCHEDULE_DATE_INPUT, "%d/%m/%Y"),
+    ("hour", mbs_xpaths.SCHEDULE_HOUR_INPUT, "%I"),
+    ("minute", mbs_xpaths.SCHEDULE_MINUTE_INPUT, "%M"),
+    ("period", mbs_xpaths.SCHEDULE_PERIOD_INPUT, "%p"),
+]
+
+ScheduledItem = namedtuple(
+    "ScheduledItem", ["kind", "date", "caption", "placement", "file_names"]
+)
+
+
+def get_video_height(width):
+    """
+    Get the height of a video rendition, rounded down to an even number as required by
+    H.264.
+
+    Parameters
+    ----------
+    width : int
+        The width of the rendition.
+
+    Returns
+    -------
+    int
+        The height of the rendition.
+    """
+    return width * 16 // 9 // 2 * 2
+
+
+class Element:
+    """
+    A minimal HTML element, for building fixture pages.
+
+    Parameters
+    ----------
+    tag : str
+        The tag name of the element.
+    attrs : dict, optional
+        The attributes of the element.
+    text : str, default=""
+        The text of the element, before its children.
+
+    Attributes
+    ----------
+    tag : str
+        The tag name of the element.
+    attrs : dict
+        The attributes of the element.
+    text : str
+        The text of the element, before its children.
+    children : list of Element
+        The children of the element.
+    """
+
+    def __init__(self, tag, attrs=None, text=""):
+        self.tag = tag
+        self.attrs = dict(attrs or {})
+        self.text = text
+        self.children = []
+
+    def append(self, child):
+        """
+        Append a child element.
+
+        Parameters
+        ----------
+        child : Element
+            The child element.
+
+        Returns
+        -------
+        Element
+            The child element.
+        """
+        self.children.append(child)
+        return child
+
+    def get_children(self, tag):
+        """
+        Get the children with a tag name.
+
+        Parameters
+        ----------
+        tag : str
+            The tag name of the children.
+
+        Returns
+        -------
+        list of Element
+            The children with the tag name, in order.
+        """
+        return [child for child in self.children if child.tag == tag]
+
+    def render(self):
+        """
+        Render the element as HTML.
+
+        Returns
+        -------
+        str
+            The HTML of the element.
+        """
+        attrs = "".join(
+            f' {name}="{html.escape(str(value))}"' for name, value in self.attrs.items()
+        )
+        if self.tag in VOID_TAGS:
+            return f"<{self.tag}{attrs}/>"
+
+        # Scripts and styles are raw text
+        text = self.text if self.tag in RAW_TEXT_TAGS else html.escape(self.text)
+        children = "".join(child.render() for child in self.children)
+
+        return f"<{self.tag}{attrs}>{text}{children}</{self.tag}>"
+
+
+class FixturePage:
+    """
+    A fixture page, whose elements are created from the XPaths targeted by the drivers,
+    so the page keeps matching them as they change.
+
+    Parameters
+    ----------
+    html_attrs : dict, optional
+        The attributes of the `html` element.
+
+    Attributes
+    ----------
+    root : Element
+        The `html` element.
+    body : Element
+        The `body` element.
+    """
+
+    def __init__(self, html_attrs=None):
+        self.root = Element("html", html_attrs)
+        head = self.root.append(Element("head"))
+        head.append(
+            Element(
+                "style",
+                text=f"body {{ margin: 0; }} [data-fixture-rows] > * {{ display: block; min-height: {ROW_HEIGHT}px; }}",
+            )
+        )
+        self.body = self.root.append(Element("body"))
+        self.__script_texts = []
+
+    @staticmethod
+    def __parse_steps(xpath):
+        steps = []
+        for step in re.split(r"/+", xpath):
+            if not step:
+                continue
+            tag, predicates = re.fullmatch(
+                r"(\*|[\w-]+)((?:\[[^\]]*\])*)", step
+            ).groups()
+            steps.append((tag, re.findall(r"\[([^\]]*)\]", predicates)))
+
+        return steps
+
+    @staticmethod
+    def __get_child(parent, tag, predicates):
+        tag = "div" if tag == "*" else tag
+        children = parent.get_children(tag)
+
+        for predicate in predicates:
+            if predicate.isdigit():
+                # Pad with empty siblings up to the position
+                while len(children) < int(predicate):
+                    children.append(parent.append(Element(tag)))
+                return children[int(predicate) - 1]
+
+            attribute_match = re.fullmatch(r'@([\w-]+)="([^"]*)"', predicate)
+            if attribute_match is not None:
+                name, value = attribute_match.groups()
+                for child in children:
+                    if child.attrs.get(name) == value:
+                        return child
+                return parent.append(Element(tag, {name: value}))
+
+            if predicate == "last()" and len(children) > 0:
+                return children[-1]
+
+        # Other predicates (such as "*", "not(...)" or "contains(...)") match any element
+        return children[0] if len(children) > 0 else parent.append(Element(tag))
+
+    @staticmethod
+    def __get_position_modulo(predicates):
+        for predicate in predicates:
+            position_match = re.fullmatch(r"position\(\) mod (\d+) = (\d+)", predicate)
+            if position_match is not None:
+                return tuple(int(group) for group in position_match.groups())
+
+        return None
+
+    def __get_steps_parent(self, steps):
+        tag, predicates = steps[0]
+
+        if tag == "html":
+            parent, steps = self.root, steps[1:]
+            if steps and steps[0][0] == "body":
+                parent, steps = self.body, steps[1:]
+        elif steps[1:2] and steps[1][0] == "body":
+            # An ID of the `html` element (e.g. `//*[@id="facebook"]/body`)
+            for predicate in predicates:
+                name, value = re.fullmatch(r'@([\w-]+)="([^"]*)"', predicate).groups()
+                self.root.attrs[name] = value
+            parent, steps = self.body, steps[2:]
+        else:
+            # An ID of an element of the body (e.g. `//*[@id="react-root"]`)
+            parent = self.__get_child(self.body, tag, predicates)
+            steps = steps[1:]
+
+        for tag, predicates in steps:
+            parent = self.__get_child(parent, tag, predicates)
+
+        return parent
+
+    def get(self, xpath):
+        """
+        Get the element targeted by an XPath, creating it and its ancestors if needed.
+
+        Parameters
+        ----------
+        xpath : str
+            The XPath of the element. Unions are not supported.
+
+        Returns
+        -------
+        Element
+            The element.
+        """
+        return self.__get_steps_parent(self.__parse_steps(xpath))
+
+    def add_rows(self, xpath, rows, page_size=None, delay=0):
+        """
+        Add a list of rows targeted by an XPath, loaded page by page as the page is
+        scrolled to the bottom.
+
+        The repeated step of the XPath is the one with a `position() mod` predicate, or
+        the last one.
+
+        Parameters
+        ----------
+        xpath : str
+            The XPath of the rows.
+        rows : list of callable
+            Called with the element targeted by the XPath for each row, to fill it.
+        page_size : int, optional
+            The number of rows per page. If not specified, all rows are loaded at once.
+        delay : int, default=0
+            The time (milliseconds) to load each page after the first one.
+        """
+        steps = self.__parse_steps(xpath)
+        repeated_step_index = next(
+            (
+                i
+                for i, (_, predicates) in enumerate(steps)
+                if self.__get_position_modulo(predicates) is not None
+            ),
+            len(steps) - 1,
+        )
+        container = self.__get_steps_parent(steps[:repeated_step_index])
+        container.attrs["data-fixture-rows"] = ""
+
+        repeated_tag, repeated_predicates = steps[repeated_step_index]
+        repeated_tag = "div" if repeated_tag == "*" else repeated_tag
+        position_modulo = self.__get_position_modulo(repeated_predicates)
+        sibling_count = len(container.get_children(repeated_tag))
+
+        page_size = page_size or len(rows) or 1
+        pages = []
+        for i, fill_row in enumerate(rows):
+            row_elements = []
+            # Pad with empty siblings up to a matching position
+            if position_modulo is not None:
+                modulo, remainder = position_modulo
+                while (sibling_count + 1) % modulo != remainder:
+                    row_elements.append(Element(repeated_tag))
+                    sibling_count += 1
+
+            row_element = Element(repeated_tag)
+            leaf_element = row_element
+            for tag, predicates in steps[repeated_step_index + 1 :]:
+                leaf_element = self.__get_child(leaf_element, tag, predicates)
+            fill_row(leaf_element)
+            row_elements.append(row_element)
+            sibling_count += 1
+
+            if i < page_size:
+                container.children += row_elements
+            else:
+                if (i - page_size) % page_size == 0:
+                    pages.append("")
+                pages[-1] += "".join(element.render() for element in row_elements)
+
+        # Escape closing tags within the script
+        pages_json = json.dumps(pages).replace("</", "<\\/")
+        self.body.append(
+            Element(
+                "script",
+                {"type": "application/json", "id": "fixture-pages"},
+                pages_json,
+            )
+        )
+        self.add_script(LOAD_MORE_ROWS_SCRIPT % delay)
+
+    def add_script(self, script_text):
+        """
+        Add a script, run once the page is loaded.
+
+        Parameters
+        ----------
+        script_text : str
+            The JavaScript of the script.
+        """
+        self.__script_texts.append(script_text)
+
+    def render(self):
+        """
+        Render the page as HTML.
+
+        Returns
+        -------
+        str
+            The HTML of the page.
+        """
+        for script_text in self.__script_texts:
+            self.body.append(Element("script", text=script_text))
+        self.__script_texts = []
+
+        return "<!DOCTYPE html>" + self.root.render()
+
+
+class FixtureSite:
+    """
+    A generated Instagram and MBS site, with saved collections of posts, lists of
+    scheduled posts and stories, and an MBS composer scheduling more of them, served by
+    a `FixtureServer`.
+
+    Pages are shaped like the pages targeted by the XPaths of the drivers, and post
+    metadata like the JSON served by Instagram.
+
+    Parameters
+    ----------
+    username : str, default="benchmark"
+        The Instagram username of the saved collections.
+    asset_id : str, default="1"
+        The MBS asset ID of the scheduled posts and stories.
+    collection_count : int, default=3
+        The number of saved collections.
+    items_per_collection : int, default=24
+        The number of saved posts per collection.
+    scheduled_count : int, default=60
+        The number of scheduled posts, and of scheduled stories.
+    page_size : int, default=12
+        The number of collection items or scheduled dates loaded per scroll.
+    scroll_delay : int, default=0
+        The time (milliseconds) to load each page of collection items or scheduled
+        dates after the first one.
+    video_ratio : float, default=0.2
+        The fraction of posts, and of carousel items, which are videos.
+    seed : int, default=0
+        The seed for the generated posts.
+
+    Attributes
+    ----------
+    username : str
+        The Instagram username of the saved collections.
+    asset_id : str
+        The MBS asset ID of the scheduled posts and stories.
+    collections : dict
+        The codes of the saved posts, by collection name.
+    posts : dict
+        The metadata of each saved post, by post code.
+    scheduled_items : list of ScheduledItem
+        The items scheduled with the composer, which are also listed as scheduled.
+    """
+
+    def __init__(
+        self,
+        username="benchmark",
+        asset_id="1",
+        collection_count=3,
+        items_per_collection=24,
+        scheduled_count=60,
+        page_size=12,
+        scroll_delay=0,
+        video_ratio=0.2,
+        seed=0,
+    ):
+        self.username = username
+        self.asset_id = asset_id
+        self.__scheduled_count = scheduled_count
+        self.__page_size = page_size
+        self.__scroll_delay = scroll_delay
+        self.__video_ratio = video_ratio
+        self.__random = random.Random(seed)
+        self.__media = {}
+        self.__media_lock = threading.Lock()
+        self.scheduled_items = []
+        self.__scheduled_items_lock = threading.Lock()
+
+        self.collections = {}
+        self.posts = {}
+        for i in range(collection_count):
+            collection_name = f"n,y,Benchmark {i}"
+            self.collections[collection_name] = []
+            for j in range(items_per_collection):
+                code = f"B{i:03d}{j:05d}"
+                self.collections[collection_name].append(code)
+                self.posts[code] = self.__create_post_data(code)
+
+    def __create_photo_data(self, name):
+        return {
+            "media_type": post.MEDIA_TYPE_PHOTO,
+            "image_versions2": {
+                "candidates": [
+                    {
+                        "url": f"/media/{name}_{width}.jpg",
+                        "width": width,
+                        "height": width * 5 // 4,
+                    }
+                    for width in PHOTO_WIDTHS
+                ]
+            },
+        }
+
+    def __create_video_data(self, name):
+        return {
+            "media_type": post.MEDIA_TYPE_VIDEO,
+            "video_versions": [
+                {
+                    "url": f"/media/{name}_{width}.mp4",
+                    "width": width,
+                    "height": get_video_height(width),
+                }
+                for width in VIDEO_WIDTHS
+            ],
+        }
+
+    def __create_media_data(self, name):
+        if self.__random.random() < self.__video_ratio:
+            return self.__create_video_data(name)
+
+        return self.__create_photo_data(name)
+
+    def __create_post_data(self, code):
+        if self.__random.random() < 0.3:
+            post_data = {
+                "media_type": post.MEDIA_TYPE_CAROUSEL,
+                "carousel_media": [
+                    self.__create_media_data(f"{code}_{i}")
+                    for i in range(self.__random.randint(2, 4))
+                ],
+            }
+        else:
+            post_data = self.__create_media_data(code)
+
+        post_data["code"] = code
+        post_data["caption"] = {"text": f"Benchmark post {code} #benchmark"}
+        post_data["user"] = {"username": f"user{self.__random.randint(0, 99)}"}
+
+        return post_data
+
+    def __absolutize_media_urls(self, post_data, base_url):
+        post_data = json.loads(json.dumps(post_data))
+        for media_data in post_data.get("carousel_media", [post_data]):
+            if media_data["media_type"] == post.MEDIA_TYPE_VIDEO:
+                candidates = media_data["video_versions"]
+            else:
+                candidates = media_data["image_versions2"]["candidates"]
+            for candidate in candidates:
+                candidate["url"] = base_url + candidate["url"]
+
+        return post_data
+
+    def __get_collection_path(self, collection_name):
+        i = list(self.collections).index(collection_name)
+        return f"/{self.username}/saved/{quote(collection_name, safe='')}/{17900000000 + i}/"
+
+    def get_saved_page(self):
+        """
+        Get the saved page, listing the saved collections.
+
+        Returns
+        -------
+        str
+            The HTML of the page.
+        """
+        page = FixturePage()
+
+        def fill_collection_div(collection_name):
+            def fill(collection_div):
+                collection_div.attrs["aria-label"] = collection_name
+                collection_div.attrs["onclick"] = (
+                    f"location.href = {json.dumps(self.__get_collection_path(collection_name))};"
+                )
+                collection_div.text = collection_name
+                # Collections with items have a grid of cover thumbnails
+                cover_div = collection_div.append(Element("div"))
+                for _ in range(4 if self.collections[collection_name] else 1):
+                    cover_div.append(Element("div"))
+
+            return fill
+
+        page.add_rows(
+            ig_xpaths.COLLECTION_DIVS,
+            [
+                fill_collection_div(collection_name)
+                for collection_name in self.collections
+            ],
+        )
+
+        return page.render()
+
+    def get_collection_page(self, collection_name):
+        """
+        Get the page of a saved collection, listing its saved posts.
+
+        Parameters
+        ----------
+        collection_name : str
+            The name of the collection.
+
+        Returns
+        -------
+        str
+            The HTML of the page.
+        """
+        page = FixturePage()
+        page.get(ig_xpaths.COLLECTION_OPTIONS_BUTTON).text = "Options"
+
+        def fill_link(code):
+            def fill(link):
+                link.attrs["href"] = f"/p/{code}/"
+
+            return fill
+
+        page.add_rows(
+            ig_xpaths.COLLECTION_ITEM_LINKS,
+            [fill_link(code) for code in self.collections[collection_name]],
+            self.__page_size,
+            self.__scroll_delay,
+        )
+
+        return page.render()
+
+    def get_post_page(self, code, base_url):
+        """
+        Get the page of a post, with its metadata passed to
+        `window.__additionalDataLoaded`.
+
+        Parameters
+        ----------
+        code : str
+            The code of the post.
+        base_url : str
+            The base URL of media.
+
+        Returns
+        -------
+        str
+            The HTML of the page.
+        """
+        page = FixturePage()
+        post_data = self.__absolutize_media_urls(self.posts[code], base_url)
+
+        page.get(ig_xpaths.POST_USER_LINK).text = post_data["user"]["username"]
+        page.get(ig_xpaths.POST_CAPTION_SPAN).text = post_data["caption"]["text"]
+        page.get("/html/body/script[12]").text = (
+            f"window.__additionalDataLoaded('/p/{code}/',"
+            + json.dumps({"items": [post_data]}).replace("</", "<\\/")
+            + ");"
+        )
+
+        return page.render()
+
+    def get_post_json(self, code, base_url):
+        """
+        Get the metadata of a post, as served by Instagram's JSON endpoint.
+
+        Parameters
+        ----------
+        code : str
+            The code of the post.
+        base_url : str
+            The base URL of media.
+
+        Returns
+        -------
+        str
+            The JSON of the post metadata.
+        """
+        return json.dumps(
+            {"items": [self.__absolutize_media_urls(self.posts[code], base_url)]}
+        )
+
+    @staticmethod
+    def __encode_media(extension, width):
+        if extension == ".jpg":
+            size = f"{width}x{width * 5 // 4}"
+            output_options = dict(vframes=1)
+        else:
+            size = f"{width}x{get_video_height(width)}"
+            output_options = dict(
+                t=VIDEO_DURATION,
+                vcodec="libx264",
+                pix_fmt="yuv420p",
+                acodec="aac",
+                movflags="+faststart",
+            )
+
+        video = ffmpeg.input(f"testsrc2=size={size}:rate=30", f="lavfi")
+        streams = [video]
+        if extension == ".mp4":
+            streams.append(ffmpeg.input("sine", f="lavfi"))
+
+        with tempfile.TemporaryDirectory() as media_dir_path:
+            media_file_path = os.path.join(media_dir_path, f"media{extension}")
+            ffmpeg.output(*streams, media_file_path, **output_options).run(quiet=True)
+            with open(media_file_path, "rb") as media_file:
+                return media_file.read()
+
+    def get_media(self, name, width, extension=".jpg"):
+        """
+        Get the content of a photo or video rendition, encoded with `ffmpeg` from a
+        test pattern. All media of the same kind and width share their content.
+
+        Parameters
+        ----------
+        name : str
+            The name of the photo or video.
+        width : int
+            The width of the rendition.
+        extension : {".jpg", ".mp4"}, default=".jpg"
+            The file extension of the rendition.
+
+        Returns
+        -------
+        bytes
+            The content of the rendition.
+        """
+        key = (extension, width)
+        with self.__media_lock:
+            if key not in self.__media:
+                self.__media[key] = self.__encode_media(extension, width)
+
+            return self.__media[key]
+
+    def get_scheduled_dates_page(self, kind):
+        """
+        Get the page listing the dates of scheduled posts or stories, latest first.
+
+        Parameters
+        ----------
+        kind : {"post", "story"}
+            The kind of the scheduled items.
+
+        Returns
+        -------
+        str
+            The HTML of the page.
+        """
+        page = FixturePage({"id": "facebook"})
+
+        start_date = datetime(2030, 1, 1, 9)
+        scheduled_dates = [
+            start_date + timedelta(hours=4 * i) for i in range(self.__scheduled_count)
+        ]
+        with self.__scheduled_items_lock:
+            scheduled_dates += [
+                scheduled_item.date
+                for scheduled_item in self.scheduled_items
+                if scheduled_item.kind == kind
+            ]
+        scheduled_dates.sort()
+
+        def fill_date_span(scheduled_date):
+            def fill(date_span):
+                date_span.text = scheduled_date.strftime(SCHEDULED_DATE_FORMATS[0])
+
+            return fill
+
+        page.add_rows(
+            (
+                mbs_xpaths.SCHEDULED_POST_DATE_SPANS
+                if kind == "post"
+                else mbs_xpaths.SCHEDULED_STORY_DATE_SPANS
+            ),
+            [
+                fill_date_span(scheduled_date)
+                for scheduled_date in reversed(scheduled_dates)
+            ],
+            self.__page_size,
+            self.__scroll_delay,
+        )
+
+        return page.render()
+
+    def get_planner_page(self):
+        """
+        Get the MBS planner page, with the composer of posts and stories. Items
+        published with the composer are recorded with `record_schedule`.
+
+        Returns
+        -------
+        str
+            The HTML of the page.
+        """
+        page = FixturePage({"id": "facebook"})
+
+        schedule_post_div = page.get(mbs_xpaths.PLANNER_SCHEDULE_POST_DIV)
+        schedule_post_div.attrs["data-fixture-kind"] = "post"
+        schedule_post_div.text = "Create post"
+        page.get(mbs_xpaths.PLANNER_DROPDOWN_DIV).text = "More"
+        schedule_story_div = page.get(mbs_xpaths.PLANNER_SCHEDULE_STORY_DIV)
+        schedule_story_div.attrs["data-fixture-kind"] = "story"
+        schedule_story_div.text = "Create story"
+
+        for name, xpath, _ in SCHEDULE_DATE_FIELDS:
+            page.get(xpath).attrs.update(
+                {"type": "text", "data-fixture-date-input": name}
+            )
+        page.get(mbs_xpaths.SCHEDULE_SAVE_BUTTON).text = "Save"
+
+        # The Facebook and Instagram placements
+        placement_parent_xpath = mbs_xpaths.SCHEDULE_PLACEMENT_INPUTS.rsplit("/", 1)[0]
+        placement_parent = page.get(placement_parent_xpath)
+        for _ in range(2):
+            placement_parent.append(
+                Element(
+                    "input",
+                    {
+                        "type": "checkbox",
+                        "aria-checked": "false",
+                        "data-fixture-placement": "",
+                    },
+                )
+            )
+
+        caption_div = page.get(mbs_xpaths.SCHEDULE_CAPTION_DIV)
+        caption_div.attrs.update(
+            {"contenteditable": "true", "data-fixture-caption": ""}
+        )
+
+        page.get(mbs_xpaths.SCHEDULE_ADD_PHOTO_LINK).text = "Add photo"
+        page.get(mbs_xpaths.SCHEDULE_ADD_VIDEO_LINK).text = "Add video"
+        page.get(mbs_xpaths.SCHEDULE_UPLOAD_FROM_DESKTOP).text = "Upload from desktop"
+        page.get(mbs_xpaths.SCHEDULE_ADD_MEDIA_DIV).text = "Add photo/video"
+        for accept in ("image/*", "video/*"):
+            page.body.append(
+                Element("input", {"type": "file", "accept": accept, "multiple": ""})
+            )
+
+        # Publishing is disabled until media is chosen
+        page.get(mbs_xpaths.SCHEDULE_PUBLISH_DIV).text = "Schedule"
+        publish_div_xpath = mbs_xpaths.SCHEDULE_PUBLISH_DIV.rsplit("/span/", 1)[0]
+        page.get(publish_div_xpath).attrs.update(
+            {"aria-disabled": "true", "data-fixture-publish": ""}
+        )
+
+        page.add_script(COMPOSER_SCRIPT % json.dumps(SCHEDULES_PATH))
+
+        return page.render()
+
+    def record_schedule(self, schedule):
+        """
+        Record an item published with the composer of the planner page.
+
+        Parameters
+        ----------
+        schedule : dict
+            The item, as posted by the composer: its kind, the values of the date
+            inputs by field name, the placements, the caption and the names of the
+            chosen files.
+
+        Returns
+        -------
+        ScheduledItem
+            The recorded item.
+        """
+        date_text = " ".join(
+            schedule["date"][name] for name, _, _ in SCHEDULE_DATE_FIELDS
+        )
+        date_format = " ".join(
+            date_format for _, _, date_format in SCHEDULE_DATE_FIELDS
+        )
+        scheduled_item = ScheduledItem(
+            schedule["kind"],
+            datetime.strptime(date_text, date_format),
+            schedule["caption"],
+            tuple(schedule["placement"]),
+            tuple(schedule["fileNames"]),
+        )
+
+        with self.__scheduled_items_lock:
+            self.scheduled_items.append(scheduled_item)
+
+        return scheduled_item
+
+    def get_home_page(self):
+        """
+        Get a blank home page, for reading the cookies of the site.
+
+        Returns
+        -------
+        str
+            The HTML of the page.
+        """
+        return FixturePage().render()
@@ -0,0 +1,387 @@
+import click
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from ig_mbs_scheduler import metrics, preprocess, utils
+from ig_mbs_scheduler.drivers.ig.ig_driver import IGWebDriver
+from ig_mbs_scheduler.drivers.mbs.mbs_driver import MBSWebDriver
+
+from .fixture_server import FixtureServer
+from .fixtures import FixtureSite
+
+CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+
+# Stages timed by the benchmark, on top of the operations timed by the scheduler
+STAGE_COLLECTIONS = "benchmark.collections"
+STAGE_ITEM = "benchmark.item"
+STAGE_PREPROCESS = "benchmark.preprocess"
+STAGE_SCHEDULE = "benchmark.schedule"
+STAGE_SCHEDULED_DATES = "benchmark.scheduled_dates"
+
+
+def run_benchmark(
+    site,
+    latency=0,
+    timeout=2,
+    metadata_backend="browser",
+    download_concurrency=1,
+    target_width=1080,
+    browser_binary=None,
+    headless=True,
+    schedule_count=10,
+):
+    """
+    Drive the IG and MBS web drivers against a local fixture site, and time each stage.
+
+    The browsers run on scratch profiles within a temporary profile root, so the
+    profiles of the scheduler (and the cookies exported to them) are never touched.
+
+    Parameters
+    ----------
+    site : FixtureSite
+        The fixture site to serve.
+    latency : float, default=0
+        The time (milliseconds) added to every response of the fixture server.
+    timeout : int, default=2
+        The maximum duration to wait for elements to load, which also bounds the wait
+        for more items at the end of each scrolled list.
+    metadata_backend : {"browser", "http"}, default="browser"
+        How the IG driver gets the metadata of posts.
+    download_concurrency : int, default=1
+        The maximum number of carousel items to download and preprocess concurrently.
+    target_width : int, default=1080
+        The target width (pixels) of downloaded media.
+    browser_binary : str, optional
+        The path of the Chromium based browser binary.
+    headless : bool, default=True
+        Whether to run the browsers without a window.
+    schedule_count : int, default=10
+        The maximum number of downloaded items to schedule through the MBS composer,
+        alternately as posts and stories.
+
+    Returns
+    -------
+    dict
+        The report of the run: the number of items, the number of items scheduled, the
+        duration (seconds), the items per minute, the number of requests to the fixture
+        server, and the latency summary of each stage and operation, by name.
+    """
+    metrics.REGISTRY.reset()
+
+    with tempfile.TemporaryDirectory() as profile_root, FixtureServer(
+        site, latency
+    ) as server, IGWebDriver(
+        site.username,
+        timeout,
+        metadata_backend=metadata_backend,
+        base_url=server.url,
+        browser_binary=browser_binary,
+        headless=headless,
+        scratch_profile=True,
+        profile_root=profile_root,
+    ) as ig_driver, MBSWebDriver(
+        site.username,
+        site.asset_id,
+        timeout=timeout,
+        base_url=server.url,
+        browser_binary=browser_binary,
+        headless=headless,
+        scratch_profile=True,
+        profile_root=profile_root,
+    ) as mbs_driver, tempfile.TemporaryDirectory() as media_dir_path:
+        start_time = time.perf_counter()
+
+        with metrics.time_operation(STAGE_COLLECTIONS):
+            collection_item_urls = [
+                collection_item_url
+                for collection_name in ig_driver.get_saved_collection_names()
+                for collection_item_url in ig_driver.iter_collection_item_urls(
+                    collection_name
+                )
+            ]
+
+        downloaded_items = []
+        for i, collection_item_url in enumerate(collection_item_urls):
+            with metrics.time_operation(STAGE_ITEM):
+                post = ig_driver.get_post(collection_item_url)
+
+                item_media_dir_path = os.path.join(media_dir_path, str(i))
+                os.makedirs(item_media_dir_path)
+                utils.download_media(
+                    [selected.url for selected, _ in post.select_media(target_width)],
+                    item_media_dir_path,
+                    download_concurrency,
+                )
+
+                with metrics.time_operation(STAGE_PREPROCESS):
+                    preprocess.preprocess_media(
+                        item_media_dir_path, download_concurrency
+                    )
+
+                downloaded_items.append((post, item_media_dir_path))
+
+        # Schedule after the dates already in the fixture, so they are read back last
+        first_schedule_date = datetime(2031, 1, 1, 9)
+        for i, (post, item_media_dir_path) in enumerate(
+            downloaded_items[:schedule_count]
+        ):
+            with metrics.time_operation(STAGE_SCHEDULE):
+                schedule_date = first_schedule_date + timedelta(hours=i)
+                if i % 2 == 0:
+                    mbs_driver.schedule_post(
+                        schedule_date, item_media_dir_path, post.caption or ""
+                    )
+                else:
+                    mbs_driver.schedule_story(schedule_date, item_media_dir_path)
+
+        with metrics.time_operation(STAGE_SCHEDULED_DATES):
+            mbs_driver.get_scheduled_post_dates()
+            mbs_driver.get_scheduled_story_dates()
+
+        duration = time.perf_counter() - start_time
+        request_count = server.request_count
+
+    return {
+        "item_count": len(collection_item_urls),
+        "schedule_count": len(site.scheduled_items),
+        "duration": duration,
+        "items_per_minute": len(collection_item_urls) / duration * 60,
+        "request_count": request_count,
+        "stages": metrics.REGISTRY.snapshot(),
+    }
+
+
+def compare_reports(report, baseline, tolerance):
+    """
+    Compare a benchmark report with a baseline report.
+
+    Parameters
+    ----------
+    report : dict
+        The report, as returned by `run_benchmark`.
+    baseline : dict
+        The baseline report.
+    tolerance : float
+        The allowed relative slowdown, as a fraction of the baseline.
+
+    Returns
+    -------
+    list of str
+        A description of each regression: a stage whose median latency, or a run whose
+        items per minute, is worse than the baseline by more than `tolerance`.
+    """
+    regressions = []
+
+    for name, stage in report["stages"].items():
+        baseline_stage = baseline["stages"].get(name)
+        if baseline_stage is None:
+            continue
+        if stage["p50"] > baseline_stage["p50"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {stage['p50'] * 1000:.1f} ms (baseline {baseline_stage['p50'] * 1000:.1f} ms)"
+            )
+
+    if report["items_per_minute"] < baseline["items_per_minute"] * (1 - tolerance):
+        regressions.append(
+            f"items/min: {report['items_per_minute']:.1f} (baseline {baseline['items_per_minute']:.1f})"
+        )
+
+    return regressions
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option(
+    "--collections",
+    type=click.IntRange(1),
+    default=3,
+    show_default=True,
+    help="Number of saved collections.",
+)
+@click.option(
+    "--items",
+    type=click.IntRange(1),
+    default=24,
+    show_default=True,
+    help="Number of saved posts per collection.",
+)
+@click.option(
+    "--scheduled",
+    type=click.IntRange(0),
+    default=60,
+    show_default=True,
+    help="Number of scheduled posts, and of scheduled stories.",
+)
+@click.option(
+    "--schedule",
+    type=click.IntRange(0),
+    default=10,
+    show_default=True,
+    help="Number of downloaded items to schedule, alternately as posts and stories.",
+)
+@click.option(
+    "--page-size",
+    type=click.IntRange(1),
+    default=12,
+    show_default=True,
+    help="Number of collection items or scheduled dates loaded per scroll.",
+)
+@click.option(
+    "--scroll-delay",
+    type=click.IntRange(0),
+    default=100,
+    show_default=True,
+    help="Time (milliseconds) to load each page of collection items or scheduled dates after the first one.",
+)
+@click.option(
+    "--video-ratio",
+    type=click.FloatRange(0, 1),
+    default=0.2,
+    show_default=True,
+    help="Fraction of posts, and of carousel items, which are videos.",
+)
+@click.option(
+    "--latency",
+    type=click.FloatRange(0),
+    default=20,
+    show_default=True,
+    help="Time (milliseconds) added to every response of the fixture server, to simulate network latency.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Seed for the generated posts.",
+)
+@click.option(
+    "--timeout",
+    "-t",
+    type=click.IntRange(1),
+    default=2,
+    show_default=True,
+    help="Maximum duration (seconds) to wait for elements to load.",
+)
+@click.option(
+    "--metadata-backend",
+    type=click.Choice(["browser", "http"]),
+    default="browser",
+    show_default=True,
+    help="How to get post metadata.",
+)
+@click.option(
+    "--download-concurrency",
+    "-dc",
+    type=click.IntRange(1),
+    default=1,
+    show_default=True,
+    help="Maximum number of carousel items to download concurrently.",
+)
+@click.option(
+    "--target-width",
+    type=click.IntRange(0),
+    default=1080,
+    show_default=True,
+    help="Target width (pixels) of downloaded media. Pass 0 to always download the largest rendition.",
+)
+@click.option(
+    "--browser-binary",
+    help="Path of the Chromium based browser binary to run.",
+)
+@click.option(
+    "--headless/--no-headless",
+    default=True,
+    show_default=True,
+    help="Run the browsers without a window.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("w"),
+    help="File to write the JSON report to, for example to store it as a baseline.",
+)
+@click.option(
+    "--baseline",
+    type=click.File("r"),
+    help="JSON report of a previous run, to compare against. Exits with status 1 on regression.",
+)
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(0),
+    default=0.2,
+    show_default=True,
+    help="Allowed relative slowdown compared to the baseline.",
+)
+def cli(
+    collections,
+    items,
+    scheduled,
+    schedule,
+    page_size,
+    scroll_delay,
+    video_ratio,
+    latency,
+    seed,
+    timeout,
+    metadata_backend,
+    download_concurrency,
+    target_width,
+    browser_binary,
+    headless,
+    output,
+    baseline,
+    tolerance,
+):
+    """
+    Benchmark the scheduler's IG and MBS web drivers against local fixture sites, and
+    report the latency of each stage and the items scraped and downloaded per minute.
+    """
+    site = FixtureSite(
+        collection_count=collections,
+        items_per_collection=items,
+        scheduled_count=scheduled,
+        page_size=page_size,
+        scroll_delay=scroll_delay,
+        video_ratio=video_ratio,
+        seed=seed,
+    )
+    report = run_benchmark(
+        site,
+        latency,
+        timeout,
+        metadata_backend,
+        download_concurrency,
+        target_width,
+        browser_binary,
+        headless,
+        schedule,
+    )
+
+    for name, stage in report["stages"].items():
+        print(
+            f"{name}: count {stage['count']}, p50 {stage['p50'] * 1000:.1f} ms, p95 {stage['p95'] * 1000:.1f} ms, errors {stage['errors']}"
+        )
+    print(
+        f"Processed {report['item_count']} item(s) in {report['duration']:.2f} seconds ({report['items_per_minute']:.1f} items/min, {report['request_count']} requests)"
+    )
+    print(f"Scheduled {report['schedule_count']} item(s)")
+
+    if output is not None:
+        json.dump(report, output, indent=2)
+        output.write("\n")
+
+    if baseline is not None:
+        regressions = compare_reports(report, json.load(baseline), tolerance)
+        if len(regressions) > 0:
+            print(f"Found {len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  {regression}")
+            click.get_current_context().exit(1)
+
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,57 +1,436 @@
 import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit
 from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+
+from ig_mbs_scheduler import metrics
+from ig_mbs_scheduler.drivers.session_pool import SessionPool
+
+BROWSER_BINARY_PATHS = [
+    "/Applications/Brave Browser.app/Contents/MacOS/Brave Browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    "/Applications/Chromium.app/Contents/MacOS/Chromium",
+]
+BROWSER_BINARY_NAMES = [
+    "brave-browser",
+    "brave",
+    "chromium",
+    "chromium-browser",
+    "google-chrome",
+    "google-chrome-stable",
+]
+
+GET_JS_HEAP_SIZE_SCRIPT = (
+    "return performance.memory ? performance.memory.usedJSHeapSize : null;"
+)
+# Gets the scroll position of the scrolling container of the last matched element, as
+# [scrollTop, scrollHeight, clientHeight]
+GET_SCROLL_STATE_SCRIPT = """
+const elements = document.evaluate(
+    arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+let container = document.scrollingElement;
+if (elements.snapshotLength > 0) {
+    let element = elements.snapshotItem(elements.snapshotLength - 1).parentElement;
+    while (element !== null && element !== document.body) {
+        const overflowY = getComputedStyle(element).overflowY;
+        if (
+            element.scrollHeight > element.clientHeight
+            && (overflowY === "auto" || overflowY === "scroll")
+        ) {
+            container = element;
+            break;
+        }
+        element = element.parentElement;
+    }
+}
+return [container.scrollTop, container.scrollHeight, container.clientHeight];
+"""
+# The duration (seconds) a list scrolled to its bottom must stop growing for, before
+# it is considered fully loaded
+SCROLL_SETTLE_TIME = 1
+
+Session = namedtuple("Session", ["driver", "scratch_session_dir"])
+
+# Profile contents that are safe to leave out of a scratch copy
+SCRATCH_PROFILE_IGNORE_PATTERNS = [
+    "Singleton*",
+    "Cache",
+    "Code Cache",
+    "GPUCache",
+    "GrShaderCache",
+    "ShaderCache",
+    "CacheStorage",
+    "ScriptCache",
+]
+
+
+def find_browser_binary():
+    """
+    Find a Chromium based browser binary.
+
+    The `IG_MBS_SCHEDULER_BROWSER` environment variable takes precedence, followed by
+    the known macOS application paths, and the known binary names on the `PATH`.
+
+    Returns
+    -------
+    str or None
+        The path of the browser binary, or `None` if none was found.
+    """
+    browser_binary = os.environ.get("IG_MBS_SCHEDULER_BROWSER")
+    if browser_binary:
+        return browser_binary
+
+    for browser_binary_path in BROWSER_BINARY_PATHS:
+        if os.path.exists(browser_binary_path):
+            return browser_binary_path
+
+    for browser_binary_name in BROWSER_BINARY_NAMES:
+        browser_binary_path = shutil.which(browser_binary_name)
+        if browser_binary_path is not None:
+            return browser_binary_path
+
+    return None
+
+
+def normalize_url(url):
+    """
+    Normalize a URL for comparison, ignoring the case of the scheme and host, trailing
+    slashes and fragments.
+
+    Parameters
+    ----------
+    url : str
+        The URL to normalize.
+
+    Returns
+    -------
+    str
+        The normalized URL.
+    """
+    scheme, netloc, path, query, _ = urlsplit(url)
+
+    return urlunsplit(
+        (scheme.lower(), netloc.lower(), path.rstrip("/") or "/", query, "")
+    )
 
 
 class BaseWebDriver:
     """
     An extensible, context based `selenium` web driver class.
 
+    The browser is started lazily, on first use. Its session can be recycled after a
+    number of page loads, or when it fails a health check (unresponsive, or using too
+    much memory).
+
     Parameters
     ----------
     profile : str
         The browser profile path within the application directory.
     timeout : int
         The maximum duration to wait for elements to load.
+    browser_binary : str, optional
+        The path of the Chromium based browser binary. If not specified, the binary is
+        discovered with `find_browser_binary`.
+    headless : bool, default=False
+        Whether to run the browser without a window.
+    scratch_profile : bool, default=False
+        Whether to run the browser on a scratch copy of the profile (on tmpfs, where
+        available), for faster startup. Changes to the scratch copy are discarded.
+    max_operations : int, optional
+        The number of page loads after which the browser session is recycled.
+    max_memory : int, optional
+        The JavaScript heap size (MB) above which the browser session is considered
+        unhealthy.
+    health_check_interval : int, default=10
+        The number of page loads between health checks of the browser session.
+    prewarm : bool, default=False
+        Whether to start a replacement browser session in the background shortly before
+        `max_operations`, or once the browser uses too much memory, so recycling does
+        not wait for the browser to start. Requires `scratch_profile`, since browser
+        sessions cannot share a profile.
+    profile_root : str, default="~/.ig-mbs-scheduler"
+        The application directory containing the browser profiles.
 
     Attributes
     ----------
     timeout : int
         The maximum duration to wait for elements to load.
+    session_dir : str
+        The path of the browser profile directory.
+    browser_binary : str or None
+        The path of the Chromium based browser binary.
+    headless : bool
+        Whether to run the browser without a window.
+    scratch_profile : bool
+        Whether to run the browser on a scratch copy of the profile.
+    max_memory : int or None
+        The JavaScript heap size (MB) above which the browser session is considered
+        unhealthy.
+    startup_time : float or None
+        The duration (seconds) it took to start the browser, or `None` if it has not
+        been started.
+    page_loads : int
+        The number of pages loaded with `_get`.
     """
 
-    def __init__(self, profile, timeout):
+    def __init__(
+        self,
+        profile,
+        timeout,
+        browser_binary=None,
+        headless=False,
+        scratch_profile=False,
+        max_operations=None,
+        max_memory=None,
+        health_check_interval=10,
+        prewarm=False,
+        profile_root="~/.ig-mbs-scheduler",
+    ):
+        if prewarm and not scratch_profile:
+            raise ValueError("Pre-warming browser sessions requires a scratch profile")
+
         self.timeout = timeout
+        self.browser_binary = browser_binary or find_browser_binary()
+        self.headless = headless
+        self.scratch_profile = scratch_profile
+        self.startup_time = None
+        self.page_loads = 0
 
-        options = webdriver.ChromeOptions()
-        options.binary_location = (
-            "/Applications/Brave Browser.app/Contents/MacOS/Brave Browser"
+        self.session_dir = os.path.join(os.path.expanduser(profile_root), profile)
+        self.max_memory = max_memory
+        self.__session_pool = SessionPool(
+            self.__start,
+            self.__stop,
+            self.__check,
+            max_operations,
+            health_check_interval,
+            prewarm,
+            # Scratch profiles are copies, so their sessions share no state
+            isolated=scratch_profile,
         )
 
-        session_dir = os.path.expanduser(f"~/.ig-mbs-scheduler/{profile}")
-        options.add_argument(f"--user-data-dir={session_dir}")
-
-        self._driver = webdriver.Chrome(options=options)
-
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self._driver.close()
+        self.quit()
+
+    def __create_scratch_session_dir(self):
+        scratch_root_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        scratch_session_dir = tempfile.mkdtemp(
+            prefix="ig-mbs-scheduler-", dir=scratch_root_dir
+        )
+
+        if os.path.isdir(self.session_dir):
+            shutil.copytree(
+                self.session_dir,
+                scratch_session_dir,
+                ignore=shutil.ignore_patterns(*SCRATCH_PROFILE_IGNORE_PATTERNS),
+                dirs_exist_ok=True,
+            )
+
+        return scratch_session_dir
+
+    def __start(self):
+        start_time = time.perf_counter()
+
+        options = webdriver.ChromeOptions()
+        if self.browser_binary is not None:
+            options.binary_location = self.browser_binary
+
+        if self.scratch_profile:
+            scratch_session_dir = self.__create_scratch_session_dir()
+            session_dir = scratch_session_dir
+        else:
+            scratch_session_dir = None
+            session_dir = self.session_dir
+        options.add_argument(f"--user-data-dir={session_dir}")
+
+        if self.headless:
+            options.add_argument("--headless=new")
+            # Keep the desktop layout targeted by the XPaths
+            options.add_argument("--window-size=1920,1080")
+
+        driver = webdriver.Chrome(options=options)
+
+        self.startup_time = time.perf_counter() - start_time
+        metrics.REGISTRY.observe("driver.start", self.startup_time)
+        print(
+            f"Successfully started browser in {self.startup_time:.2f} seconds ({self.browser_binary}, headless: {self.headless}, scratch profile: {self.scratch_profile})"
+        )
+
+        return Session(driver, scratch_session_dir)
+
+    def __stop(self, session):
+        try:
+            session.driver.quit()
+        finally:
+            if session.scratch_session_dir is not None:
+                shutil.rmtree(session.scratch_session_dir, ignore_errors=True)
+
+    def __check(self, session):
+        # Fails if the browser is unresponsive
+        js_heap_size = session.driver.execute_script(GET_JS_HEAP_SIZE_SCRIPT)
 
+        if (
+            self.max_memory is not None
+            and js_heap_size is not None
+            and js_heap_size > self.max_memory * 1024**2
+        ):
+            print(
+                f"Browser is using {js_heap_size / 1024**2:.0f} MB of JavaScript heap"
+            )
+            return False
+
+        return True
+
+    @property
+    def is_started(self):
+        """
+        bool : Whether the browser has been started.
+        """
+        return self.__session_pool.session is not None
+
+    @property
+    def recycle_count(self):
+        """
+        int : The number of recycled browser sessions.
+        """
+        return self.__session_pool.recycle_count
+
+    @property
+    def _driver(self):
+        """
+        selenium.webdriver.Chrome : The browser session, started on first access.
+        """
+        return self.__session_pool.get().driver
+
+    def check_health(self):
+        """
+        Check the health of the browser session, and recycle it if unhealthy, for
+        example after an error.
+
+        Returns
+        -------
+        bool
+            Whether the browser session was healthy.
+        """
+        return self.__session_pool.check()
+
+    def quit(self):
+        """
+        Quit the browser, if it has been started.
+        """
+        self.__session_pool.close()
+
+    @metrics.timed("driver.get")
     def _get(self, url):
         """
-        Open a URL in the web browser.
+        Open a URL in the web browser, unless it is already open.
+
+        URLs are compared after normalization with `normalize_url`.
 
         Parameters
         ----------
         url : str
             The URL to request from the web driver.
+
+        Returns
+        -------
+        bool
+            Whether the page was loaded.
         """
-        if url != self._driver.current_url:
+        # Page loads are safe points to recycle the browser session
+        self.__session_pool.lease()
+
+        if normalize_url(url) != normalize_url(self._driver.current_url):
             print(f"URLs '{self._driver.current_url}' and '{url}' differ")
             print(f"Getting '{url}'")
             self._driver.get(url)
+            self.page_loads += 1
+            return True
         else:
             print(
                 f"URLs '{self._driver.current_url}' and '{url}' are equal, continuing..."
             )
+            return False
+
+    @metrics.timed("driver.wait")
+    def _wait_until(self, condition, timeout=None):
+        """
+        Wait until an expected condition is met.
+
+        Parameters
+        ----------
+        condition : callable
+            The expected condition to wait for.
+        timeout : int, optional
+            The maximum duration to wait. If not specified, `timeout` is used.
+
+        Returns
+        -------
+        object
+            The return value of the expected condition.
+        """
+        return WebDriverWait(self._driver, timeout or self.timeout).until(condition)
+
+    def _wait_until_scrolled(self, condition, xpath, settle_time=SCROLL_SETTLE_TIME):
+        """
+        Wait until an expected condition is met after scrolling an infinite list, such
+        as more items rendering, or until the list is fully loaded.
+
+        The list is fully loaded once scrolled to its bottom, with its height unchanged
+        for `settle_time`, so reaching its end does not wait for `timeout`.
+
+        Parameters
+        ----------
+        condition : callable
+            The expected condition to wait for.
+        xpath : str
+            The XPath of the items of the list, to find its scrolling container.
+        settle_time : float, default=1
+            The duration (seconds) the height of the list must stay unchanged at its
+            bottom.
+
+        Returns
+        -------
+        object or None
+            The return value of the expected condition, or `None` if the list is fully
+            loaded.
+
+        Raises
+        ------
+        TimeoutException
+            If neither happens within `timeout`.
+        """
+        loaded = object()
+        scroll_height = None
+        settled_at = None
+
+        def is_loaded_or_condition_met(driver):
+            nonlocal scroll_height, settled_at
+
+            value = condition(driver)
+            if value:
+                return value
+
+            scroll_top, new_scroll_height, client_height = driver.execute_script(
+                GET_SCROLL_STATE_SCRIPT, xpath
+            )
+            if new_scroll_height != scroll_height:
+                scroll_height, settled_at = new_scroll_height, time.monotonic()
+                return False
+
+            is_at_bottom = scroll_top + client_height >= scroll_height - 1
+            if is_at_bottom and time.monotonic() - settled_at >= settle_time:
+                return loaded
+            return False
+
+        value = self._wait_until(is_loaded_or_condition_met)
+
+        return None if value is loaded else value
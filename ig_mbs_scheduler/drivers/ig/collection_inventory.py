@@ -0,0 +1,140 @@
+import time
+
+
+class CollectionInventory:
+    """
+    An in-memory inventory of saved collections and the item URLs they contain.
+
+    Parameters
+    ----------
+    ttl : float, optional
+        The duration (seconds) after which the inventory is considered stale, and is
+        cleared. If not specified, the inventory never goes stale.
+
+    Attributes
+    ----------
+    ttl : float or None
+        The duration (seconds) after which the inventory is considered stale.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.__collection_names = None
+        self.__collection_item_urls = {}
+        self.__loaded_at = None
+
+    def __expire(self):
+        if (
+            self.ttl is not None
+            and self.__loaded_at is not None
+            and time.monotonic() - self.__loaded_at > self.ttl
+        ):
+            print("Collection inventory is stale, invalidating...")
+            self.invalidate()
+
+    def get_collection_names(self):
+        """
+        Get the inventoried collection names.
+
+        Returns
+        -------
+        list of str or None
+            The inventoried collection names, or `None` if they are not inventoried.
+        """
+        self.__expire()
+
+        if self.__collection_names is None:
+            return None
+
+        return list(self.__collection_names)
+
+    def set_collection_names(self, collection_names):
+        """
+        Inventory the collection names, discarding items of collections no longer
+        present.
+
+        Parameters
+        ----------
+        collection_names : list of str
+            The collection names to inventory.
+        """
+        self.__collection_names = list(collection_names)
+        self.__collection_item_urls = {
+            collection_name: item_urls
+            for collection_name, item_urls in self.__collection_item_urls.items()
+            if collection_name in self.__collection_names
+        }
+        self.__loaded_at = time.monotonic()
+
+    def get_collection_item_urls(self, collection_name):
+        """
+        Get the inventoried item URLs of a collection.
+
+        Parameters
+        ----------
+        collection_name : str
+            The collection name for which to get the item URLs.
+
+        Returns
+        -------
+        list of str or None
+            The inventoried item URLs, or `None` if they are not inventoried.
+        """
+        self.__expire()
+
+        if collection_name not in self.__collection_item_urls:
+            return None
+
+        return list(self.__collection_item_urls[collection_name])
+
+    def set_collection_item_urls(self, collection_name, item_urls):
+        """
+        Inventory the item URLs of a collection.
+
+        Parameters
+        ----------
+        collection_name : str
+            The collection name for which to inventory the item URLs.
+        item_urls : list of str
+            The item URLs to inventory.
+        """
+        self.__collection_item_urls[collection_name] = list(item_urls)
+
+        if self.__loaded_at is None:
+            self.__loaded_at = time.monotonic()
+
+    def remove_item_url(self, item_url):
+        """
+        Remove an item URL from every inventoried collection.
+
+        Parameters
+        ----------
+        item_url : str
+            The item URL to remove.
+        """
+        for item_urls in self.__collection_item_urls.values():
+            if item_url in item_urls:
+                item_urls.remove(item_url)
+
+    def remove_collection(self, collection_name):
+        """
+        Remove a collection and its item URLs from the inventory.
+
+        Parameters
+        ----------
+        collection_name : str
+            The name of the collection to remove.
+        """
+        if self.__collection_names is not None and (
+            collection_name in self.__collection_names
+        ):
+            self.__collection_names.remove(collection_name)
+        self.__collection_item_urls.pop(collection_name, None)
+
+    def invalidate(self):
+        """
+        Clear the inventory, so it is scraped again on next access.
+        """
+        self.__collection_names = None
+        self.__collection_item_urls = {}
+        self.__loaded_at = None
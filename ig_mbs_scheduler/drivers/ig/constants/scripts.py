@@ -0,0 +1,15 @@
+GET_LINK_HREFS = """
+const links = document.evaluate(
+    arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+const hrefs = [];
+for (let i = 0; i < links.snapshotLength; i++) {
+    hrefs.push(links.snapshotItem(i).href);
+}
+return hrefs;
+"""
+SCROLL_TO_BOTTOM = """
+window.scrollTo(0, document.body.scrollHeight);
+return document.body.scrollHeight;
+"""
+GET_SCROLL_HEIGHT = "return document.body.scrollHeight;"
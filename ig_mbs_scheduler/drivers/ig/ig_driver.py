@@ -1,12 +1,30 @@
 import json
+import os
 import re
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from urllib.parse import urlsplit
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
+from ig_mbs_scheduler import metrics
 from ig_mbs_scheduler.drivers.base_driver import BaseWebDriver
-from ig_mbs_scheduler.drivers.ig.constants import xpaths
+from ig_mbs_scheduler.drivers.ig import post
+from ig_mbs_scheduler.drivers.ig.collection_inventory import CollectionInventory
+from ig_mbs_scheduler.drivers.ig.constants import scripts, xpaths
+from ig_mbs_scheduler.drivers.ig.metadata_client import (
+    PostMetadataClient,
+    PostMetadataError,
+    get_cookies_path,
+)
+from ig_mbs_scheduler.drivers.ig.prefetcher import MetadataPrefetcher
+from ig_mbs_scheduler.lru_cache import LRUCache
+
+# The number of recently seen item URLs remembered, to dedupe items across scrolls
+SEEN_ITEM_URLS_SIZE = 1024
 
 
 class IGWebDriver(BaseWebDriver):
@@ -19,30 +37,136 @@ class IGWebDriver(BaseWebDriver):
         The Instagram username for which to run the session.
     timeout : int, default=5
         The maximum duration to wait for elements to load.
+    post_cache_size : int, default=128
+        The maximum number of scraped posts to keep in memory.
+    inventory_ttl : float, optional
+        The duration (seconds) after which the in-memory collection inventory is
+        scraped again. If not specified, collections are only scraped once.
+    inventory_max_items : int, default=1000
+        The maximum number of item URLs of a collection to keep in the in-memory
+        collection inventory. Larger collections are streamed from the page on every
+        access.
+    metadata_backend : {"browser", "http"}, default="browser"
+        How to get the metadata of posts. "browser" parses it from the post page. "http"
+        fetches it as JSON with the cookies of the browser session, falling back to the
+        post page on failure.
+    metadata_base_url : str, optional
+        The base URL from which the "http" metadata backend fetches post metadata. If
+        not specified, `base_url` is used.
+    base_url : str, default="https://www.instagram.com"
+        The base URL of Instagram, so the driver can be pointed at a local server.
+    **kwargs
+        Extra keyword arguments passed to `BaseWebDriver`, such as `headless`.
 
     Attributes
     ----------
     username : str
         The Instagram username for which to run the session.
+    base_url : str
+        The base URL of Instagram.
+    inventory_max_items : int
+        The maximum number of item URLs of a collection to keep in the in-memory
+        collection inventory.
     """
 
-    def __init__(self, username, timeout=5):
-        super().__init__(f"ig/{username}", timeout)
+    def __init__(
+        self,
+        username,
+        timeout=5,
+        post_cache_size=128,
+        inventory_ttl=None,
+        inventory_max_items=1000,
+        metadata_backend="browser",
+        metadata_base_url=None,
+        base_url="https://www.instagram.com",
+        **kwargs,
+    ):
+        super().__init__(f"ig/{username}", timeout, **kwargs)
         self.username = username
+        self.base_url = base_url.rstrip("/")
+        self.inventory_max_items = inventory_max_items
+        self.metadata_backend = metadata_backend
+        self.__post_cache = LRUCache(post_cache_size)
+        self.__inventory = CollectionInventory(inventory_ttl)
+        # Collection URLs, by collection name, so collections can be opened directly
+        self.__collection_urls = {}
+
+        if metadata_backend == "http":
+            self.__metadata_client = PostMetadataClient(
+                get_cookies_path(self.session_dir), metadata_base_url or self.base_url
+            )
+        elif metadata_backend == "browser":
+            self.__metadata_client = None
+        else:
+            raise ValueError(f"Unsupported metadata backend: {metadata_backend}")
+
+    def quit(self):
+        """
+        Quit the browser, if it has been started, exporting its cookies first for the
+        "http" metadata backend.
+        """
+        if self.__metadata_client is not None and self.is_started:
+            try:
+                self.export_cookies()
+            except (OSError, WebDriverException) as e:
+                print(f"Failed to export cookies: {e}")
+
+        super().quit()
+
+    def export_cookies(self):
+        """
+        Export the cookies of the browser session, for the "http" metadata backend.
+        """
+        cookies_path = get_cookies_path(self.session_dir)
+        os.makedirs(os.path.dirname(cookies_path), exist_ok=True)
+
+        # Cookies are only readable for the domain of the open page
+        if urlsplit(self._driver.current_url).netloc != urlsplit(self.base_url).netloc:
+            self._get(f"{self.base_url}/")
+        cookies = self._driver.get_cookies()
+
+        # Cookies include the session ID, so only the user may read them, even if the
+        # file was created by an older version
+        cookies_fd = os.open(cookies_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(cookies_path, 0o600)
+        with open(cookies_fd, "w") as cookies_file:
+            json.dump(cookies, cookies_file)
+
+        if self.__metadata_client is not None:
+            self.__metadata_client.load_cookies()
+
+        print(f"Successfully exported cookies ({cookies_path})")
 
+    @metrics.timed("ig.get_saved_collection_names")
     def get_saved_collection_names(self):
         """
         Get the names of all saved collections.
 
+        Collection names are served from the in-memory collection inventory once
+        scraped.
+
         Returns
         -------
         list of str
             The names of all saved collections.
         """
-        self._get(f"https://www.instagram.com/{self.username}/saved/")
+        collection_names = self.__inventory.get_collection_names()
+        if collection_names is not None:
+            return collection_names
+
+        collection_names = self.__scrape_saved_collection_names()
+        self.__inventory.set_collection_names(collection_names)
+
+        return collection_names
+
+    def __get_saved_url(self):
+        return f"{self.base_url}/{self.username}/saved/"
+
+    def __scrape_saved_collection_names(self):
+        self._get(self.__get_saved_url())
 
         try:
-            collection_divs = WebDriverWait(self._driver, self.timeout).until(
+            collection_divs = self._wait_until(
                 EC.presence_of_all_elements_located((By.XPATH, xpaths.COLLECTION_DIVS))
             )
         except TimeoutException:
@@ -56,9 +180,9 @@ class IGWebDriver(BaseWebDriver):
         return collection_names
 
     def __get_collection_div(self, collection_name):
-        self._get(f"https://www.instagram.com/{self.username}/saved/")
+        self._get(self.__get_saved_url())
 
-        collection_div = WebDriverWait(self._driver, self.timeout).until(
+        collection_div = self._wait_until(
             EC.element_to_be_clickable(
                 (
                     By.XPATH,
@@ -68,19 +192,33 @@ class IGWebDriver(BaseWebDriver):
         )
         return collection_div
 
-    def __open_collection(self, collection_name):
-        collection_div = self.__get_collection_div(collection_name)
+    def __open_collection(self, collection_name, collection_div=None):
+        # Open known collections directly, rather than through the saved page
+        collection_url = self.__collection_urls.get(collection_name)
+        if collection_url is not None:
+            self._get(collection_url)
+            return
+
+        if collection_div is None:
+            collection_div = self.__get_collection_div(collection_name)
         collection_div.click()
 
-    def __is_collection_empty(self, collection_name):
-        collection_div = self.__get_collection_div(collection_name)
+        self._wait_until(EC.url_changes(self.__get_saved_url()))
+        self.__collection_urls[collection_name] = self._driver.current_url
 
+    def __is_collection_div_empty(self, collection_div):
         collection_div_grandchildren = collection_div.find_elements(
             By.XPATH, "./div/div"
         )
 
         return len(collection_div_grandchildren) == 1
 
+    def __is_collection_empty(self, collection_name):
+        collection_div = self.__get_collection_div(collection_name)
+
+        return self.__is_collection_div_empty(collection_div)
+
+    @metrics.timed("ig.delete_collection")
     def delete_collection(self, collection_name):
         """
         Delete a saved collection.
@@ -92,7 +230,7 @@ class IGWebDriver(BaseWebDriver):
         """
         self.__open_collection(collection_name)
 
-        collection_options_button = WebDriverWait(self._driver, self.timeout).until(
+        collection_options_button = self._wait_until(
             EC.presence_of_element_located((By.XPATH, xpaths.COLLECTION_OPTIONS_BUTTON))
         )
         collection_options_button.click()
@@ -106,12 +244,18 @@ class IGWebDriver(BaseWebDriver):
             By.XPATH, xpaths.COLLECTION_DELETE_CONFIRM_BUTTON
         )
         collection_delete_confirm_button.click()
+        self.__inventory.remove_collection(collection_name)
+        self.__collection_urls.pop(collection_name, None)
 
         print(f"Successfully deleted collection: {collection_name}")
 
+    @metrics.timed("ig.get_collection_item_urls")
     def get_collection_item_urls(self, collection_name):
         """
-        Get the saved item URLs in a collection.
+        Get all saved item URLs in a collection.
+
+        For large collections, prefer `iter_collection_item_urls`, which does not hold
+        every item URL in memory.
 
         Parameters
         ----------
@@ -123,27 +267,155 @@ class IGWebDriver(BaseWebDriver):
         list of str
             The saved item URLs in the collection.
         """
-        if self.__is_collection_empty(collection_name):
-            print("No items in collection")
-            return []
-        self.__open_collection(collection_name)
+        return list(self.iter_collection_item_urls(collection_name))
+
+    def iter_collection_item_urls(self, collection_name):
+        """
+        Iterate over the saved item URLs in a collection.
+
+        Item URLs are served from the in-memory collection inventory once scraped.
+        Otherwise, the collection is scrolled incrementally, and item URLs are yielded
+        as they load, so iteration can stop early. Collections of up to
+        `inventory_max_items` items are added to the inventory once fully iterated.
 
-        collection_item_links = WebDriverWait(self._driver, self.timeout).until(
-            EC.presence_of_all_elements_located(
-                (By.XPATH, xpaths.COLLECTION_ITEM_LINKS)
+        Parameters
+        ----------
+        collection_name : str
+            The collection name for which to iterate over saved item URLs.
+
+        Yields
+        ------
+        str
+            The saved item URLs in the collection, without duplicates.
+        """
+        collection_item_urls = self.__inventory.get_collection_item_urls(
+            collection_name
+        )
+        if collection_item_urls is not None:
+            yield from collection_item_urls
+            return
+
+        # Only keep collections small enough for the inventory
+        collection_item_urls = []
+        for collection_item_url in self.__scrape_collection_item_urls(collection_name):
+            if collection_item_urls is not None:
+                if len(collection_item_urls) < self.inventory_max_items:
+                    collection_item_urls.append(collection_item_url)
+                else:
+                    collection_item_urls = None
+            yield collection_item_url
+
+        if collection_item_urls is not None:
+            self.__inventory.set_collection_item_urls(
+                collection_name, collection_item_urls
             )
+
+    def is_collection_empty(self, collection_name):
+        """
+        Check whether a collection has no saved items.
+
+        Emptiness is always checked on the saved page, since neither the inventory nor
+        a scroll through the collection can tell an empty collection from a slow load.
+        Only collections with inventoried items are reported non-empty without loading
+        a page.
+
+        Parameters
+        ----------
+        collection_name : str
+            The name of the collection to check.
+
+        Returns
+        -------
+        bool
+            Whether the collection has no saved items.
+        """
+        collection_item_urls = self.__inventory.get_collection_item_urls(
+            collection_name
         )
+        if collection_item_urls:
+            return False
 
-        collection_item_urls = [
-            collection_item_link.get_attribute("href")
-            for collection_item_link in collection_item_links
-        ]
+        return self.__is_collection_empty(collection_name)
+
+    def __scrape_collection_item_urls(self, collection_name):
+        is_opened_directly = collection_name in self.__collection_urls
+        if is_opened_directly:
+            self.__open_collection(collection_name)
+        else:
+            # Check for emptiness and open the collection from the same saved page
+            collection_div = self.__get_collection_div(collection_name)
+            if self.__is_collection_div_empty(collection_div):
+                print("No items in collection")
+                return
+            self.__open_collection(collection_name, collection_div)
+
+        try:
+            self._wait_until(
+                EC.presence_of_element_located((By.XPATH, xpaths.COLLECTION_ITEM_LINKS))
+            )
+        except TimeoutException:
+            # Collections opened directly skip the emptiness check of the saved page, so
+            # only report them empty once checked there, rather than on a slow load
+            if not is_opened_directly or not self.__is_collection_empty(
+                collection_name
+            ):
+                raise
+            print("No items in collection")
+            return
 
-        print(f"Successfully got collection item URLs: {collection_item_urls}")
+        # Items are unloaded as they scroll out of view, so only recently seen item
+        # URLs are needed to dedupe them
+        seen_item_urls = LRUCache(SEEN_ITEM_URLS_SIZE)
+        item_count = 0
+        while True:
+            for collection_item_url in self._driver.execute_script(
+                scripts.GET_LINK_HREFS, xpaths.COLLECTION_ITEM_LINKS
+            ):
+                if collection_item_url in seen_item_urls:
+                    continue
+                seen_item_urls.put(collection_item_url, True)
+                item_count += 1
+                yield collection_item_url
+
+            # Load the next page of items, until the end of the collection
+            scroll_height = self._driver.execute_script(scripts.SCROLL_TO_BOTTOM)
+
+            def has_grown(driver):
+                return driver.execute_script(scripts.GET_SCROLL_HEIGHT) > scroll_height
+
+            try:
+                has_more_items = self._wait_until_scrolled(
+                    has_grown, xpaths.COLLECTION_ITEM_LINKS
+                )
+            except TimeoutException:
+                break
+            if not has_more_items:
+                break
 
-        return collection_item_urls
+        print(f"Successfully got {item_count} collection item URL(s)")
 
+    @metrics.timed("ig.get_post_data")
     def __get_post_data(self, post_url):
+        if self.__metadata_client is not None:
+            try:
+                return self.__metadata_client.get_post_data(post_url)
+            except PostMetadataError as e:
+                print(
+                    f"Failed to get post data over HTTP, falling back to the browser ({post_url}): {e}"
+                )
+
+        post_data = self.__get_page_post_data(post_url)
+
+        # Refresh the exported cookies for the next request
+        if self.__metadata_client is not None:
+            try:
+                self.export_cookies()
+            except (OSError, WebDriverException) as e:
+                print(f"Failed to export cookies: {e}")
+
+        return post_data
+
+    def __get_page_post_data(self, post_url):
         self._get(post_url)
 
         post_data_script = self._driver.find_element(By.XPATH, "/html/body/script[12]")
@@ -156,25 +428,161 @@ class IGWebDriver(BaseWebDriver):
 
         return post_data["items"][0]
 
-    def __get_post_media_urls(self, post_data):
+    def __get_post_media_candidates(self, post_data):
         media_type = post_data["media_type"]
 
-        if media_type == 1:  # Photo
-            photo_url = post_data["image_versions2"]["candidates"][0]["url"]
-            return [photo_url]
-        elif media_type == 2:  # Video
-            video_url = post_data["video_versions"][0]["url"]
-            return [video_url]
-        elif media_type == 8:  # Carousel
+        if media_type == post.MEDIA_TYPE_PHOTO:
+            candidates_data = post_data["image_versions2"]["candidates"]
+        elif media_type == post.MEDIA_TYPE_VIDEO:
+            candidates_data = post_data["video_versions"]
+        elif media_type == post.MEDIA_TYPE_CAROUSEL:
             return [
-                carousel_item_url
+                carousel_item_candidates
                 for carousel_item_data in post_data["carousel_media"]
-                for carousel_item_url in self.__get_post_media_urls(carousel_item_data)
+                for carousel_item_candidates in self.__get_post_media_candidates(
+                    carousel_item_data
+                )
             ]
         else:
             print(f"Unsupported media type: {media_type}")
             return []
 
+        return [
+            tuple(
+                post.MediaCandidate(
+                    url=candidate_data["url"],
+                    width=candidate_data.get("width", 0),
+                    height=candidate_data.get("height", 0),
+                )
+                for candidate_data in candidates_data
+            )
+        ]
+
+    def __create_post(self, post_url, post_data):
+        media_candidates = tuple(self.__get_post_media_candidates(post_data))
+
+        return post.Post(
+            url=post_url,
+            media_type=post_data["media_type"],
+            # The first rendition is the original
+            media_urls=tuple(candidates[0].url for candidates in media_candidates),
+            caption=post_data["caption"]["text"] if post_data["caption"] else None,
+            user=post_data["user"]["username"],
+            media_candidates=media_candidates,
+        )
+
+    @metrics.timed("ig.get_post")
+    def get_post(self, post_url):
+        """
+        Get the metadata of a post.
+
+        The post page is only loaded and parsed once. Subsequent calls for the same post
+        are served from an in-memory LRU cache, until invalidated with
+        `invalidate_post`.
+
+        Parameters
+        ----------
+        post_url : str
+            The URL of the post for which to get the metadata.
+
+        Returns
+        -------
+        Post
+            The metadata of the post.
+        """
+        cached_post = self.__post_cache.get(post_url)
+        if cached_post is not None:
+            print(f"Post is cached, continuing... ({post_url})")
+            return cached_post
+
+        post_data = self.__get_post_data(post_url)
+
+        scraped_post = self.__create_post(post_url, post_data)
+        self.__post_cache.put(post_url, scraped_post)
+
+        print(f"Successfully got post ({post_url}): {scraped_post}")
+
+        return scraped_post
+
+    def is_post_cached(self, post_url):
+        """
+        Check whether the metadata of a post is cached.
+
+        Parameters
+        ----------
+        post_url : str
+            The URL of the post to check.
+
+        Returns
+        -------
+        bool
+            Whether the metadata of the post is cached.
+        """
+        return post_url in self.__post_cache
+
+    @metrics.timed("ig.prefetch_posts")
+    def prefetch_posts(self, post_urls, concurrency=8, rate=2, burst=1):
+        """
+        Fetch the metadata of a batch of posts concurrently into the post metadata
+        cache, so `get_post` is served from memory.
+
+        Only supported by the "http" metadata backend. Posts whose metadata cannot be
+        prefetched are fetched by `get_post` as usual.
+
+        Parameters
+        ----------
+        post_urls : list of str
+            The URLs of the posts for which to fetch the metadata. Already cached posts
+            are skipped.
+        concurrency : int, default=8
+            The maximum number of concurrent requests.
+        rate : float, default=2
+            The maximum number of requests per second, across all requests.
+        burst : int, default=1
+            The maximum number of requests sent at once, ahead of the rate.
+
+        Returns
+        -------
+        int
+            The number of prefetched posts.
+        """
+        if self.__metadata_client is None:
+            print("Prefetching requires the 'http' metadata backend, continuing...")
+            return 0
+
+        uncached_post_urls = [
+            post_url for post_url in post_urls if not self.is_post_cached(post_url)
+        ]
+        if len(uncached_post_urls) == 0:
+            return 0
+
+        post_data = MetadataPrefetcher(
+            self.__metadata_client, concurrency, rate, burst
+        ).prefetch(uncached_post_urls)
+        for post_url, data in post_data.items():
+            try:
+                self.__post_cache.put(post_url, self.__create_post(post_url, data))
+            except (KeyError, TypeError) as e:
+                print(f"Failed to parse prefetched post data ({post_url}): {e!r}")
+
+        print(
+            f"Successfully prefetched {len(post_data)}/{len(uncached_post_urls)} post(s)"
+        )
+
+        return len(post_data)
+
+    def invalidate_post(self, post_url=None):
+        """
+        Remove a post from the post metadata cache.
+
+        Parameters
+        ----------
+        post_url : str, optional
+            The URL of the post to remove. If not specified, all posts are removed.
+        """
+        self.__post_cache.invalidate(post_url)
+
+    @metrics.timed("ig.get_post_media_urls")
     def get_post_media_urls(self, post_url):
         """
         Get the media URLs of a post.
@@ -189,13 +597,9 @@ class IGWebDriver(BaseWebDriver):
         list of str
             The media URLs of the post.
         """
-        post_data = self.__get_post_data(post_url)
-        media_urls = self.__get_post_media_urls(post_data)
-
-        print(f"Successfully got post media URLs ({post_url}): {media_urls}")
-
-        return media_urls
+        return list(self.get_post(post_url).media_urls)
 
+    @metrics.timed("ig.get_post_caption")
     def get_post_caption(self, post_url):
         """
         Get the caption of a post.
@@ -210,17 +614,9 @@ class IGWebDriver(BaseWebDriver):
         str
             The caption of the post.
         """
-        post_data = self.__get_post_data(post_url)
-
-        if post_data["caption"]:
-            post_caption = post_data["caption"]["text"]
-        else:
-            post_caption = None
-
-        print(f"Successfully got post caption ({post_url}): {post_caption}")
-
-        return post_caption
+        return self.get_post(post_url).caption
 
+    @metrics.timed("ig.get_post_user")
     def get_post_user(self, post_url):
         """
         Get the user of a post.
@@ -235,14 +631,9 @@ class IGWebDriver(BaseWebDriver):
         str
             The user of the post.
         """
-        post_data = self.__get_post_data(post_url)
-
-        post_user = post_data["user"]["username"]
-
-        print(f"Successfully got post user ({post_url}): {post_user}")
-
-        return post_user
+        return self.get_post(post_url).user
 
+    @metrics.timed("ig.unsave_post")
     def unsave_post(self, post_url):
         """
         Unsave a post.
@@ -252,8 +643,11 @@ class IGWebDriver(BaseWebDriver):
         post_url : str
             The URL of the post to unsave.
         """
+        self.invalidate_post(post_url)
         self._get(post_url)
+        self.__unsave_open_post(post_url)
 
+    def __unsave_open_post(self, post_url):
         try:
             post_unsave_button = self._driver.find_element(
                 By.XPATH, xpaths.POST_UNSAVE_BUTTON
@@ -261,6 +655,7 @@ class IGWebDriver(BaseWebDriver):
             post_unsave_button.click()
         except NoSuchElementException:
             print(f"Post is not saved, continuing... ({post_url})")
+            self.__inventory.remove_item_url(post_url)
             return
 
         try:
@@ -269,11 +664,14 @@ class IGWebDriver(BaseWebDriver):
             )
             post_unsave_prompt_button.click()
         except NoSuchElementException:
+            self.__inventory.remove_item_url(post_url)
             print(f"Successfully unsaved post ({post_url})")
             return
 
+        self.__inventory.remove_item_url(post_url)
         print(f"Successfully unsaved post from collection ({post_url})")
 
+    @metrics.timed("ig.like_post")
     def like_post(self, post_url):
         """
         Like a post.
@@ -284,7 +682,9 @@ class IGWebDriver(BaseWebDriver):
             The URL of the post to like.
         """
         self._get(post_url)
+        self.__like_open_post(post_url)
 
+    def __like_open_post(self, post_url):
         try:
             post_like_button = self._driver.find_element(
                 By.XPATH, xpaths.POST_LIKE_BUTTON
@@ -295,3 +695,18 @@ class IGWebDriver(BaseWebDriver):
             return
 
         print(f"Successfully liked post ({post_url})")
+
+    @metrics.timed("ig.unsave_and_like_post")
+    def unsave_and_like_post(self, post_url):
+        """
+        Unsave and like a post, on a single load of the post page.
+
+        Parameters
+        ----------
+        post_url : str
+            The URL of the post to unsave and like.
+        """
+        self.invalidate_post(post_url)
+        self._get(post_url)
+        self.__unsave_open_post(post_url)
+        self.__like_open_post(post_url)
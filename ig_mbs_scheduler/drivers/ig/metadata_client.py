@@ -0,0 +1,158 @@
+import json
+import os
+from urllib.parse import urljoin, urlsplit
+
+import requests
+import urllib3
+
+from ig_mbs_scheduler import http_client, metrics
+
+# The app ID sent by the Instagram web app, required by its JSON endpoints
+IG_APP_ID = "936619743392459"
+# The top-level fields of post metadata read by the driver
+REQUIRED_POST_FIELDS = ["media_type", "caption"]
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class PostMetadataError(Exception):
+    """
+    Raised when the metadata of a post cannot be fetched over HTTP.
+    """
+
+
+class PostMetadataClient:
+    """
+    A browserless client for fetching the metadata of Instagram posts as JSON, using the
+    cookies of a browser session.
+
+    Requests are sent through the pooled HTTP client shared by the scheduler's media
+    I/O.
+
+    Parameters
+    ----------
+    cookies_path : str
+        The path of the JSON file of cookies exported from the browser session, as
+        returned by `selenium`'s `get_cookies`.
+    base_url : str, default="https://www.instagram.com"
+        The base URL of Instagram. Post URLs are requested from this base URL, so
+        requests can be pointed at a local server.
+    client : HTTPClient, optional
+        The HTTP client. If not specified, the shared default client is used.
+
+    Attributes
+    ----------
+    cookies_path : str
+        The path of the JSON file of cookies exported from the browser session.
+    base_url : str
+        The base URL of Instagram.
+    """
+
+    def __init__(self, cookies_path, base_url="https://www.instagram.com", client=None):
+        self.cookies_path = cookies_path
+        self.base_url = base_url
+        self.__client = client
+        self.__cookie_header = None
+
+    def load_cookies(self):
+        """
+        Load the cookies exported from the browser session.
+
+        Raises
+        ------
+        PostMetadataError
+            If the cookies file does not exist, or cannot be read.
+        """
+        try:
+            with open(self.cookies_path) as cookies_file:
+                cookies = json.load(cookies_file)
+        except (OSError, ValueError) as e:
+            raise PostMetadataError(f"Could not load cookies: {e}") from e
+
+        self.__cookie_header = "; ".join(
+            f"{cookie['name']}={cookie['value']}" for cookie in cookies
+        )
+
+    def __get_post_data_url(self, post_url):
+        post_path = urlsplit(post_url).path
+        if not post_path.endswith("/"):
+            post_path += "/"
+
+        return urljoin(self.base_url, post_path) + "?__a=1&__d=dis"
+
+    @metrics.timed("ig.get_post_data_http")
+    def get_post_data(self, post_url):
+        """
+        Get the metadata of a post.
+
+        Parameters
+        ----------
+        post_url : str
+            The URL of the post for which to get the metadata.
+
+        Returns
+        -------
+        dict
+            The metadata of the post, in the same structure as embedded in the post
+            page.
+
+        Raises
+        ------
+        PostMetadataError
+            If the request fails, or the response is not post metadata, for example
+            when the session has expired.
+        """
+        if self.__cookie_header is None:
+            self.load_cookies()
+
+        client = self.__client or http_client.get_default_client()
+        try:
+            response = client.get(
+                self.__get_post_data_url(post_url),
+                headers={
+                    "Cookie": self.__cookie_header,
+                    "User-Agent": USER_AGENT,
+                    "X-IG-App-ID": IG_APP_ID,
+                },
+                allow_redirects=False,
+            )
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            raise PostMetadataError(f"Request failed: {e}") from e
+
+        if response.status_code != 200:
+            raise PostMetadataError(f"Unexpected status code: {response.status_code}")
+
+        # Check the fields read by the driver, so incomplete metadata falls back to the
+        # post page rather than failing later
+        try:
+            post_data = response.json()["items"][0]
+            missing_fields = [
+                field for field in REQUIRED_POST_FIELDS if field not in post_data
+            ]
+            if "username" not in post_data.get("user", {}):
+                missing_fields.append("user.username")
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            raise PostMetadataError(f"Unexpected response: {e!r}") from e
+
+        if len(missing_fields) > 0:
+            raise PostMetadataError(
+                f"Incomplete post metadata, missing: {missing_fields}"
+            )
+
+        return post_data
+
+
+def get_cookies_path(session_dir):
+    """
+    Get the path of the cookies file exported from a browser session.
+
+    Parameters
+    ----------
+    session_dir : str
+        The browser profile directory of the session.
+
+    Returns
+    -------
+    str
+        The path of the cookies file.
+    """
+    return os.path.join(session_dir, "cookies.json")
@@ -0,0 +1,91 @@
+from collections import namedtuple
+
+MEDIA_TYPE_PHOTO = 1
+MEDIA_TYPE_VIDEO = 2
+MEDIA_TYPE_CAROUSEL = 8
+
+MediaCandidate = namedtuple("MediaCandidate", ["url", "width", "height"])
+
+
+def select_candidate(candidates, target_width=None):
+    """
+    Select the smallest rendition of a media item which is at least as wide as a target
+    width.
+
+    Parameters
+    ----------
+    candidates : tuple of MediaCandidate
+        The renditions of the media item.
+    target_width : int, optional
+        The target width (pixels). If not specified, or no rendition is wide enough, the
+        largest rendition is selected.
+
+    Returns
+    -------
+    MediaCandidate
+        The selected rendition.
+    """
+
+    def get_area(candidate):
+        return candidate.width * candidate.height
+
+    if target_width:
+        sufficient_candidates = [
+            candidate for candidate in candidates if candidate.width >= target_width
+        ]
+        if len(sufficient_candidates) > 0:
+            return min(sufficient_candidates, key=get_area)
+
+    return max(candidates, key=get_area)
+
+
+class Post(
+    namedtuple(
+        "Post",
+        ["url", "media_type", "media_urls", "caption", "user", "media_candidates"],
+    )
+):
+    """
+    The scraped metadata of an Instagram post.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the post.
+    media_type : int
+        The Instagram media type of the post (1 for photo, 2 for video, 8 for
+        carousel).
+    media_urls : tuple of str
+        The media URLs of the post, at their largest resolution.
+    caption : str or None
+        The caption of the post, or `None` if the post has no caption.
+    user : str
+        The user of the post.
+    media_candidates : tuple of tuple of MediaCandidate
+        The renditions of each media item of the post.
+    """
+
+    __slots__ = ()
+
+    def select_media(self, target_width=None):
+        """
+        Select a rendition of each media item of the post with `select_candidate`.
+
+        Parameters
+        ----------
+        target_width : int, optional
+            The target width (pixels). If not specified, the largest renditions are
+            selected.
+
+        Returns
+        -------
+        list of tuple of (MediaCandidate, MediaCandidate)
+            The selected and the largest rendition of each media item.
+        """
+        return [
+            (
+                select_candidate(candidates, target_width),
+                select_candidate(candidates),
+            )
+            for candidates in self.media_candidates
+        ]
@@ -0,0 +1,130 @@
+import asyncio
+
+from ig_mbs_scheduler.drivers.ig.metadata_client import PostMetadataError
+
+
+class RateLimiter:
+    """
+    An asyncio token bucket, limiting the rate of requests.
+
+    Parameters
+    ----------
+    rate : float
+        The sustained number of requests per second.
+    burst : int, default=1
+        The maximum number of requests allowed at once after a pause.
+
+    Attributes
+    ----------
+    rate : float
+        The sustained number of requests per second.
+    burst : int
+        The maximum number of requests allowed at once after a pause.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.__tokens = burst
+        self.__updated_at = None
+        self.__lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Wait until a request is allowed.
+        """
+        async with self.__lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self.__updated_at is not None:
+                    self.__tokens = min(
+                        self.burst,
+                        self.__tokens + (now - self.__updated_at) * self.rate,
+                    )
+                self.__updated_at = now
+
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.__tokens) / self.rate)
+
+
+class MetadataPrefetcher:
+    """
+    A prefetcher which fetches the metadata of a batch of posts concurrently.
+
+    Requests are sent on worker threads by a `PostMetadataClient`, scheduled by asyncio,
+    with a cap on concurrent requests and a rate limit. Both limits are global, since
+    every request is sent to the base URL of the client.
+
+    Parameters
+    ----------
+    metadata_client : PostMetadataClient
+        The client fetching the metadata of each post.
+    concurrency : int, default=8
+        The maximum number of concurrent requests.
+    rate : float, default=2
+        The maximum number of requests per second.
+    burst : int, default=1
+        The maximum number of requests sent at once, ahead of the rate, independently
+        of the concurrency.
+
+    Attributes
+    ----------
+    concurrency : int
+        The maximum number of concurrent requests.
+    rate : float
+        The maximum number of requests per second.
+    burst : int
+        The maximum number of requests sent at once, ahead of the rate.
+    """
+
+    def __init__(self, metadata_client, concurrency=8, rate=2, burst=1):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.__metadata_client = metadata_client
+
+    async def __fetch(self, post_url, semaphore, rate_limiter):
+        async with semaphore:
+            await rate_limiter.acquire()
+            try:
+                return await asyncio.to_thread(
+                    self.__metadata_client.get_post_data, post_url
+                )
+            except PostMetadataError as e:
+                print(f"Failed to prefetch post data ({post_url}): {e}")
+                return None
+
+    async def __prefetch(self, post_urls):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        rate_limiter = RateLimiter(self.rate, self.burst)
+
+        post_data = await asyncio.gather(
+            *(self.__fetch(post_url, semaphore, rate_limiter) for post_url in post_urls)
+        )
+
+        return {
+            post_url: data
+            for post_url, data in zip(post_urls, post_data)
+            if data is not None
+        }
+
+    def prefetch(self, post_urls):
+        """
+        Fetch the metadata of a batch of posts.
+
+        Parameters
+        ----------
+        post_urls : list of str
+            The URLs of the posts for which to fetch the metadata.
+
+        Returns
+        -------
+        dict
+            The metadata of each post, by post URL. Posts whose metadata could not be
+            fetched are left out.
+        """
+        return asyncio.run(self.__prefetch(list(post_urls)))
@@ -0,0 +1,130 @@
+FILL_COMPOSER = """
+const fields = arguments[0];
+
+function getElement(xpath) {
+    return document.evaluate(
+        xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+}
+
+function getElements(xpath) {
+    const snapshot = document.evaluate(
+        xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    const elements = [];
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        elements.push(snapshot.snapshotItem(i));
+    }
+    return elements;
+}
+
+// Set input values through the native setter, so React picks up the change
+const setInputValue = Object.getOwnPropertyDescriptor(
+    HTMLInputElement.prototype, "value"
+).set;
+
+for (const [xpath, value] of fields.inputs) {
+    const input = getElement(xpath);
+    if (input === null) {
+        continue;
+    }
+    input.focus();
+    setInputValue.call(input, value);
+    input.dispatchEvent(new Event("input", {bubbles: true}));
+    input.dispatchEvent(new Event("change", {bubbles: true}));
+    input.blur();
+}
+
+const placementInputs = getElements(fields.placementXPath);
+if (placementInputs.length === fields.placement.length) {
+    placementInputs.forEach((input, i) => {
+        if ((input.getAttribute("aria-checked") === "true") !== fields.placement[i]) {
+            input.click();
+        }
+    });
+}
+
+// Insert the caption as typed text, so the editor fires its own input events
+if (fields.caption !== null) {
+    const captionDiv = getElement(fields.captionXPath);
+    if (captionDiv !== null) {
+        captionDiv.focus();
+        document.execCommand("selectAll", false, null);
+        document.execCommand("insertText", false, fields.caption);
+    }
+}
+"""
+GET_COMPOSER_STATE = """
+const fields = arguments[0];
+
+function getElement(xpath) {
+    return document.evaluate(
+        xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+}
+
+const state = {inputs: [], placement: [], caption: null};
+
+for (const [xpath] of fields.inputs) {
+    const input = getElement(xpath);
+    state.inputs.push(input === null ? null : input.value);
+}
+
+const placementInputs = document.evaluate(
+    fields.placementXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+for (let i = 0; i < placementInputs.snapshotLength; i++) {
+    state.placement.push(
+        placementInputs.snapshotItem(i).getAttribute("aria-checked") === "true"
+    );
+}
+
+if (fields.caption !== null) {
+    const captionDiv = getElement(fields.captionXPath);
+    state.caption = captionDiv === null ? null : captionDiv.innerText;
+}
+
+return state;
+"""
+GET_ROWS = """
+// Identify rows by their index in the list where available, or by their offset from
+// the top of the list, so rows with identical texts stay distinct across scrolls
+function getRowKey(element) {
+    const indexedRow = element.closest("[aria-rowindex], [data-index]");
+    if (indexedRow !== null) {
+        return Number(
+            indexedRow.getAttribute("aria-rowindex")
+            ?? indexedRow.getAttribute("data-index")
+        );
+    }
+
+    let top = element.getBoundingClientRect().top + window.scrollY;
+    for (let parent = element.parentElement; parent !== null; parent = parent.parentElement) {
+        if (parent !== document.scrollingElement) {
+            top += parent.scrollTop;
+        }
+    }
+    return Math.round(top);
+}
+
+const rows = document.evaluate(
+    arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+const keyedTexts = [];
+for (let i = 0; i < rows.snapshotLength; i++) {
+    const row = rows.snapshotItem(i);
+    const text = row.innerText.trim();
+    if (text !== "") {
+        keyedTexts.push([getRowKey(row), text]);
+    }
+}
+return keyedTexts;
+"""
+SCROLL_TO_LAST_ROW = """
+const rows = document.evaluate(
+    arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+if (rows.snapshotLength > 0) {
+    rows.snapshotItem(rows.snapshotLength - 1).scrollIntoView({block: "end"});
+}
+"""
@@ -19,3 +19,4 @@ SCHEDULE_ADD_MEDIA_DIV = '//*[@id="facebook"]/body/div[*]/div[2]/div/div/div/div
 SCHEDULE_PUBLISH_DIV = '/html/body/div[*]/div[2]/div/div/div/div/div/div/div[3]/div//div[1][not(@aria-disabled="true")]/span/div/div/div[2][contains(text(),"Schedule")]'
 SCHEDULED_POST_DATE_SPANS = '//*[@id="facebook"]/body/div[1]/div[1]/div/div[1]/div[1]/div/div/div/div/div/div/div/div/div/div[2]/div[2]/div/div/div/div/div[1]/div[2]/div/div[4]/div/div/div[1]/div/div[2]/div/div[position() mod 4 = 3]/div/div/div/div/div/span'
 SCHEDULED_STORY_DATE_SPANS = '//*[@id="facebook"]/body/div[1]/div[1]/div/div[1]/div[1]/div/div/div/div/div/div/div/div/div/div[2]/div[2]/div/div/div/div/div[1]/div[2]/div/div[2]/div[1]/div[2]/div/div[1]/div/div[2]/div/div[position() mod 2 = 0]/div/div/div/div/div/span'
+SCHEDULE_FILE_INPUTS = '//input[@type="file"]'
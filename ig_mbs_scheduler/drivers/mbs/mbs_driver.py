@@ -1,15 +1,36 @@
 import os
 import pyperclip
 import subprocess
+import sys
+from datetime import datetime
 from dateutil import parser
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
+from ig_mbs_scheduler import metrics
 from ig_mbs_scheduler.drivers.base_driver import BaseWebDriver
-from ig_mbs_scheduler.drivers.mbs.constants import osascripts, xpaths
+from ig_mbs_scheduler.drivers.mbs.constants import osascripts, scripts, xpaths
+
+# Formats of the dates listed by MBS, tried before falling back to `dateutil`
+SCHEDULED_DATE_FORMATS = [
+    "%d %B %Y %H:%M",
+    "%d %B %Y at %H:%M",
+    "%B %d, %Y %I:%M %p",
+    "%B %d, %Y at %I:%M %p",
+    "%b %d, %Y %I:%M %p",
+    "%b %d, %Y at %I:%M %p",
+    "%d/%m/%Y %H:%M",
+]
+# The modifier key of keyboard shortcuts, such as select all
+CONTROL_KEY = Keys.COMMAND if sys.platform == "darwin" else Keys.CONTROL
+
+
+class ScheduleDateError(Exception):
+    """
+    Raised when the schedule date cannot be filled in the MBS composer.
+    """
 
 
 class MBSWebDriver(BaseWebDriver):
@@ -28,6 +49,10 @@ class MBSWebDriver(BaseWebDriver):
         The maximum duration to wait when uploading media to MBS.
     timeout : int, default=5
         The maximum duration to wait for elements to load.
+    base_url : str, default="https://business.facebook.com"
+        The base URL of MBS, so the driver can be pointed at a local server.
+    **kwargs
+        Extra keyword arguments passed to `BaseWebDriver`, such as `headless`.
 
     Attributes
     ----------
@@ -37,6 +62,8 @@ class MBSWebDriver(BaseWebDriver):
         MBS only allows either photos or videos in a carousel post. When scheduling a carousel, this flag will prefer videos over photos.
     upload_timeout : int
         The maximum duration to wait when uploading media to MBS.
+    base_url : str
+        The base URL of MBS.
     """
 
     def __init__(
@@ -46,12 +73,17 @@ class MBSWebDriver(BaseWebDriver):
         prefer_video=False,
         upload_timeout=60,
         timeout=5,
+        base_url="https://business.facebook.com",
+        **kwargs,
     ):
-        super().__init__(f"mbs/{session_id}", timeout)
+        super().__init__(f"mbs/{session_id}", timeout, **kwargs)
+        self.base_url = base_url.rstrip("/")
         self.asset_id = asset_id
         self.prefer_video = prefer_video
         self.upload_timeout = upload_timeout
+        self.__scheduled_date_format = None
 
+    @metrics.timed("mbs.schedule_post")
     def schedule_post(self, datetime, media_dir_path, caption):
         """
         Schedule a post.
@@ -65,54 +97,48 @@ class MBSWebDriver(BaseWebDriver):
         caption : str
             The caption to add to the scheduled post.
         """
-        self._get(f"https://business.facebook.com/latest/home?asset_id={self.asset_id}")
+        self._get(f"{self.base_url}/latest/home?asset_id={self.asset_id}")
 
-        post_schedule_button = WebDriverWait(self._driver, self.timeout).until(
+        post_schedule_button = self._wait_until(
             EC.element_to_be_clickable((By.XPATH, xpaths.PLANNER_SCHEDULE_POST_DIV))
         )
         post_schedule_button.click()
 
-        self.__pick_date(datetime)
-
-        # Select post placement
-        self.__select_placement(False, True)
-
-        # Enter post caption
-        schedule_caption_div = self._driver.find_element(
-            By.XPATH, xpaths.SCHEDULE_CAPTION_DIV
-        )
-        clipboard = pyperclip.paste()  # Save clipboard
-        pyperclip.copy(caption)
-        schedule_caption_div.send_keys(Keys.COMMAND + "v")
-        pyperclip.copy(clipboard)  # Restore saved clipboard
+        # Pick date, select post placement, and enter post caption
+        self.__fill_composer(datetime, False, True, caption)
 
         # Check whether saved media has photos or videos
         is_file_video = {
-            os.path.splitext(filename)[1] == ".mp4"
-            for filename in os.listdir(media_dir_path)
+            self.__is_video_file(media_file_path)
+            for media_file_path in self.__get_media_file_paths(media_dir_path)
         }
         has_photos = False in is_file_video
         has_videos = True in is_file_video
+        is_video = not has_photos or (has_videos and self.prefer_video)
 
         # Choose files
         schedule_add_link = self._driver.find_element(
             By.XPATH,
             xpaths.SCHEDULE_ADD_VIDEO_LINK
-            if not has_photos or (has_videos and self.prefer_video)
+            if is_video
             else xpaths.SCHEDULE_ADD_PHOTO_LINK,
         )
         schedule_add_link.click()
-        schedule_upload_from_desktop = self._driver.find_element(
-            By.XPATH, xpaths.SCHEDULE_UPLOAD_FROM_DESKTOP
-        )
-        schedule_upload_from_desktop.click()
-        self.__choose_files(media_dir_path)
+
+        def open_file_dialog():
+            schedule_upload_from_desktop = self._driver.find_element(
+                By.XPATH, xpaths.SCHEDULE_UPLOAD_FROM_DESKTOP
+            )
+            schedule_upload_from_desktop.click()
+
+        self.__choose_files(media_dir_path, open_file_dialog, is_video)
 
         # Click schedule button
         self.__publish_schedule()
 
         print("Successfully scheduled post")
 
+    @metrics.timed("mbs.schedule_story")
     def schedule_story(self, datetime, media_dir_path):
         """
         Schedule a story.
@@ -124,9 +150,9 @@ class MBSWebDriver(BaseWebDriver):
         media_dir_path : str
             The path of the folder containing the media to schedule.
         """
-        self._get(f"https://business.facebook.com/latest/home?asset_id={self.asset_id}")
+        self._get(f"{self.base_url}/latest/home?asset_id={self.asset_id}")
 
-        planner_dropdown_div = WebDriverWait(self._driver, self.timeout).until(
+        planner_dropdown_div = self._wait_until(
             EC.element_to_be_clickable((By.XPATH, xpaths.PLANNER_DROPDOWN_DIV))
         )
         planner_dropdown_div.click()
@@ -136,23 +162,65 @@ class MBSWebDriver(BaseWebDriver):
         )
         planner_schedule_story_div.click()
 
-        self.__pick_date(datetime)
-
-        # Select post placement
-        self.__select_placement(False, True)
+        # Pick date, and select post placement
+        self.__fill_composer(datetime, False, True)
 
         # Choose files
-        schedule_add_media_div = self._driver.find_element(
-            By.XPATH, xpaths.SCHEDULE_ADD_MEDIA_DIV
-        )
-        schedule_add_media_div.click()
-        self.__choose_files(media_dir_path)
+        def open_file_dialog():
+            schedule_add_media_div = self._driver.find_element(
+                By.XPATH, xpaths.SCHEDULE_ADD_MEDIA_DIV
+            )
+            schedule_add_media_div.click()
+
+        self.__choose_files(media_dir_path, open_file_dialog)
 
         # Click schedule button
         self.__publish_schedule()
 
         print("Successfully scheduled story")
 
+    def __parse_scheduled_date(self, scheduled_date_text):
+        # Try the format that last matched first, since all rows share a format
+        date_formats = [self.__scheduled_date_format] + SCHEDULED_DATE_FORMATS
+        for date_format in date_formats:
+            if date_format is None:
+                continue
+            try:
+                scheduled_date = datetime.strptime(scheduled_date_text, date_format)
+            except ValueError:
+                continue
+            self.__scheduled_date_format = date_format
+            return scheduled_date
+
+        return parser.parse(scheduled_date_text)
+
+    def __get_scheduled_dates(self, scheduled_dates_url, date_spans_xpath):
+        self._get(scheduled_dates_url)
+
+        try:
+            self._wait_until(
+                EC.presence_of_element_located((By.XPATH, date_spans_xpath))
+            )
+        except TimeoutException:
+            return []
+
+        # Read all rendered rows in one call, and scroll until the list is fully loaded.
+        # Rows are merged by key, since rows scheduled for the same slot share a text.
+        rows = {}
+        window = self._driver.execute_script(scripts.GET_ROWS, date_spans_xpath)
+        while window is not None:
+            rows.update(window)
+
+            def get_new_window(driver):
+                window = driver.execute_script(scripts.GET_ROWS, date_spans_xpath)
+                return window if any(key not in rows for key, _ in window) else None
+
+            self._driver.execute_script(scripts.SCROLL_TO_LAST_ROW, date_spans_xpath)
+            window = self._wait_until_scrolled(get_new_window, date_spans_xpath)
+
+        return [self.__parse_scheduled_date(row) for _, row in sorted(rows.items())]
+
+    @metrics.timed("mbs.get_scheduled_post_dates")
     def get_scheduled_post_dates(self):
         """
         Get the dates of scheduled posts.
@@ -162,30 +230,19 @@ class MBSWebDriver(BaseWebDriver):
         list of datetime
             The dates of scheduled posts.
         """
-        self._get(
-            f"https://business.facebook.com/latest/posts/scheduled_posts?asset_id={self.asset_id}"
+        scheduled_post_dates = self.__get_scheduled_dates(
+            f"{self.base_url}/latest/posts/scheduled_posts?asset_id={self.asset_id}",
+            xpaths.SCHEDULED_POST_DATE_SPANS,
         )
-
-        try:
-            scheduled_post_date_spans = WebDriverWait(self._driver, self.timeout).until(
-                EC.presence_of_all_elements_located(
-                    (By.XPATH, xpaths.SCHEDULED_POST_DATE_SPANS)
-                )
-            )
-        except TimeoutException:
+        if len(scheduled_post_dates) == 0:
             print("No posts scheduled")
             return []
 
-        scheduled_post_dates = [
-            parser.parse(scheduled_post_date_span.text)
-            for scheduled_post_date_span in scheduled_post_date_spans
-            if scheduled_post_date_span.text != ""
-        ]
-
-        print(f"Successfully got scheduled post dates: {scheduled_post_dates}")
+        print(f"Successfully got {len(scheduled_post_dates)} scheduled post date(s)")
 
         return scheduled_post_dates
 
+    @metrics.timed("mbs.get_scheduled_story_dates")
     def get_scheduled_story_dates(self):
         """
         Get the dates of scheduled stories.
@@ -195,65 +252,184 @@ class MBSWebDriver(BaseWebDriver):
         list of datetime
             The dates of scheduled stories.
         """
-        self._get(
-            f"https://business.facebook.com/latest/posts/scheduled_stories?asset_id={self.asset_id}"
+        scheduled_story_dates = self.__get_scheduled_dates(
+            f"{self.base_url}/latest/posts/scheduled_stories?asset_id={self.asset_id}",
+            xpaths.SCHEDULED_STORY_DATE_SPANS,
         )
-
-        try:
-            scheduled_post_story_spans = WebDriverWait(
-                self._driver, self.timeout
-            ).until(
-                EC.presence_of_all_elements_located(
-                    (By.XPATH, xpaths.SCHEDULED_STORY_DATE_SPANS)
-                )
-            )
-        except TimeoutException:
+        if len(scheduled_story_dates) == 0:
             print("No stories scheduled")
             return []
 
-        scheduled_story_dates = [
-            parser.parse(scheduled_post_date_span.text)
-            for scheduled_post_date_span in scheduled_post_story_spans
-        ]
-
-        print(f"Successfully got scheduled story dates: {scheduled_story_dates}")
+        print(f"Successfully got {len(scheduled_story_dates)} scheduled story date(s)")
 
         return scheduled_story_dates
 
-    def __pick_date(self, datetime):
+    @staticmethod
+    def __get_date_inputs(datetime):
+        return [
+            [xpaths.SCHEDULE_DATE_INPUT, datetime.strftime("%d/%m/%Y")],
+            [xpaths.SCHEDULE_HOUR_INPUT, datetime.strftime("%I")],
+            [xpaths.SCHEDULE_MINUTE_INPUT, datetime.strftime("%M")],
+            [xpaths.SCHEDULE_PERIOD_INPUT, datetime.strftime("%p")],
+        ]
+
+    @staticmethod
+    def __is_input_value_equal(value, expected_value):
+        if value is None:
+            return False
+        if value.isdigit() and expected_value.isdigit():
+            return int(value) == int(expected_value)
+        return value.strip().upper() == expected_value.upper()
+
+    def __is_date_filled(self, state, fields):
+        return state is not None and all(
+            self.__is_input_value_equal(value, expected_value)
+            for value, (_, expected_value) in zip(state["inputs"], fields["inputs"])
+        )
+
+    @metrics.timed("mbs.fill_composer")
+    def __fill_composer(self, datetime, facebook, instagram, caption=None):
         """ """
-        schedule_date_input = WebDriverWait(self._driver, self.timeout).until(
+        self._wait_until(
             EC.element_to_be_clickable((By.XPATH, xpaths.SCHEDULE_DATE_INPUT))
         )
-        schedule_date_input.click()
-        schedule_date_input.send_keys(Keys.COMMAND + "a")
-        schedule_date_input.send_keys(datetime.strftime("%d/%m/%Y"))
 
-        schedule_hour_input = self._driver.find_element(
-            By.XPATH, xpaths.SCHEDULE_HOUR_INPUT
+        fields = {
+            "inputs": self.__get_date_inputs(datetime),
+            "placementXPath": xpaths.SCHEDULE_PLACEMENT_INPUTS,
+            "placement": [facebook, instagram],
+            "captionXPath": xpaths.SCHEDULE_CAPTION_DIV,
+            "caption": caption,
+        }
+
+        # Fill all fields in one round trip, then verify them in another
+        try:
+            self._driver.execute_script(scripts.FILL_COMPOSER, fields)
+            state = self._driver.execute_script(scripts.GET_COMPOSER_STATE, fields)
+        except WebDriverException as e:
+            print(f"Failed to fill composer, falling back to typing: {e}")
+            state = None
+
+        if not self.__is_date_filled(state, fields):
+            print("Date was not filled, falling back to typing")
+            self.__pick_date(datetime)
+
+            # Never save a date mistyped by the fallback
+            fallback_state = self._driver.execute_script(
+                scripts.GET_COMPOSER_STATE, fields
+            )
+            if not self.__is_date_filled(fallback_state, fields):
+                raise ScheduleDateError(
+                    f"Failed to fill schedule date {datetime}: {fallback_state['inputs']}"
+                )
+
+        schedule_save_button = self._driver.find_element(
+            By.XPATH, xpaths.SCHEDULE_SAVE_BUTTON
         )
-        schedule_hour_input.click()
-        schedule_hour_input.send_keys(datetime.strftime("%I"))
+        schedule_save_button.click()
+
+        if state is None or state["placement"] != [facebook, instagram]:
+            print("Placement was not selected, falling back to clicking")
+            self.__select_placement(facebook, instagram)
 
-        schedule_minute_input = self._driver.find_element(
-            By.XPATH, xpaths.SCHEDULE_MINUTE_INPUT
+        if caption is not None and (
+            state is None
+            or " ".join((state["caption"] or "").split()) != " ".join(caption.split())
+        ):
+            print("Caption was not filled, falling back to pasting")
+            self.__paste_caption(caption)
+
+    def __paste_caption(self, caption):
+        """ """
+        schedule_caption_div = self._driver.find_element(
+            By.XPATH, xpaths.SCHEDULE_CAPTION_DIV
         )
-        schedule_minute_input.click()
-        schedule_minute_input.send_keys(datetime.strftime("%M"))
+        schedule_caption_div.send_keys(CONTROL_KEY + "a")
+        clipboard = pyperclip.paste()  # Save clipboard
+        pyperclip.copy(caption)
+        schedule_caption_div.send_keys(CONTROL_KEY + "v")
+        pyperclip.copy(clipboard)  # Restore saved clipboard
 
-        schedule_period_input = self._driver.find_element(
-            By.XPATH, xpaths.SCHEDULE_PERIOD_INPUT
+    @metrics.timed("mbs.pick_date")
+    def __pick_date(self, datetime):
+        """ """
+        self._wait_until(
+            EC.element_to_be_clickable((By.XPATH, xpaths.SCHEDULE_DATE_INPUT))
         )
-        schedule_period_input.click()
-        schedule_period_input.send_keys(datetime.strftime("%p"))
 
-        schedule_save_button = self._driver.find_element(
-            By.XPATH, xpaths.SCHEDULE_SAVE_BUTTON
+        # Replace, rather than append to, the value of each input
+        for xpath, value in self.__get_date_inputs(datetime):
+            schedule_input = self._driver.find_element(By.XPATH, xpath)
+            schedule_input.click()
+            schedule_input.send_keys(CONTROL_KEY + "a")
+            schedule_input.send_keys(value)
+
+    @staticmethod
+    def __is_video_file(media_file_path):
+        return os.path.splitext(media_file_path)[1] == ".mp4"
+
+    @staticmethod
+    def __get_media_file_paths(media_dir_path):
+        def get_media_index(media_file_name):
+            media_index = os.path.splitext(media_file_name)[0]
+            return (0, int(media_index)) if media_index.isdigit() else (1, media_index)
+
+        # Media is named by its index in the original post
+        media_file_names = sorted(
+            (
+                media_file_name
+                for media_file_name in os.listdir(media_dir_path)
+                if os.path.splitext(media_file_name)[1] in (".jpg", ".mp4")
+            ),
+            key=get_media_index,
         )
-        schedule_save_button.click()
 
-    def __choose_files(self, media_dir_path):
+        return [
+            os.path.abspath(os.path.join(media_dir_path, media_file_name))
+            for media_file_name in media_file_names
+        ]
+
+    @metrics.timed("mbs.choose_files")
+    def __choose_files(self, media_dir_path, open_file_dialog, is_video=None):
         """ """
+        media_file_paths = [
+            media_file_path
+            for media_file_path in self.__get_media_file_paths(media_dir_path)
+            if is_video is None or self.__is_video_file(media_file_path) == is_video
+        ]
+
+        try:
+            if self.__send_files(media_file_paths, is_video):
+                return
+            print("No file input found, falling back to the file dialog")
+        except WebDriverException as e:
+            print(f"Failed to send files, falling back to the file dialog: {e}")
+
+        open_file_dialog()
+        self.__select_files_in_dialog(media_dir_path)
+
+    def __send_files(self, media_file_paths, is_video):
+        file_inputs = self._driver.find_elements(By.XPATH, xpaths.SCHEDULE_FILE_INPUTS)
+        if len(file_inputs) == 0:
+            return False
+
+        # Prefer the latest input accepting the media type
+        if is_video is not None:
+            media_type = "video/" if is_video else "image/"
+            file_inputs = [
+                file_input
+                for file_input in file_inputs
+                if media_type in (file_input.get_attribute("accept") or "")
+            ] or file_inputs
+
+        # Send all files in one command
+        file_inputs[-1].send_keys("\n".join(media_file_paths))
+
+        print(f"Successfully sent {len(media_file_paths)} file(s)")
+
+        return True
+
+    def __select_files_in_dialog(self, media_dir_path):
         choose_files_script = osascripts.SELECT_FILES_SCRIPT
 
         subprocess.run(
@@ -266,10 +442,12 @@ class MBSWebDriver(BaseWebDriver):
             check=True,
         )
 
+    @metrics.timed("mbs.publish_schedule")
     def __publish_schedule(self):
         """ """
-        schedule_publish_div = WebDriverWait(self._driver, self.upload_timeout).until(
-            EC.element_to_be_clickable((By.XPATH, xpaths.SCHEDULE_PUBLISH_DIV))
+        schedule_publish_div = self._wait_until(
+            EC.element_to_be_clickable((By.XPATH, xpaths.SCHEDULE_PUBLISH_DIV)),
+            self.upload_timeout,
         )
         schedule_publish_div.click()
 
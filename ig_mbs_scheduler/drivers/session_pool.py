@@ -0,0 +1,236 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SessionPool:
+    """
+    A pool of interchangeable browser sessions, of which one is leased at a time.
+
+    The leased session is recycled (stopped, and replaced by a new one) after a maximum
+    number of operations, or when it fails a health check. Sessions that share no state
+    are stopped in the background, and a replacement session can be pre-warmed shortly
+    before it is needed, so recycling does not wait for a browser to stop or start.
+
+    Parameters
+    ----------
+    start_session : callable
+        Called to start a new session, and returns it.
+    stop_session : callable
+        Called with a session to stop it.
+    check_session : callable
+        Called with a session, and returns whether it is healthy. Raises if the session
+        is unresponsive.
+    max_operations : int, optional
+        The number of operations after which the leased session is recycled. If not
+        specified, sessions are only recycled when unhealthy.
+    health_check_interval : int, optional
+        The number of operations between health checks of the leased session. If not
+        specified, sessions are only checked with `check`.
+    prewarm : bool, default=False
+        Whether to start a replacement session in the background, once the leased
+        session is within `prewarm_operations` of `max_operations`, or fails a health
+        check while still responsive. An unhealthy session is then used until its
+        replacement has started. The sessions must not share state, such as a browser
+        profile.
+    prewarm_operations : int, default=3
+        The number of operations before `max_operations` at which to pre-warm the
+        replacement session.
+    isolated : bool, default=False
+        Whether sessions share no state, such as a browser profile. A recycled session
+        is stopped in the background if isolated, and before its replacement is started
+        otherwise.
+
+    Attributes
+    ----------
+    max_operations : int or None
+        The number of operations after which the leased session is recycled.
+    health_check_interval : int or None
+        The number of operations between health checks of the leased session.
+    prewarm : bool
+        Whether to start a replacement session in the background.
+    prewarm_operations : int
+        The number of operations before `max_operations` at which to pre-warm the
+        replacement session.
+    isolated : bool
+        Whether sessions share no state.
+    recycle_count : int
+        The number of recycled sessions.
+    """
+
+    def __init__(
+        self,
+        start_session,
+        stop_session,
+        check_session,
+        max_operations=None,
+        health_check_interval=None,
+        prewarm=False,
+        isolated=False,
+        prewarm_operations=3,
+    ):
+        self.max_operations = max_operations
+        self.health_check_interval = health_check_interval
+        self.prewarm = prewarm
+        self.prewarm_operations = prewarm_operations
+        self.isolated = isolated
+        self.recycle_count = 0
+
+        self.__start_session = start_session
+        self.__stop_session = stop_session
+        self.__check_session = check_session
+        self.__session = None
+        self.__spare_session = None
+        self.__is_unhealthy = False
+        self.__operation_count = 0
+        self.__executor = ThreadPoolExecutor(1, thread_name_prefix="session-pool")
+
+    @property
+    def session(self):
+        """
+        object or None : The leased session, or `None` if none has been started.
+        """
+        return self.__session
+
+    def __stop(self, session):
+        try:
+            self.__stop_session(session)
+        except Exception as e:
+            print(f"Failed to stop session: {e}")
+
+    def __start(self):
+        if self.__spare_session is not None:
+            spare_session, self.__spare_session = self.__spare_session, None
+            try:
+                self.__session = spare_session.result()
+            except Exception as e:
+                print(f"Failed to pre-warm session, starting a new one: {e}")
+                self.__session = self.__start_session()
+        else:
+            self.__session = self.__start_session()
+
+        self.__is_unhealthy = False
+        self.__operation_count = 0
+
+    def __start_spare(self):
+        if self.__spare_session is None:
+            print("Pre-warming replacement session")
+            self.__spare_session = self.__executor.submit(self.__start_session)
+
+    def get(self):
+        """
+        Get the leased session, starting one if needed.
+
+        Returns
+        -------
+        object
+            The leased session.
+        """
+        if self.__session is None:
+            self.__start()
+
+        return self.__session
+
+    def lease(self):
+        """
+        Get the leased session for an operation, recycling it first if it has reached
+        its maximum number of operations, or fails its periodic health check.
+
+        Returns
+        -------
+        object
+            The leased session.
+        """
+        if self.__session is not None:
+            if (
+                self.max_operations is not None
+                and self.__operation_count >= self.max_operations
+            ):
+                print(f"Session reached {self.__operation_count} operations")
+                self.recycle()
+            elif self.__is_unhealthy and self.__spare_session.done():
+                self.recycle()
+            elif (
+                self.health_check_interval is not None
+                and self.__operation_count > 0
+                and self.__operation_count % self.health_check_interval == 0
+            ):
+                self.check()
+
+        session = self.get()
+        self.__operation_count += 1
+
+        if (
+            self.prewarm
+            and self.max_operations is not None
+            and self.__operation_count >= self.max_operations - self.prewarm_operations
+        ):
+            self.__start_spare()
+
+        return session
+
+    def check(self):
+        """
+        Check the health of the leased session, and recycle it if unhealthy.
+
+        Returns
+        -------
+        bool
+            Whether the leased session was healthy.
+        """
+        if self.__session is None:
+            return True
+
+        try:
+            is_healthy = self.__check_session(self.__session)
+            is_responsive = True
+        except Exception as e:
+            print(f"Session health check failed: {e}")
+            is_healthy = False
+            is_responsive = False
+
+        if not is_healthy:
+            if self.prewarm and is_responsive:
+                # Keep using the session until its replacement has started
+                print("Session is unhealthy, replacing it once pre-warmed")
+                self.__is_unhealthy = True
+                self.__start_spare()
+            else:
+                print("Session is unhealthy")
+                self.recycle()
+
+        return is_healthy
+
+    def recycle(self):
+        """
+        Stop the leased session, and replace it.
+        """
+        if self.__session is not None:
+            session, self.__session = self.__session, None
+            # Sessions sharing a browser profile cannot run at the same time
+            if self.isolated:
+                self.__executor.submit(self.__stop, session)
+            else:
+                self.__stop(session)
+
+        self.__start()
+        self.recycle_count += 1
+
+        print(f"Successfully recycled session (recycle count: {self.recycle_count})")
+
+    def close(self):
+        """
+        Stop all sessions.
+        """
+        if self.__spare_session is not None:
+            spare_session, self.__spare_session = self.__spare_session, None
+            try:
+                self.__stop(spare_session.result())
+            except Exception as e:
+                print(f"Failed to pre-warm session: {e}")
+
+        if self.__session is not None:
+            session, self.__session = self.__session, None
+            self.__stop(session)
+
+        # Wait for sessions stopping in the background
+        self.__executor.shutdown(wait=True)
+        self.__executor = ThreadPoolExecutor(1, thread_name_prefix="session-pool")
@@ -0,0 +1,318 @@
+import contextlib
+import os
+import re
+import shutil
+import threading
+import time
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+
+class IncompleteDownloadError(Exception):
+    """
+    Raised when a download does not match its expected length after all resume
+    attempts.
+    """
+
+
+class ConnectionCountingAdapter(HTTPAdapter):
+    """
+    An HTTP adapter counting the connections it opens, including reconnections of
+    broken connections, across all of its connection pools.
+
+    Parameters
+    ----------
+    *args, **kwargs
+        Arguments passed to `requests.adapters.HTTPAdapter`.
+
+    Attributes
+    ----------
+    connection_count : int
+        The number of connections opened.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.connection_count = 0
+        self.__lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def record_connection(self):
+        """
+        Count an opened connection.
+        """
+        with self.__lock:
+            self.connection_count += 1
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        adapter = self
+
+        def create_counting_pool_class(pool_class):
+            class CountingConnection(pool_class.ConnectionCls):
+                def connect(self):
+                    adapter.record_connection()
+                    return super().connect()
+
+            return type(
+                pool_class.__name__,
+                (pool_class,),
+                {"ConnectionCls": CountingConnection},
+            )
+
+        # Count at the connection level, since pools reconnect broken connections in
+        # place, and may be discarded by the pool manager
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: create_counting_pool_class(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class HTTPClient:
+    """
+    A pooled HTTP client for downloading media, safe to share between threads.
+
+    Downloads are streamed to disk in chunks, resumed with range requests when
+    interrupted, and verified against the expected content length.
+
+    Parameters
+    ----------
+    pool_size : int, default=10
+        The maximum number of connections to keep alive per host.
+    timeout : int, default=30
+        The maximum duration (seconds) to wait for the server to send data.
+    chunk_size : int, default=65536
+        The size (bytes) of chunks written to disk.
+    max_resume_attempts : int, default=3
+        The maximum number of times to resume an interrupted download.
+
+    Attributes
+    ----------
+    timeout : int
+        The maximum duration (seconds) to wait for the server to send data.
+    chunk_size : int
+        The size (bytes) of chunks written to disk.
+    max_resume_attempts : int
+        The maximum number of times to resume an interrupted download.
+    """
+
+    def __init__(
+        self, pool_size=10, timeout=30, chunk_size=65536, max_resume_attempts=3
+    ):
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_resume_attempts = max_resume_attempts
+
+        self.__adapter = ConnectionCountingAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.__session = requests.Session()
+        self.__session.mount("http://", self.__adapter)
+        self.__session.mount("https://", self.__adapter)
+
+        self.__lock = threading.Lock()
+        self.__request_count = 0
+        self.__resume_count = 0
+        self.__byte_count = 0
+        self.__total_request_time = 0.0
+        self.__max_request_time = 0.0
+
+    @property
+    def session(self):
+        """
+        requests.Session : The pooled session used for all requests.
+        """
+        return self.__session
+
+    def __record_request(self, request_time, byte_count):
+        with self.__lock:
+            self.__request_count += 1
+            self.__byte_count += byte_count
+            self.__total_request_time += request_time
+            self.__max_request_time = max(self.__max_request_time, request_time)
+
+    def get(self, url, **kwargs):
+        """
+        Send a GET request through the pooled session.
+
+        Parameters
+        ----------
+        url : str
+            The URL to request.
+        **kwargs
+            Extra keyword arguments passed to `requests.Session.get`.
+
+        Returns
+        -------
+        requests.Response
+            The response, with its content already read.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        start_time = time.perf_counter()
+        response = self.__session.get(url, **kwargs)
+        self.__record_request(time.perf_counter() - start_time, len(response.content))
+
+        return response
+
+    def __get_expected_length(self, response, offset):
+        content_range = response.headers.get("Content-Range")
+        if content_range is not None:
+            content_range_match = re.search(r"/(\d+)$", content_range)
+            if content_range_match:
+                return int(content_range_match.group(1))
+
+        content_length = response.headers.get("Content-Length")
+        if content_length is None:
+            return None
+
+        return offset + int(content_length)
+
+    def download(self, url, out_file_path, partial_file_path=None):
+        """
+        Download a URL to a file.
+
+        The response is streamed to a partial file, which is resumed with a range
+        request if the connection is interrupted, and only moved to `out_file_path`
+        once its length matches the server's reported length. A partial file left by
+        an earlier call is resumed too, so passing a stable `partial_file_path` lets
+        retries resume where a failed download stopped.
+
+        Parameters
+        ----------
+        url : str
+            The URL to download.
+        out_file_path : str
+            The file path to download to.
+        partial_file_path : str, optional
+            The file path to stream the download to. If not specified,
+            "<out_file_path>.part" is used.
+
+        Returns
+        -------
+        int
+            The size (bytes) of the downloaded file.
+
+        Raises
+        ------
+        IncompleteDownloadError
+            If the downloaded file does not match its expected length after all resume
+            attempts.
+        """
+        partial_file_path = partial_file_path or f"{out_file_path}.part"
+        expected_length = None
+
+        for _ in range(self.max_resume_attempts + 1):
+            offset = (
+                os.path.getsize(partial_file_path)
+                if os.path.exists(partial_file_path)
+                else 0
+            )
+            headers = {"Accept-Encoding": "identity"}
+            if offset > 0:
+                headers["Range"] = f"bytes={offset}-"
+                with self.__lock:
+                    self.__resume_count += 1
+                print(f"Resuming download from byte {offset} ({url})")
+
+            start_time = time.perf_counter()
+            received_length = 0
+            try:
+                with self.__session.get(
+                    url, headers=headers, stream=True, timeout=self.timeout
+                ) as response:
+                    if response.status_code == 416:  # Range not satisfiable
+                        # The partial file may already be complete, as reported by
+                        # the total length of the content range
+                        content_range = response.headers.get("Content-Range", "")
+                        if content_range == f"bytes */{offset}":
+                            shutil.move(partial_file_path, out_file_path)
+                            return offset
+
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(partial_file_path)
+                        continue
+                    response.raise_for_status()
+
+                    if offset > 0 and response.status_code != 206:
+                        print(f"Server ignored range request, restarting ({url})")
+                        offset = 0
+
+                    expected_length = self.__get_expected_length(response, offset)
+
+                    with open(partial_file_path, "ab" if offset > 0 else "wb") as file:
+                        for chunk in response.raw.stream(
+                            self.chunk_size, decode_content=False
+                        ):
+                            file.write(chunk)
+                            received_length += len(chunk)
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout,
+                urllib3.exceptions.HTTPError,
+            ) as e:
+                print(f"Download interrupted ({url}): {e}")
+                continue
+            finally:
+                self.__record_request(time.perf_counter() - start_time, received_length)
+
+            downloaded_length = os.path.getsize(partial_file_path)
+            if expected_length is None or downloaded_length == expected_length:
+                shutil.move(partial_file_path, out_file_path)
+                return downloaded_length
+
+            if downloaded_length > expected_length:
+                os.remove(partial_file_path)
+
+            print(f"Downloaded {downloaded_length} of {expected_length} bytes ({url})")
+
+        raise IncompleteDownloadError(
+            f"Downloaded file does not match expected length of {expected_length} bytes after {self.max_resume_attempts} resume attempt(s) ({url})"
+        )
+
+    def get_stats(self):
+        """
+        Get the request counters of the client.
+
+        Returns
+        -------
+        dict
+            The number of requests, resumed downloads, connections opened and reused,
+            bytes received, and total and maximum request time (seconds).
+        """
+        connection_count = self.__adapter.connection_count
+
+        with self.__lock:
+            return {
+                "requests": self.__request_count,
+                "resumes": self.__resume_count,
+                "connections_opened": connection_count,
+                "connections_reused": max(self.__request_count - connection_count, 0),
+                "bytes": self.__byte_count,
+                "total_request_time": self.__total_request_time,
+                "max_request_time": self.__max_request_time,
+            }
+
+
+__default_client = None
+__default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """
+    Get the HTTP client shared by the scheduler's media I/O.
+
+    Returns
+    -------
+    HTTPClient
+        The shared HTTP client of the current process.
+    """
+    global __default_client
+
+    with __default_client_lock:
+        if __default_client is None:
+            __default_client = HTTPClient()
+
+        return __default_client
@@ -1,20 +1,51 @@
 import click
+import contextlib
+import os
 import random
+import signal
 import tempfile
-import time
-from copy import deepcopy
+from collections import namedtuple
 from croniter import croniter, CroniterBadCronError
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from datetime import datetime, timedelta
+from selenium.common.exceptions import TimeoutException
 
-from ig_mbs_scheduler import utils
+from ig_mbs_scheduler import (
+    http_client,
+    media_index,
+    metrics,
+    planner,
+    preprocess,
+    utils,
+)
 from ig_mbs_scheduler.drivers.ig.ig_driver import IGWebDriver
 from ig_mbs_scheduler.drivers.mbs.mbs_driver import MBSWebDriver
+from ig_mbs_scheduler.ledger import ScheduleLedger
+from ig_mbs_scheduler.media_cache import MediaCache
+from ig_mbs_scheduler.media_index import MediaHashIndex
+from ig_mbs_scheduler.pipeline import Pipeline, retry, wait_before_retry
+from ig_mbs_scheduler.planner import SlotAllocator
+from ig_mbs_scheduler.profiler import SamplingProfiler
 
 
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 
 
+PrefetchOptions = namedtuple(
+    "PrefetchOptions", ["size", "concurrency", "rate", "burst", "item_urls"]
+)
+ScheduleItem = namedtuple(
+    "ScheduleItem",
+    [
+        "collection_name",
+        "post",
+        "media_dir",
+        "final_caption",
+        "bytes_saved",
+        "media_hashes",
+    ],
+)
+
+
 def __validate_cron_spec(ctx, param, value):
     try:
         return croniter(value)
@@ -22,6 +53,222 @@ def __validate_cron_spec(ctx, param, value):
         raise click.BadParameter(e)
 
 
+def __create_slot_allocators(
+    ledger,
+    post_cron_spec,
+    post_cron_variability,
+    story_cron_spec,
+    story_cron_variability,
+    min_spacing,
+    seed,
+):
+    now = datetime.now()
+
+    return tuple(
+        SlotAllocator(
+            cron_spec,
+            variability,
+            ledger.get_scheduled_dates(kind, after=now),
+            seed,
+            now,
+            min_spacing,
+            kind,
+        )
+        for kind, cron_spec, variability in (
+            ("post", post_cron_spec, post_cron_variability),
+            ("story", story_cron_spec, story_cron_variability),
+        )
+    )
+
+
+def __pick_prefetched_post_url(ig_driver, excluded_post_urls, prefetched_item_urls):
+    # Prefetched item URLs are a random sample of the collection, so picking from them
+    # is as fair as picking from the whole collection
+    available_item_urls = [
+        prefetched_item_url
+        for prefetched_item_url in prefetched_item_urls
+        if prefetched_item_url not in excluded_post_urls
+        and ig_driver.is_post_cached(prefetched_item_url)
+    ]
+    if len(available_item_urls) == 0:
+        return None
+
+    random_item_url = random.choice(available_item_urls)
+    prefetched_item_urls.remove(random_item_url)
+
+    return random_item_url
+
+
+def __pick_post_url(ig_driver, ignore, excluded_post_urls, prefetch_options):
+    collection_names = [
+        collection_name
+        for collection_name in ig_driver.get_saved_collection_names()
+        if collection_name not in ignore
+    ]
+
+    while len(collection_names) > 0:
+        random_collection_name = random.choice(collection_names)
+
+        if prefetch_options.size > 0:
+            prefetched_item_urls = prefetch_options.item_urls.setdefault(
+                random_collection_name, set()
+            )
+            random_item_url = __pick_prefetched_post_url(
+                ig_driver, excluded_post_urls, prefetched_item_urls
+            )
+            if random_item_url is not None:
+                return random_collection_name, random_item_url
+
+        # Pick fairly across the collection, without materializing it, and skip posts
+        # already being scheduled. Collections too large for the inventory are scrolled
+        # through on every pick, so only their first items are scanned. Scanning one
+        # item past the limit lets smaller collections be iterated to their end, and
+        # inventoried.
+        random_item_urls = utils.reservoir_sample(
+            (
+                collection_item_url
+                for collection_item_url in ig_driver.iter_collection_item_urls(
+                    random_collection_name
+                )
+                if collection_item_url not in excluded_post_urls
+            ),
+            max(prefetch_options.size, 1),
+            max_items=ig_driver.inventory_max_items + 1,
+        )
+
+        if len(random_item_urls) > 0:
+            random_item_url = random.choice(random_item_urls)
+
+            if prefetch_options.size > 0:
+                # Prefetch the other sampled items, for the next picks
+                ig_driver.prefetch_posts(
+                    random_item_urls,
+                    prefetch_options.concurrency,
+                    prefetch_options.rate,
+                    prefetch_options.burst,
+                )
+                random_item_urls.remove(random_item_url)
+                prefetched_item_urls.update(random_item_urls)
+
+            return random_collection_name, random_item_url
+
+        # Delete collection if empty, rather than only out of available items
+        if ig_driver.is_collection_empty(random_collection_name):
+            ig_driver.delete_collection(random_collection_name)
+        collection_names.remove(random_collection_name)
+
+    return None
+
+
+def __prepare_item(
+    ig_driver,
+    ignore,
+    excluded_post_urls,
+    caption_template,
+    hashtags,
+    download_concurrency,
+    media_cache,
+    prefetch_options,
+    preprocess_options,
+    post_target_width,
+    story_target_width,
+    media_hash_index,
+    in_flight_media=(),
+):
+    excluded_post_urls = set(excluded_post_urls)
+
+    while True:
+        # Get random post
+        random_post = __pick_post_url(
+            ig_driver, ignore, excluded_post_urls, prefetch_options
+        )
+        if random_post is None:
+            return None
+        random_collection_name, random_collection_item_url = random_post
+
+        # Get post content
+        post = ig_driver.get_post(random_collection_item_url)
+
+        final_caption = utils.create_final_caption(
+            random_collection_name,
+            post.caption,
+            post.user,
+            caption_template,
+            set(hashtags),
+        )
+
+        # Select the smallest renditions that meet the target resolution
+        media_selections = post.select_media(
+            story_target_width if final_caption is None else post_target_width
+        )
+
+        media_dir = tempfile.TemporaryDirectory()
+        try:
+            utils.download_media(
+                [selected.url for selected, _ in media_selections],
+                media_dir.name,
+                download_concurrency,
+                media_cache,
+            )
+            bytes_saved = utils.estimate_bytes_saved(media_dir.name, media_selections)
+
+            # Look up the downloaded media among already scheduled media, and media
+            # being scheduled
+            if media_hash_index is not None:
+                media_hashes = media_index.hash_media(media_dir.name)
+                duplicate_post_url = media_hash_index.find(
+                    media_hashes, in_flight_media
+                )
+            else:
+                media_hashes = []
+                duplicate_post_url = None
+
+            # Make media compliant with MBS before uploading it
+            if duplicate_post_url is None and preprocess_options is not None:
+                preprocess.preprocess_media(
+                    media_dir.name,
+                    download_concurrency,
+                    is_story=final_caption is None,
+                    **preprocess_options,
+                )
+        except BaseException:
+            media_dir.cleanup()
+            raise
+
+        if duplicate_post_url is None:
+            return ScheduleItem(
+                random_collection_name,
+                post,
+                media_dir,
+                final_caption,
+                bytes_saved,
+                media_hashes,
+            )
+
+        # Unsave duplicate post, so it is never picked again
+        print(
+            f"Skipping duplicate of already scheduled post ({post.url}, {duplicate_post_url})"
+        )
+        media_dir.cleanup()
+        ig_driver.unsave_post(post.url)
+        excluded_post_urls.add(post.url)
+
+        # Delete collection if empty
+        if ig_driver.is_collection_empty(random_collection_name):
+            ig_driver.delete_collection(random_collection_name)
+
+
+def __finalize_item(ig_driver, item):
+    # Unsave and like post
+    ig_driver.unsave_and_like_post(item.post.url)
+
+    # Delete collection if empty
+    if ig_driver.is_collection_empty(item.collection_name):
+        ig_driver.delete_collection(item.collection_name)
+
+    item.media_dir.cleanup()
+
+
 @click.command(context_settings=CONTEXT_SETTINGS)
 @click.version_option(None, "-v", "--version")
 @click.argument("ig-username")
@@ -88,11 +335,232 @@ def __validate_cron_spec(ctx, param, value):
     default=0,
     help="A random time offset (minutes) for the story cron specification. For example, a value of 10 would randomly add +/- 10 minutes to each iteration of the story cron specificartion.",
 )
+@click.option(
+    "--min-spacing",
+    show_default=True,
+    type=click.IntRange(0),
+    default=0,
+    help="Minimum time (minutes) between a new post or story and any already scheduled post or story of the same kind.",
+)
+@click.option(
+    "--browser-binary",
+    "-b",
+    help="Path of the Chromium based browser binary. If not specified, Brave, Chromium or Google Chrome is discovered.",
+)
+@click.option(
+    "--headless",
+    is_flag=True,
+    help="Run the browsers without a window.",
+)
+@click.option(
+    "--scratch-profile",
+    is_flag=True,
+    help="Run the browsers on scratch copies of their profiles (on tmpfs, where available), for faster startup. Changes to the profiles during the run are discarded.",
+)
+@click.option(
+    "--recycle-after",
+    type=click.IntRange(1),
+    help="Number of page loads after which a browser session is replaced by a new one. If not specified, browser sessions are only replaced when unhealthy.",
+)
+@click.option(
+    "--max-memory",
+    type=click.IntRange(1),
+    help="JavaScript heap size (MB) above which a browser session is considered unhealthy, and replaced by a new one.",
+)
+@click.option(
+    "--prewarm",
+    is_flag=True,
+    help="Start replacement browser sessions in the background a few page loads before '--recycle-after', or once a browser exceeds '--max-memory', so replacing a session does not wait for a browser to start. Requires '--scratch-profile'.",
+)
+@click.option(
+    "--inventory-ttl",
+    "-it",
+    type=click.IntRange(1),
+    help="Duration (seconds) after which saved collections are scraped again. If not specified, saved collections are only scraped once per run.",
+)
+@click.option(
+    "--inventory-max-items",
+    type=click.IntRange(0),
+    default=1000,
+    show_default=True,
+    help="Maximum number of items of a saved collection to keep in memory. Larger collections are scrolled through again on every pick, up to this number of items, and only their first items are picked from.",
+)
+@click.option(
+    "--metadata-backend",
+    type=click.Choice(["browser", "http"]),
+    default="browser",
+    show_default=True,
+    help="How to get post metadata. 'browser' parses it from the post page. 'http' fetches it as JSON with the cookies of the Instagram browser session, falling back to the post page on failure.",
+)
+@click.option(
+    "--prefetch-size",
+    type=click.IntRange(0),
+    default=0,
+    show_default=True,
+    help="Number of random posts of a collection whose metadata is fetched concurrently when it is first picked, to serve later picks from memory. Requires '--metadata-backend http'. 0 disables prefetching.",
+)
+@click.option(
+    "--prefetch-concurrency",
+    type=click.IntRange(1),
+    default=8,
+    show_default=True,
+    help="Maximum number of concurrent post metadata requests when prefetching.",
+)
+@click.option(
+    "--prefetch-rate",
+    type=click.FloatRange(0, min_open=True),
+    default=2,
+    show_default=True,
+    help="Maximum number of post metadata requests per second when prefetching, across all requests.",
+)
+@click.option(
+    "--prefetch-burst",
+    type=click.IntRange(1),
+    default=1,
+    show_default=True,
+    help="Maximum number of post metadata requests sent at once when prefetching, ahead of '--prefetch-rate'.",
+)
+@click.option(
+    "--download-concurrency",
+    "-dc",
+    type=click.IntRange(1),
+    default=1,
+    show_default=True,
+    help="Maximum number of carousel items to download concurrently.",
+)
+@click.option(
+    "--post-target-width",
+    type=click.IntRange(0),
+    default=1080,
+    show_default=True,
+    help="Target width (pixels) of downloaded post media. The smallest rendition at least this wide is downloaded. Pass 0 to always download the largest rendition.",
+)
+@click.option(
+    "--story-target-width",
+    type=click.IntRange(0),
+    default=1080,
+    show_default=True,
+    help="Target width (pixels) of downloaded story media. The smallest rendition at least this wide is downloaded. Pass 0 to always download the largest rendition.",
+)
+@click.option(
+    "--preprocess/--no-preprocess",
+    "preprocess_media",
+    default=False,
+    show_default=True,
+    help="Crop and scale down photos, and trim, scale down and re-encode videos, that exceed the limits of MBS before uploading them. Requires ffmpeg.",
+)
+@click.option(
+    "--max-video-duration",
+    type=click.IntRange(1),
+    default=preprocess.VIDEO_MAX_DURATION,
+    show_default=True,
+    help="Maximum duration (seconds) of uploaded videos, when preprocessing.",
+)
+@click.option(
+    "--max-video-bitrate",
+    type=click.IntRange(1),
+    default=preprocess.VIDEO_MAX_BITRATE,
+    show_default=True,
+    help="Maximum bitrate (kbit/s) of uploaded videos, when preprocessing.",
+)
+@click.option(
+    "--cache-dir",
+    default="~/.ig-mbs-scheduler/cache",
+    show_default=True,
+    help="Directory in which to cache downloaded and transformed media across retries and runs. Interrupted downloads are kept there too, and resumed by the next retry.",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(0),
+    default=1024,
+    show_default=True,
+    help="Maximum size (megabytes) of the media cache. A value of 0 disables the media cache.",
+)
+@click.option(
+    "--pipeline-depth",
+    "-pd",
+    type=click.IntRange(0),
+    default=0,
+    show_default=True,
+    help="Number of posts to scrape and download ahead, while the current post is scheduled on MBS. A value of 0 disables pipelining.",
+)
+@click.option(
+    "--ledger-dir",
+    default="~/.ig-mbs-scheduler/ledger",
+    show_default=True,
+    help="Directory of the local ledgers recording scheduled posts and stories, one per MBS asset.",
+)
+@click.option(
+    "--dedupe/--no-dedupe",
+    default=False,
+    show_default=True,
+    help="Skip and unsave posts whose media is a near-duplicate of already scheduled media, or of media being scheduled, looked up in a local index of perceptual hashes (one per MBS asset, in the ledger directory). Requires ffmpeg.",
+)
+@click.option(
+    "--dedupe-distance",
+    type=click.IntRange(0, 16),
+    default=4,
+    show_default=True,
+    help="Maximum number of differing bits between the 64-bit perceptual hashes of near-duplicate media.",
+)
+@click.option(
+    "--reconcile-interval",
+    type=click.IntRange(0),
+    default=24,
+    show_default=True,
+    help="Interval (hours) at which the ledger is reconciled with the dates scheduled on MBS. A value of 0 reconciles on every run.",
+)
+@click.option(
+    "--reconcile",
+    is_flag=True,
+    help="Reconcile the ledger with the dates scheduled on MBS, regardless of --reconcile-interval.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    help="Seed for the random time offsets of the post and story cron specifications. Runs with the same seed and scheduled dates plan the same slots.",
+)
+@click.option(
+    "--dry-run",
+    "-n",
+    is_flag=True,
+    help="Print the planned post and story slots without starting any web driver.",
+)
+@click.option(
+    "--plan-format",
+    type=click.Choice(["csv", "json"]),
+    default="csv",
+    show_default=True,
+    help="Format of the planned slots printed by --dry-run.",
+)
+@click.option(
+    "--plan-output",
+    type=click.File("w"),
+    default="-",
+    help="File to write the planned slots of --dry-run to. Defaults to standard output.",
+)
+@click.option(
+    "--metrics-output",
+    type=click.File("w"),
+    help="File to write the latency metrics of every driver operation, download and pipeline stage to at the end of the run. Metrics are also printed on SIGUSR1.",
+)
+@click.option(
+    "--metrics-format",
+    type=click.Choice(["json", "prometheus"]),
+    default="json",
+    show_default=True,
+    help="Format of the latency metrics.",
+)
+@click.option(
+    "--profile",
+    type=click.File("w"),
+    help="Run the scheduler under a sampling profiler, and write the sampled call stacks to this file in the collapsed stack (flame graph) format.",
+)
 @click.option(
     "--amount",
     "-a",
     type=click.IntRange(1),
-    help="Number of posts to schedule. If not specified, all posts will be scheduled.",
+    help="Number of posts to schedule. If not specified, all posts will be scheduled (or 10 slots planned with --dry-run).",
 )
 def cli(
     ig_username,
@@ -108,129 +576,286 @@ def cli(
     prefer_video,
     post_cron_variability,
     story_cron_variability,
+    min_spacing,
+    browser_binary,
+    headless,
+    scratch_profile,
+    recycle_after,
+    max_memory,
+    prewarm,
+    inventory_ttl,
+    inventory_max_items,
+    metadata_backend,
+    prefetch_size,
+    prefetch_concurrency,
+    prefetch_rate,
+    prefetch_burst,
+    download_concurrency,
+    post_target_width,
+    story_target_width,
+    preprocess_media,
+    max_video_duration,
+    max_video_bitrate,
+    cache_dir,
+    cache_size,
+    pipeline_depth,
+    ledger_dir,
+    dedupe,
+    dedupe_distance,
+    reconcile_interval,
+    reconcile,
+    seed,
+    dry_run,
+    plan_format,
+    plan_output,
+    metrics_output,
+    metrics_format,
+    profile,
     amount,
 ):
     """
     A tool for scraping saved posts from Instagram, and scheduling them on Meta Business Suite.
+
+    When invoked with `standalone_mode=False`, returns a summary of the run.
     """
-    with IGWebDriver(ig_username, timeout) as ig_driver, MBSWebDriver(
+    ctx = click.get_current_context()
+
+    if profile is not None:
+        profiler = SamplingProfiler()
+        profiler.start()
+
+        def write_profile():
+            profiler.stop()
+            profiler.write(profile)
+
+        ctx.call_on_close(write_profile)
+
+    if metrics_output is not None:
+        ctx.call_on_close(
+            lambda: metrics_output.write(metrics.REGISTRY.export(metrics_format))
+        )
+
+    # Print metrics on demand
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(
+            signal.SIGUSR1,
+            lambda signum, frame: print(metrics.REGISTRY.export(metrics_format)),
+        )
+
+    ledger_path = os.path.join(ledger_dir, f"{mbs_asset_id}.sqlite3")
+    media_index_path = os.path.join(ledger_dir, f"{mbs_asset_id}.media.sqlite3")
+
+    if dry_run:
+        # Preview slots without starting any web driver
+        with ScheduleLedger(ledger_path) as ledger:
+            post_allocator, story_allocator = __create_slot_allocators(
+                ledger,
+                post_cron_spec,
+                post_cron_variability,
+                story_cron_spec,
+                story_cron_variability,
+                min_spacing,
+                seed,
+            )
+            slots = planner.plan(post_allocator, story_allocator, amount or 10)
+        planner.export_plan(slots, plan_output, plan_format)
+        return {"planned_count": len(slots)}
+
+    media_cache = MediaCache(cache_dir, cache_size * 1024**2) if cache_size else None
+
+    preprocess_options = (
+        dict(
+            max_video_duration=max_video_duration,
+            max_video_bitrate=max_video_bitrate,
+        )
+        if preprocess_media
+        else None
+    )
+
+    # Prefetched item URLs not yet picked, by collection name
+    prefetch_options = PrefetchOptions(
+        prefetch_size, prefetch_concurrency, prefetch_rate, prefetch_burst, {}
+    )
+
+    if prewarm and not scratch_profile:
+        raise click.UsageError("'--prewarm' requires '--scratch-profile'")
+
+    browser_options = dict(
+        browser_binary=browser_binary,
+        headless=headless,
+        scratch_profile=scratch_profile,
+        max_operations=recycle_after,
+        max_memory=max_memory,
+        prewarm=prewarm,
+    )
+
+    with ScheduleLedger(ledger_path) as ledger, (
+        MediaHashIndex(media_index_path, dedupe_distance)
+        if dedupe
+        else contextlib.nullcontext()
+    ) as media_hash_index, IGWebDriver(
+        ig_username,
+        timeout,
+        inventory_ttl=inventory_ttl,
+        post_cache_size=max(128, prefetch_size * 2),
+        inventory_max_items=inventory_max_items,
+        metadata_backend=metadata_backend,
+        **browser_options,
+    ) as ig_driver, MBSWebDriver(
         mbs_session_id,
         mbs_asset_id,
         prefer_video,
         upload_timeout,
         timeout,
+        **browser_options,
     ) as mbs_driver:
-        # Set up post cron schedule
-        scheduled_post_dates = mbs_driver.get_scheduled_post_dates()
-        latest_scheduled_post_date = (
-            datetime.now()
-            if len(scheduled_post_dates) == 0
-            else scheduled_post_dates[-1]
-        )
-        next_available_post_date = max(
-            datetime.now() + relativedelta(minutes=21),
-            latest_scheduled_post_date,
-        )
-        post_cron_base_date = next_available_post_date + relativedelta(
-            minutes=post_cron_variability
-        )
-        post_cron_spec.set_current(post_cron_base_date)
-
-        # Set up story cron schedule
-        scheduled_story_dates = mbs_driver.get_scheduled_story_dates()
-        latest_scheduled_story_date = (
-            datetime.now()
-            if len(scheduled_story_dates) == 0
-            else scheduled_story_dates[-1]
-        )
-        next_available_story_date = max(
-            datetime.now() + relativedelta(minutes=21),
-            latest_scheduled_story_date,
-        )
-        story_cron_base_date = next_available_story_date + relativedelta(
-            minutes=story_cron_variability
+        # Only scrape scheduled dates from MBS when reconciliation is due
+        if reconcile or ledger.is_reconciliation_due(
+            timedelta(hours=reconcile_interval)
+        ):
+            # A partially read list would remove valid items from the ledger
+            try:
+                ledger.reconcile("post", mbs_driver.get_scheduled_post_dates())
+                ledger.reconcile("story", mbs_driver.get_scheduled_story_dates())
+            except TimeoutException:
+                print("Timed out reading scheduled dates, skipping reconciliation")
+
+        # Set up post and story schedules
+        post_allocator, story_allocator = __create_slot_allocators(
+            ledger,
+            post_cron_spec,
+            post_cron_variability,
+            story_cron_spec,
+            story_cron_variability,
+            min_spacing,
+            seed,
         )
-        story_cron_spec.set_current(story_cron_base_date)
 
-        schedule_count = 0
-        retry_count = 0
-        while schedule_count < amount if amount else True:
+        bytes_saved = 0
+
+        @metrics.timed("pipeline.prepare")
+        def prepare_item(in_flight_items):
+            nonlocal bytes_saved
+
             try:
-                # Back up cron iterators, so we can restore in case of error
-                post_cron_spec_backup = deepcopy(post_cron_spec)
-                story_cron_spec_backup = deepcopy(story_cron_spec)
-
-                # Get random post
-                collection_names = set(
-                    filter(
-                        lambda collection_name: collection_name not in ignore,
-                        ig_driver.get_saved_collection_names(),
-                    )
+                item = __prepare_item(
+                    ig_driver,
+                    ignore,
+                    {in_flight_item.post.url for in_flight_item in in_flight_items},
+                    caption_template,
+                    hashtags,
+                    download_concurrency,
+                    media_cache,
+                    prefetch_options,
+                    preprocess_options,
+                    post_target_width,
+                    story_target_width,
+                    media_hash_index,
+                    [
+                        (in_flight_item.media_hashes, in_flight_item.post.url)
+                        for in_flight_item in in_flight_items
+                    ],
                 )
-                if len(collection_names) == 0:
-                    break
-                random_collection_name = random.sample(collection_names, 1)[0]
-                collection_item_urls = ig_driver.get_collection_item_urls(
-                    random_collection_name
-                )
-                random_collection_item_url = random.sample(collection_item_urls, 1)[0]
-
-                # Get post content
-                media_urls = ig_driver.get_post_media_urls(random_collection_item_url)
-                caption = ig_driver.get_post_caption(random_collection_item_url)
-                user = ig_driver.get_post_user(random_collection_item_url)
-
-                with tempfile.TemporaryDirectory() as media_dir_path:
-                    utils.download_media(media_urls, media_dir_path)
-
-                    final_caption = utils.create_final_caption(
-                        random_collection_name,
-                        caption,
-                        user,
-                        caption_template,
-                        set(hashtags),
+            except Exception:
+                # Replace the browser session if it broke
+                ig_driver.check_health()
+                raise
+
+            if item is not None:
+                bytes_saved += item.bytes_saved
+
+            return item
+
+        @metrics.timed("pipeline.schedule")
+        def schedule_item(item):
+            if item.final_caption is None:
+                kind, allocator = "story", story_allocator
+            else:
+                kind, allocator = "post", post_allocator
+
+            schedule_date = allocator.reserve()
+            try:
+                if item.final_caption is None:
+                    # Schedule story
+                    mbs_driver.schedule_story(schedule_date, item.media_dir.name)
+                else:
+                    # Schedule post
+                    mbs_driver.schedule_post(
+                        schedule_date, item.media_dir.name, item.final_caption
                     )
+            except Exception:
+                # Hand the slot out again
+                allocator.release(schedule_date)
+                # Replace the browser session if it broke
+                mbs_driver.check_health()
+                raise
+
+            allocator.commit(schedule_date)
+            ledger.record(kind, schedule_date, item.post.url)
+            if media_hash_index is not None:
+                media_hash_index.add(item.media_hashes, item.post.url)
+
+        @metrics.timed("pipeline.finalize")
+        def finalize_item(item):
+            try:
+                __finalize_item(ig_driver, item)
+            except Exception:
+                # Replace the browser session if it broke
+                ig_driver.check_health()
+                raise
 
-                    if final_caption is None:
-                        # Schedule story
-                        story_random_variance = random.randint(
-                            -story_cron_variability, story_cron_variability
-                        )
-                        story_schedule_date = story_cron_spec.next(
-                            datetime
-                        ) + relativedelta(minutes=story_random_variance)
-                        mbs_driver.schedule_story(story_schedule_date, media_dir_path)
-                    else:
-                        # Schedule post
-                        post_random_variance = random.randint(
-                            -post_cron_variability, post_cron_variability
-                        )
-                        post_schedule_date = post_cron_spec.next(
-                            datetime
-                        ) + relativedelta(minutes=post_random_variance)
-                        mbs_driver.schedule_post(
-                            post_schedule_date, media_dir_path, final_caption
-                        )
-
-                # Unsave and like post
-                ig_driver.unsave_post(random_collection_item_url)
-                ig_driver.like_post(random_collection_item_url)
-
-                # Delete collection if empty
-                if len(ig_driver.get_collection_item_urls(random_collection_name)) == 0:
-                    ig_driver.delete_collection(random_collection_name)
+        def discard_item(item):
+            item.media_dir.cleanup()
+
+        if pipeline_depth > 0:
+            schedule_count = Pipeline(
+                prepare_item,
+                schedule_item,
+                finalize_item,
+                discard_item,
+                pipeline_depth,
+            ).run(amount)
+        else:
+            schedule_count = 0
+            retry_count = 0
+            while schedule_count < amount if amount else True:
+                item = None
+                try:
+                    item = prepare_item([])
+                    if item is None:
+                        break
+                    schedule_item(item)
+                except Exception as e:
+                    if item is not None:
+                        discard_item(item)
+                    wait_before_retry(e, retry_count)
+                    retry_count += 1
+                    continue
+
+                retry(finalize_item, item)
 
                 schedule_count += 1
                 retry_count = 0
-            except Exception as e:
-                print(f"An error occured: {e}")
-
-                delay = 2**retry_count
-                print(f"Retrying in {delay} seconds...")
-                time.sleep(delay)
 
-                retry_count += 1
+        print(f"Successfully scheduled {schedule_count} item(s)")
+        print(
+            f"Media HTTP client stats: {http_client.get_default_client().get_stats()}"
+        )
+        print(
+            f"Browser startup times: IG {ig_driver.startup_time}, MBS {mbs_driver.startup_time}"
+        )
+        print(f"Estimated download bytes saved: {bytes_saved}")
+        print(f"Page loads: IG {ig_driver.page_loads}, MBS {mbs_driver.page_loads}")
+        print(
+            f"Recycled browser sessions: IG {ig_driver.recycle_count}, MBS {mbs_driver.recycle_count}"
+        )
 
-                # Restore cron iterator backups
-                post_cron_spec = post_cron_spec_backup
-                story_cron_spec = story_cron_spec_backup
+        return {
+            "schedule_count": schedule_count,
+            "page_loads": {"ig": ig_driver.page_loads, "mbs": mbs_driver.page_loads},
+            "bytes_saved": bytes_saved,
+            "startup_times": {
+                "ig": ig_driver.startup_time,
+                "mbs": mbs_driver.startup_time,
+            },
+        }
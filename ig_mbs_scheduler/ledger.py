@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ScheduleLedger:
+    """
+    A durable, local record of scheduled posts and stories, stored in SQLite.
+
+    Every successfully scheduled item is recorded with its slot and source URL, so the
+    scheduled dates can be read locally at startup, rather than scraped from MBS. The
+    ledger can be reconciled with the dates scraped from MBS, to pick up items
+    scheduled or deleted outside of the scheduler.
+
+    Parameters
+    ----------
+    ledger_path : str
+        The path of the SQLite database file.
+
+    Attributes
+    ----------
+    ledger_path : str
+        The path of the SQLite database file.
+    """
+
+    def __init__(self, ledger_path):
+        self.ledger_path = os.path.expanduser(ledger_path)
+        os.makedirs(os.path.dirname(self.ledger_path) or ".", exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(self.ledger_path, check_same_thread=False)
+        with self.__connection:
+            self.__connection.execute("""
+                CREATE TABLE IF NOT EXISTS schedules (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    slot TEXT NOT NULL,
+                    source_url TEXT,
+                    recorded_at TEXT NOT NULL
+                )
+                """)
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS schedules_kind_slot ON schedules (kind, slot)"
+            )
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close the ledger's database connection.
+        """
+        self.__connection.close()
+
+    def record(self, kind, slot, source_url=None):
+        """
+        Record a scheduled item.
+
+        Parameters
+        ----------
+        kind : {"post", "story"}
+            The kind of the scheduled item.
+        slot : datetime
+            The date for which the item is scheduled.
+        source_url : str, optional
+            The URL of the original post.
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT INTO schedules (kind, slot, source_url, recorded_at) VALUES (?, ?, ?, ?)",
+                (
+                    kind,
+                    slot.strftime(DATE_FORMAT),
+                    source_url,
+                    datetime.now().strftime(DATE_FORMAT),
+                ),
+            )
+
+        print(f"Recorded scheduled {kind} ({slot}, {source_url})")
+
+    def get_scheduled_dates(self, kind, after=None):
+        """
+        Get the scheduled dates, in ascending order.
+
+        Parameters
+        ----------
+        kind : {"post", "story"}
+            The kind of scheduled items for which to get the dates.
+        after : datetime, optional
+            If specified, only dates after this date are returned.
+
+        Returns
+        -------
+        list of datetime
+            The scheduled dates.
+        """
+        after_slot = after.strftime(DATE_FORMAT) if after else ""
+
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT slot FROM schedules WHERE kind = ? AND slot > ? ORDER BY slot",
+                (kind, after_slot),
+            ).fetchall()
+
+        return [datetime.strptime(slot, DATE_FORMAT) for (slot,) in rows]
+
+    def get_last_reconciled_at(self):
+        """
+        Get the date of the last reconciliation with MBS.
+
+        Returns
+        -------
+        datetime or None
+            The date of the last reconciliation, or `None` if never reconciled.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT value FROM meta WHERE key = 'last_reconciled_at'"
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return datetime.strptime(row[0], DATE_FORMAT)
+
+    def is_reconciliation_due(self, interval):
+        """
+        Check whether the ledger is due to be reconciled with MBS.
+
+        Parameters
+        ----------
+        interval : timedelta
+            The interval at which to reconcile the ledger.
+
+        Returns
+        -------
+        bool
+            Whether the ledger has never been reconciled, or was last reconciled longer
+            than `interval` ago.
+        """
+        last_reconciled_at = self.get_last_reconciled_at()
+
+        return (
+            last_reconciled_at is None
+            or datetime.now() - last_reconciled_at >= interval
+        )
+
+    def reconcile(self, kind, scheduled_dates):
+        """
+        Reconcile the ledger with the dates scheduled on MBS.
+
+        Upcoming items no longer scheduled on MBS are removed, and items scheduled on MBS
+        but missing from the ledger are recorded without a source URL.
+
+        Parameters
+        ----------
+        kind : {"post", "story"}
+            The kind of the scheduled items.
+        scheduled_dates : list of datetime
+            The dates scheduled on MBS.
+        """
+        now = datetime.now()
+        mbs_slots = [
+            scheduled_date.strftime(DATE_FORMAT)
+            for scheduled_date in scheduled_dates
+            if scheduled_date > now
+        ]
+
+        with self.__lock, self.__connection:
+            ledger_slots = [
+                slot
+                for (slot,) in self.__connection.execute(
+                    "SELECT slot FROM schedules WHERE kind = ? AND slot > ?",
+                    (kind, now.strftime(DATE_FORMAT)),
+                )
+            ]
+
+            # Match slots one to one, since several items may share a slot
+            unmatched_ledger_slots = list(ledger_slots)
+            missing_slots = []
+            for slot in mbs_slots:
+                if slot in unmatched_ledger_slots:
+                    unmatched_ledger_slots.remove(slot)
+                else:
+                    missing_slots.append(slot)
+
+            for slot in unmatched_ledger_slots:
+                self.__connection.execute(
+                    "DELETE FROM schedules WHERE id = (SELECT id FROM schedules WHERE kind = ? AND slot = ? LIMIT 1)",
+                    (kind, slot),
+                )
+            self.__connection.executemany(
+                "INSERT INTO schedules (kind, slot, source_url, recorded_at) VALUES (?, ?, NULL, ?)",
+                [(kind, slot, now.strftime(DATE_FORMAT)) for slot in missing_slots],
+            )
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_reconciled_at', ?)",
+                (now.strftime(DATE_FORMAT),),
+            )
+
+        print(
+            f"Successfully reconciled scheduled {kind} dates: {len(missing_slots)} added, {len(unmatched_ledger_slots)} removed"
+        )
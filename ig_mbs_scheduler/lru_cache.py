@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A bounded, least recently used (LRU) in-memory cache.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of entries to keep. When exceeded, the least recently used
+        entry is evicted.
+
+    Attributes
+    ----------
+    max_size : int
+        The maximum number of entries to keep.
+    """
+
+    def __init__(self, max_size):
+        if max_size < 1:
+            raise ValueError(f"Cache size must be at least 1, got {max_size}")
+
+        self.max_size = max_size
+        self.__entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key, default=None):
+        """
+        Get a cached entry, marking it as most recently used.
+
+        Parameters
+        ----------
+        key : hashable
+            The key of the entry to get.
+        default : object, default=None
+            The value to return if the key is not cached.
+
+        Returns
+        -------
+        object
+            The cached entry, or `default` if the key is not cached.
+        """
+        if key not in self.__entries:
+            return default
+
+        self.__entries.move_to_end(key)
+        return self.__entries[key]
+
+    def put(self, key, value):
+        """
+        Cache an entry, evicting the least recently used entry if the cache is full.
+
+        Parameters
+        ----------
+        key : hashable
+            The key of the entry to cache.
+        value : object
+            The entry to cache.
+        """
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Remove an entry from the cache.
+
+        Parameters
+        ----------
+        key : hashable, optional
+            The key of the entry to remove. If not specified, all entries are removed.
+        """
+        if key is None:
+            self.__entries.clear()
+        else:
+            self.__entries.pop(key, None)
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib
+
+# The fraction of the size cap evicted down to, so the cache is not walked again on
+# every write once full
+EVICTION_TARGET_RATIO = 0.9
+# The subdirectory of partial downloads, which are not cache entries
+PARTIAL_DIR_NAME = "partial"
+# The age (seconds) after which abandoned partial downloads are removed
+PARTIAL_MAX_AGE = 24 * 60 * 60
+
+
+class MediaCache:
+    """
+    An on-disk, content-addressed cache of downloaded and transformed media.
+
+    Entries are keyed by the media URL path (which, unlike the signed query string,
+    identifies the media) and the parameters of the transform applied to it. The least
+    recently used entries are evicted when the cache exceeds its size cap, down to
+    `EVICTION_TARGET_RATIO` of it.
+
+    The cache also keeps partial downloads, so they can be resumed by later retries and
+    runs. They do not count towards the size cap, and are removed once older than
+    `PARTIAL_MAX_AGE`.
+
+    Parameters
+    ----------
+    cache_dir_path : str
+        The directory path in which to store cached media.
+    max_size : int
+        The maximum total size (bytes) of cached media.
+
+    Attributes
+    ----------
+    cache_dir_path : str
+        The directory path in which cached media is stored.
+    partial_dir_path : str
+        The directory path in which partial downloads are stored.
+    max_size : int
+        The maximum total size (bytes) of cached media.
+    """
+
+    def __init__(self, cache_dir_path, max_size):
+        self.cache_dir_path = os.path.expanduser(cache_dir_path)
+        self.partial_dir_path = os.path.join(self.cache_dir_path, PARTIAL_DIR_NAME)
+        self.max_size = max_size
+
+        os.makedirs(self.partial_dir_path, exist_ok=True)
+        self.__remove_stale_partials()
+
+        self.__lock = threading.Lock()
+        self.__size = sum(size for _, size, _ in self.__get_entries())
+
+    @staticmethod
+    def get_key(media_url, **params):
+        """
+        Get the cache key of a media item.
+
+        Parameters
+        ----------
+        media_url : str
+            The URL of the media item.
+        **params
+            The parameters of the transform applied to the media item.
+
+        Returns
+        -------
+        str
+            The cache key of the media item.
+        """
+        media_path = urllib.parse.urlparse(media_url).path
+        key_data = json.dumps({"media": media_path, "params": params}, sort_keys=True)
+
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def __get_entry_path(self, key, extension):
+        return os.path.join(self.cache_dir_path, key[:2], f"{key}{extension}")
+
+    def get_partial_path(self, media_url):
+        """
+        Get the path of the partial download of a media item, which persists across
+        retries and runs until the download completes.
+
+        Parameters
+        ----------
+        media_url : str
+            The URL of the media item.
+
+        Returns
+        -------
+        str
+            The path of the partial download.
+        """
+        key = self.get_key(media_url, kind="partial")
+        extension = os.path.splitext(urllib.parse.urlparse(media_url).path)[1]
+
+        return os.path.join(self.partial_dir_path, f"{key}{extension}.part")
+
+    def __remove_stale_partials(self):
+        for file_name in os.listdir(self.partial_dir_path):
+            file_path = os.path.join(self.partial_dir_path, file_name)
+            try:
+                if time.time() - os.path.getmtime(file_path) > PARTIAL_MAX_AGE:
+                    os.remove(file_path)
+            except FileNotFoundError:
+                continue
+
+    def __get_entries(self):
+        for dir_path, dir_names, file_names in os.walk(self.cache_dir_path):
+            if dir_path == self.cache_dir_path:
+                dir_names[:] = [
+                    dir_name for dir_name in dir_names if dir_name != PARTIAL_DIR_NAME
+                ]
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    file_stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                yield file_path, file_stat.st_size, file_stat.st_mtime
+
+    def __evict(self):
+        if self.__size <= self.max_size:
+            return
+
+        # Only walk the cache when full, correcting the running size along the way
+        entries = sorted(self.__get_entries(), key=lambda entry: entry[2])
+        self.__size = sum(size for _, size, _ in entries)
+
+        target_size = self.max_size * EVICTION_TARGET_RATIO
+        for file_path, size, _ in entries:
+            if self.__size <= target_size:
+                return
+
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                continue
+
+            print(f"Evicted cached media ({file_path})")
+            self.__size -= size
+
+    def __write(self, key, extension, write):
+        entry_path = self.__get_entry_path(key, extension)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        # Write to a temporary file first, so readers never see a partial entry
+        file_descriptor, temp_file_path = tempfile.mkstemp(
+            dir=os.path.dirname(entry_path)
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                write(file)
+            entry_size = os.path.getsize(temp_file_path)
+
+            with self.__lock:
+                # Replacing an entry frees its size
+                try:
+                    self.__size -= os.path.getsize(entry_path)
+                except FileNotFoundError:
+                    pass
+                os.replace(temp_file_path, entry_path)
+                self.__size += entry_size
+                self.__evict()
+        except BaseException:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            raise
+
+    def fetch(self, key, extension, out_file_path):
+        """
+        Copy a cached media file to a path.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the media file.
+        extension : str
+            The file extension of the media file.
+        out_file_path : str
+            The file path to copy the cached media file to.
+
+        Returns
+        -------
+        bool
+            Whether the media file was cached.
+        """
+        entry_path = self.__get_entry_path(key, extension)
+
+        try:
+            os.utime(entry_path)  # Mark as recently used
+            try:
+                os.link(entry_path, out_file_path)
+            except OSError:
+                shutil.copyfile(entry_path, out_file_path)
+        except FileNotFoundError:
+            return False
+
+        print(f"Got media from cache ({entry_path})")
+
+        return True
+
+    def store(self, key, extension, file_path):
+        """
+        Copy a media file into the cache.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the media file.
+        extension : str
+            The file extension of the media file.
+        file_path : str
+            The path of the media file to cache.
+        """
+        with open(file_path, "rb") as source_file:
+            self.__write(
+                key,
+                extension,
+                lambda file: shutil.copyfileobj(source_file, file),
+            )
+
+    def get_json(self, key):
+        """
+        Get a cached JSON value.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the value.
+
+        Returns
+        -------
+        object or None
+            The cached value, or `None` if it is not cached.
+        """
+        entry_path = self.__get_entry_path(key, ".json")
+
+        try:
+            os.utime(entry_path)  # Mark as recently used
+            with open(entry_path) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put_json(self, key, value):
+        """
+        Cache a JSON value.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the value.
+        value : object
+            The JSON serializable value to cache.
+        """
+        self.__write(key, ".json", lambda file: file.write(json.dumps(value).encode()))
@@ -0,0 +1,256 @@
+import ffmpeg
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from ig_mbs_scheduler import metrics
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+HASH_BITS = 64
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+HASH_MASK = (1 << HASH_BITS) - 1
+VIDEO_KEYFRAME_COUNT = 4
+
+
+def compute_dhash(pixels):
+    """
+    Compute the difference hash of a grayscale image.
+
+    Each bit of the hash is set when a pixel is brighter than its right neighbour, so
+    the hash survives re-encoding, scaling and small color changes.
+
+    Parameters
+    ----------
+    pixels : bytes
+        The 8-bit grayscale pixels of the image, scaled down to 9x8, row by row.
+
+    Returns
+    -------
+    int
+        The 64-bit difference hash of the image.
+    """
+    dhash = 0
+    for y in range(HASH_HEIGHT):
+        row = pixels[y * HASH_WIDTH : (y + 1) * HASH_WIDTH]
+        for x in range(HASH_WIDTH - 1):
+            dhash = (dhash << 1) | (row[x] > row[x + 1])
+
+    return dhash
+
+
+def __read_frames(stream, frame_count):
+    pixels, _ = (
+        stream.filter("scale", HASH_WIDTH, HASH_HEIGHT, flags="area")
+        .output(
+            "pipe:",
+            format="rawvideo",
+            pix_fmt="gray",
+            vsync="vfr",
+            vframes=frame_count,
+        )
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+    frame_size = HASH_WIDTH * HASH_HEIGHT
+    return [
+        pixels[i : i + frame_size]
+        for i in range(0, len(pixels) - frame_size + 1, frame_size)
+    ]
+
+
+@metrics.timed("media_index.hash_media")
+def hash_media(media_dir_path, keyframe_count=VIDEO_KEYFRAME_COUNT):
+    """
+    Compute the perceptual hashes of downloaded media.
+
+    Photos are hashed once, and videos are hashed at each of their first keyframes.
+    Frames without detail (such as black frames) are left out, since they would match
+    any other frame without detail.
+
+    Parameters
+    ----------
+    media_dir_path : str
+        The directory path of the media, as downloaded by `utils.download_media`.
+    keyframe_count : int, default=4
+        The maximum number of keyframes to hash per video.
+
+    Returns
+    -------
+    list of int
+        The perceptual hashes of the media.
+    """
+    media_hashes = []
+    for media_file_name in sorted(os.listdir(media_dir_path)):
+        media_file_path = os.path.join(media_dir_path, media_file_name)
+        media_extension = os.path.splitext(media_file_name)[1]
+
+        if media_extension == ".jpg":
+            frames = __read_frames(ffmpeg.input(media_file_path), 1)
+        elif media_extension == ".mp4":
+            frames = __read_frames(
+                ffmpeg.input(media_file_path, skip_frame="nokey"), keyframe_count
+            )
+        else:
+            continue
+
+        for frame in frames:
+            media_hash = compute_dhash(frame)
+            if media_hash not in (0, HASH_MASK) and media_hash not in media_hashes:
+                media_hashes.append(media_hash)
+
+    return media_hashes
+
+
+class MediaHashIndex:
+    """
+    A persistent index of the perceptual hashes of scheduled media, stored in SQLite.
+
+    Hashes are searched by Hamming distance with multi-index hashing: each hash is split
+    into `max_distance + 1` bands, each indexed in a hash table. Two hashes within
+    `max_distance` bits of each other must share at least one band exactly, so only the
+    hashes sharing a band with the searched hash are compared.
+
+    Parameters
+    ----------
+    index_path : str
+        The path of the SQLite database file.
+    max_distance : int, default=4
+        The maximum Hamming distance (bits) between the hashes of near-duplicate media.
+
+    Attributes
+    ----------
+    index_path : str
+        The path of the SQLite database file.
+    max_distance : int
+        The maximum Hamming distance (bits) between the hashes of near-duplicate media.
+    """
+
+    def __init__(self, index_path, max_distance=4):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"Invalid maximum distance: {max_distance}")
+
+        self.index_path = os.path.expanduser(index_path)
+        self.max_distance = max_distance
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+
+        # Split hashes into bands of (almost) equal widths, as (shift, mask) pairs
+        band_count = max_distance + 1
+        band_bounds = [i * HASH_BITS // band_count for i in range(band_count + 1)]
+        self.__bands = [
+            (start, (1 << (end - start)) - 1)
+            for start, end in zip(band_bounds, band_bounds[1:])
+        ]
+        self.__band_tables = [{} for _ in self.__bands]
+        self.__source_urls = {}
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(self.index_path, check_same_thread=False)
+        with self.__connection:
+            self.__connection.execute("""
+                CREATE TABLE IF NOT EXISTS media_hashes (
+                    id INTEGER PRIMARY KEY,
+                    hash INTEGER NOT NULL,
+                    source_url TEXT,
+                    recorded_at TEXT NOT NULL
+                )
+                """)
+
+        for media_hash, source_url in self.__connection.execute(
+            "SELECT hash, source_url FROM media_hashes"
+        ):
+            self.__insert(media_hash & HASH_MASK, source_url)
+
+        print(f"Loaded {len(self)} media hash(es)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.__source_urls)
+
+    def close(self):
+        """
+        Close the index's database connection.
+        """
+        self.__connection.close()
+
+    def __insert(self, media_hash, source_url):
+        if media_hash in self.__source_urls:
+            return
+        self.__source_urls[media_hash] = source_url
+
+        for band_table, (shift, mask) in zip(self.__band_tables, self.__bands):
+            band_table.setdefault((media_hash >> shift) & mask, []).append(media_hash)
+
+    def find(self, media_hashes, pending_media=()):
+        """
+        Find indexed media near-duplicate to any of the given media.
+
+        Parameters
+        ----------
+        media_hashes : list of int
+            The perceptual hashes of the media, as computed by `hash_media`.
+        pending_media : list of tuple of (list of int, str), optional
+            The perceptual hashes and source URL of media not yet added to the index,
+            such as media being scheduled, also searched.
+
+        Returns
+        -------
+        str or None
+            The source URL of the near-duplicate media, or `None` if there is none.
+        """
+        # Pending media is short lived and small, so is compared exhaustively
+        for pending_media_hashes, source_url in pending_media:
+            for media_hash in media_hashes:
+                for pending_media_hash in pending_media_hashes:
+                    distance = bin(media_hash ^ pending_media_hash).count("1")
+                    if distance <= self.max_distance:
+                        return source_url
+
+        with self.__lock:
+            for media_hash in media_hashes:
+                for band_table, (shift, mask) in zip(self.__band_tables, self.__bands):
+                    for indexed_hash in band_table.get(
+                        (media_hash >> shift) & mask, ()
+                    ):
+                        distance = bin(media_hash ^ indexed_hash).count("1")
+                        if distance <= self.max_distance:
+                            return self.__source_urls[indexed_hash]
+
+        return None
+
+    def add(self, media_hashes, source_url=None):
+        """
+        Add media to the index.
+
+        Parameters
+        ----------
+        media_hashes : list of int
+            The perceptual hashes of the media, as computed by `hash_media`.
+        source_url : str, optional
+            The URL of the original post.
+        """
+        recorded_at = datetime.now().strftime(DATE_FORMAT)
+
+        with self.__lock, self.__connection:
+            # SQLite integers are signed, so store hashes as two's complement
+            self.__connection.executemany(
+                "INSERT INTO media_hashes (hash, source_url, recorded_at) VALUES (?, ?, ?)",
+                [
+                    (
+                        int.from_bytes(
+                            media_hash.to_bytes(8, "big"), "big", signed=True
+                        ),
+                        source_url,
+                        recorded_at,
+                    )
+                    for media_hash in media_hashes
+                ],
+            )
+            for media_hash in media_hashes:
+                self.__insert(media_hash, source_url)
@@ -0,0 +1,360 @@
+import bisect
+import copy
+import functools
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = "ig_mbs_scheduler_operation"
+# Upper bounds (seconds) of the latency histogram buckets, from 1 ms to about an hour,
+# each about 19% wider than the previous one, which bounds the error of percentiles
+BUCKET_BOUNDS = [0.001 * 2 ** (i / 4) for i in range(88)]
+
+
+class LatencyHistogram:
+    """
+    A histogram of operation latencies, in fixed exponential buckets, so its size does
+    not grow with the number of operations.
+
+    Attributes
+    ----------
+    count : int
+        The number of operations.
+    errors : int
+        The number of operations which raised an error.
+    sum : float
+        The total duration (seconds) of the operations.
+    max : float
+        The maximum duration (seconds) of the operations.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.sum = 0
+        self.max = 0
+        # Operation counts, by bucket index, with durations beyond the last bound
+        # counted at index `len(BUCKET_BOUNDS)`
+        self.__bucket_counts = {}
+
+    def observe(self, duration, error=False):
+        """
+        Record an operation.
+
+        Parameters
+        ----------
+        duration : float
+            The duration (seconds) of the operation.
+        error : bool, default=False
+            Whether the operation raised an error.
+        """
+        bucket = bisect.bisect_left(BUCKET_BOUNDS, duration)
+        self.__bucket_counts[bucket] = self.__bucket_counts.get(bucket, 0) + 1
+        self.count += 1
+        self.errors += int(error)
+        self.sum += duration
+        self.max = max(self.max, duration)
+
+    def merge(self, histogram):
+        """
+        Add the operations of another histogram to this histogram.
+
+        Parameters
+        ----------
+        histogram : LatencyHistogram
+            The histogram to merge.
+        """
+        for bucket, count in histogram.__bucket_counts.items():
+            self.__bucket_counts[bucket] = self.__bucket_counts.get(bucket, 0) + count
+        self.count += histogram.count
+        self.errors += histogram.errors
+        self.sum += histogram.sum
+        self.max = max(self.max, histogram.max)
+
+    def get_percentile(self, percentile):
+        """
+        Estimate a percentile of the durations, by interpolating within the bucket of
+        the nearest-rank percentile.
+
+        Parameters
+        ----------
+        percentile : float
+            The percentile, between 0 and 100.
+
+        Returns
+        -------
+        float
+            The estimated percentile (seconds), at most the maximum duration.
+        """
+        if self.count == 0:
+            return 0
+
+        rank = max(math.ceil(percentile / 100 * self.count), 1)
+
+        cumulative_count = 0
+        for bucket in sorted(self.__bucket_counts):
+            bucket_count = self.__bucket_counts[bucket]
+            if cumulative_count + bucket_count >= rank:
+                break
+            cumulative_count += bucket_count
+
+        if bucket >= len(BUCKET_BOUNDS):
+            return self.max
+
+        # Interpolate geometrically, like the bucket bounds
+        upper_bound = BUCKET_BOUNDS[bucket]
+        lower_bound = BUCKET_BOUNDS[bucket - 1] if bucket > 0 else upper_bound / 2
+        fraction = (rank - cumulative_count) / bucket_count
+        percentile_value = lower_bound * (upper_bound / lower_bound) ** fraction
+
+        return min(percentile_value, self.max)
+
+
+class MetricsRegistry:
+    """
+    A thread safe registry of operation latencies and errors.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__histograms = {}
+
+    def observe(self, name, duration, error=False):
+        """
+        Record an operation.
+
+        Parameters
+        ----------
+        name : str
+            The name of the operation.
+        duration : float
+            The duration (seconds) of the operation.
+        error : bool, default=False
+            Whether the operation raised an error.
+        """
+        with self.__lock:
+            self.__histograms.setdefault(name, LatencyHistogram()).observe(
+                duration, error
+            )
+
+    @contextmanager
+    def time(self, name):
+        """
+        Time the operation within the context.
+
+        Parameters
+        ----------
+        name : str
+            The name of the operation.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(name, time.perf_counter() - start_time, error=True)
+            raise
+        self.observe(name, time.perf_counter() - start_time)
+
+    def timed(self, name):
+        """
+        Decorate a function, to time every call to it.
+
+        Parameters
+        ----------
+        name : str
+            The name of the operation.
+
+        Returns
+        -------
+        callable
+            The decorator.
+        """
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.time(name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self):
+        """
+        Summarize the recorded operations.
+
+        Returns
+        -------
+        dict
+            The count, error count, error rate, total duration, and p50, p95 and maximum
+            duration (seconds) of each operation, by operation name.
+        """
+        histograms = self.get_observations()
+
+        summary = {}
+        for name in sorted(histograms):
+            histogram = histograms[name]
+            summary[name] = {
+                "count": histogram.count,
+                "errors": histogram.errors,
+                "error_rate": histogram.errors / histogram.count,
+                "sum": histogram.sum,
+                "p50": histogram.get_percentile(50),
+                "p95": histogram.get_percentile(95),
+                "max": histogram.max,
+            }
+
+        return summary
+
+    def get_observations(self):
+        """
+        Get the recorded operations, for example to send them to another process.
+
+        Returns
+        -------
+        dict
+            A copy of the latency histogram of each operation, by operation name.
+        """
+        with self.__lock:
+            return copy.deepcopy(self.__histograms)
+
+    def merge_observations(self, observations):
+        """
+        Add recorded operations to this registry.
+
+        Parameters
+        ----------
+        observations : dict
+            The recorded operations, as returned by `get_observations`.
+        """
+        with self.__lock:
+            for name, histogram in observations.items():
+                self.__histograms.setdefault(name, LatencyHistogram()).merge(histogram)
+
+    def merge(self, registry):
+        """
+        Add the recorded operations of another registry to this registry.
+
+        Parameters
+        ----------
+        registry : MetricsRegistry
+            The registry to merge.
+        """
+        self.merge_observations(registry.get_observations())
+
+    def reset(self):
+        """
+        Remove all recorded operations.
+        """
+        with self.__lock:
+            self.__histograms.clear()
+
+    def to_json(self):
+        """
+        Export the summary of recorded operations as JSON.
+
+        Returns
+        -------
+        str
+            The JSON summary.
+        """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """
+        Export the summary of recorded operations in the Prometheus text format.
+
+        Returns
+        -------
+        str
+            The Prometheus text summary.
+        """
+        summary = self.snapshot()
+
+        lines = [f"# TYPE {PROMETHEUS_PREFIX}_seconds summary"]
+        for name, stats in summary.items():
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95")):
+                lines.append(
+                    f'{PROMETHEUS_PREFIX}_seconds{{operation="{name}",quantile="{quantile}"}} {stats[key]}'
+                )
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_seconds_sum{{operation="{name}"}} {stats["sum"]}'
+            )
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_seconds_count{{operation="{name}"}} {stats["count"]}'
+            )
+
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_seconds_max gauge")
+        for name, stats in summary.items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_seconds_max{{operation="{name}"}} {stats["max"]}'
+            )
+
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_errors_total counter")
+        for name, stats in summary.items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_errors_total{{operation="{name}"}} {stats["errors"]}'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, format="json"):
+        """
+        Export the summary of recorded operations.
+
+        Parameters
+        ----------
+        format : {"json", "prometheus"}, default="json"
+            The format to export.
+
+        Returns
+        -------
+        str
+            The exported summary.
+        """
+        if format == "json":
+            return self.to_json()
+        elif format == "prometheus":
+            return self.to_prometheus()
+        else:
+            raise ValueError(f"Unsupported metrics format: {format}")
+
+
+REGISTRY = MetricsRegistry()
+
+
+def timed(name):
+    """
+    Decorate a function, to time every call to it in the default registry.
+
+    Parameters
+    ----------
+    name : str
+        The name of the operation.
+
+    Returns
+    -------
+    callable
+        The decorator.
+    """
+    return REGISTRY.timed(name)
+
+
+def time_operation(name):
+    """
+    Time the operation within the context in the default registry.
+
+    Parameters
+    ----------
+    name : str
+        The name of the operation.
+
+    Returns
+    -------
+    contextmanager
+        The timing context.
+    """
+    return REGISTRY.time(name)
@@ -0,0 +1,240 @@
+import queue
+import threading
+import time
+
+
+def wait_before_retry(error, retry_count, stop_event=None):
+    """
+    Report an error, and wait with exponential backoff before retrying.
+
+    Parameters
+    ----------
+    error : Exception
+        The error to report.
+    retry_count : int
+        The number of consecutive retries so far.
+    stop_event : threading.Event, optional
+        An event which, when set, stops waiting.
+    """
+    print(f"An error occured: {error}")
+
+    delay = 2**retry_count
+    print(f"Retrying in {delay} seconds...")
+    if stop_event is None:
+        time.sleep(delay)
+    else:
+        stop_event.wait(delay)
+
+
+def retry(function, *args, stop_event=None):
+    """
+    Call a function until it succeeds, with exponential backoff between attempts.
+
+    Parameters
+    ----------
+    function : callable
+        The function to call.
+    *args
+        The arguments to call the function with.
+    stop_event : threading.Event, optional
+        An event which, when set, stops retrying. The function is always called at
+        least once, so items handed over before stopping are still handled.
+
+    Returns
+    -------
+    object
+        The return value of the function, or `None` if retrying was stopped.
+    """
+    retry_count = 0
+    while True:
+        try:
+            return function(*args)
+        except Exception as e:
+            wait_before_retry(e, retry_count, stop_event)
+            retry_count += 1
+
+        if stop_event is not None and stop_event.is_set():
+            return None
+
+
+class Pipeline:
+    """
+    A pipeline which prepares upcoming items on a background thread, while the current
+    item is scheduled on the calling thread.
+
+    Items are prepared and finalized on the same background thread, so both stages may
+    share a web driver, which is not safe to use across threads. Prepared items wait in
+    a bounded queue, so preparation stops once it is `depth` items ahead of scheduling.
+
+    Parameters
+    ----------
+    prepare_item : callable
+        Called with the list of items in flight (prepared, but not yet finalized), and
+        returns the next item to schedule, or `None` if there are no items left.
+    schedule_item : callable
+        Called with a prepared item to schedule it. If scheduling fails, the item is
+        discarded, and the next item is scheduled after a backoff.
+    finalize_item : callable
+        Called with an item once it has been scheduled.
+    discard_item : callable
+        Called with a prepared item that will not be scheduled, to clean it up.
+    depth : int, default=1
+        The maximum number of prepared items waiting to be scheduled.
+
+    Attributes
+    ----------
+    depth : int
+        The maximum number of prepared items waiting to be scheduled.
+    """
+
+    __END = object()
+
+    def __init__(
+        self, prepare_item, schedule_item, finalize_item, discard_item, depth=1
+    ):
+        self.depth = depth
+        self.__prepare_item = prepare_item
+        self.__schedule_item = schedule_item
+        self.__finalize_item = finalize_item
+        self.__discard_item = discard_item
+
+    def __work(self, amount, ready_queue, finalize_queue, stop_event):
+        in_flight_items = []
+        prepared_count = 0
+        is_exhausted = False
+
+        while not stop_event.is_set():
+            # Finalize scheduled items before preparing new ones
+            can_prepare = (
+                not is_exhausted
+                and (amount is None or prepared_count < amount)
+                and not ready_queue.full()
+            )
+            try:
+                item = (
+                    finalize_queue.get_nowait()
+                    if can_prepare
+                    else finalize_queue.get(timeout=0.1)
+                )
+            except queue.Empty:
+                item = None
+
+            if item is self.__END:
+                return
+            elif item is not None:
+                handle_item, item = item
+                if handle_item is self.__finalize_item:
+                    retry(handle_item, item, stop_event=stop_event)
+                else:
+                    handle_item(item)
+                    prepared_count -= 1
+                in_flight_items.remove(item)
+                continue
+
+            if not can_prepare:
+                continue
+
+            item = retry(
+                self.__prepare_item, list(in_flight_items), stop_event=stop_event
+            )
+            if stop_event.is_set():
+                if item is not None:
+                    self.__discard_item(item)
+                return
+
+            if item is None:
+                print("No more items to prepare")
+                is_exhausted = True
+                ready_queue.put(self.__END)
+                continue
+
+            in_flight_items.append(item)
+            prepared_count += 1
+            ready_queue.put(item)
+
+    def run(self, amount=None):
+        """
+        Run the pipeline.
+
+        Parameters
+        ----------
+        amount : int, optional
+            The number of items to schedule. If not specified, items are scheduled until
+            there are no items left.
+
+        Returns
+        -------
+        int
+            The number of scheduled items.
+        """
+        ready_queue = queue.Queue(maxsize=self.depth)
+        finalize_queue = queue.Queue()
+        stop_event = threading.Event()
+
+        worker = threading.Thread(
+            target=self.__work,
+            args=(amount, ready_queue, finalize_queue, stop_event),
+            daemon=True,
+        )
+        worker.start()
+
+        schedule_count = 0
+        retry_count = 0
+        try:
+            while amount is None or schedule_count < amount:
+                try:
+                    item = ready_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if not worker.is_alive():
+                        break
+                    continue
+
+                if item is self.__END:
+                    break
+
+                try:
+                    self.__schedule_item(item)
+                except Exception as e:
+                    finalize_queue.put((self.__discard_item, item))
+                    wait_before_retry(e, retry_count)
+                    retry_count += 1
+                    continue
+                except BaseException:
+                    # Discard the interrupted item along with the pending ones
+                    finalize_queue.put((self.__discard_item, item))
+                    raise
+
+                finalize_queue.put((self.__finalize_item, item))
+                schedule_count += 1
+                retry_count = 0
+
+            # Let the worker finish finalizing scheduled items
+            finalize_queue.put(self.__END)
+            worker.join()
+        finally:
+            # Cancel the worker, finalize scheduled items it did not get to, and
+            # discard prepared items that were not scheduled
+            stop_event.set()
+            worker.join()
+
+            pending_items = []
+            for pending_queue in (finalize_queue, ready_queue):
+                while True:
+                    try:
+                        item = pending_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not self.__END:
+                        pending_items.append(
+                            item
+                            if pending_queue is finalize_queue
+                            else (self.__discard_item, item)
+                        )
+
+            for handle_item, item in pending_items:
+                try:
+                    handle_item(item)
+                except Exception as e:
+                    print(f"An error occured: {e}")
+
+        return schedule_count
@@ -0,0 +1,209 @@
+import bisect
+import csv
+import json
+import random
+from collections import namedtuple
+from copy import deepcopy
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+Slot = namedtuple("Slot", ["kind", "index", "date"])
+
+
+class SlotAllocator:
+    """
+    An allocator which hands out the earliest free slots of a cron specification,
+    randomly offset, filling any gaps between already scheduled dates.
+
+    Occupied dates are kept in a sorted interval index. A cron slot is free when no
+    occupied date is within `variability + min_spacing` minutes of it, so its offset
+    date is always at least `min_spacing` minutes away from any occupied date.
+
+    Slots are allocated transactionally: a reserved slot is occupied until it is either
+    committed, or released to be handed out again.
+
+    Given the same cron specification, variability, scheduled dates, seed and kind, an
+    allocator always hands out the same slots, so a preview matches the slots used when
+    scheduling. The offset of each slot is derived from the seed, the kind and the
+    index of its cron date, so a released slot is handed out again at the same date.
+
+    Parameters
+    ----------
+    cron_spec : croniter
+        The cron specification from which to expand slots.
+    variability : int, default=0
+        A random time offset (minutes) applied to each slot, in the range +/-
+        `variability`.
+    scheduled_dates : list of datetime, default=()
+        The dates that are already scheduled.
+    seed : int, optional
+        The seed for the random time offsets. If not specified, a random seed is used.
+    now : datetime, optional
+        The current date. If not specified, `datetime.now()` is used.
+    min_spacing : int, default=0
+        The minimum time (minutes) between an allocated slot and any occupied date.
+    kind : {"post", "story"}, default="post"
+        The kind of the allocated slots, mixed into the seed, so posts and stories
+        sharing a seed get different offsets.
+
+    Attributes
+    ----------
+    variability : int
+        A random time offset (minutes) applied to each slot.
+    min_spacing : int
+        The minimum time (minutes) between an allocated slot and any occupied date.
+    kind : {"post", "story"}
+        The kind of the allocated slots.
+    """
+
+    def __init__(
+        self,
+        cron_spec,
+        variability=0,
+        scheduled_dates=(),
+        seed=None,
+        now=None,
+        min_spacing=0,
+        kind="post",
+    ):
+        now = now or datetime.now()
+
+        self.variability = variability
+        self.min_spacing = min_spacing
+        self.kind = kind
+        self.__seed = random.getrandbits(64) if seed is None else seed
+        self.__cron_spec = deepcopy(cron_spec)
+        self.__cron_spec.set_current(
+            now + relativedelta(minutes=21) + relativedelta(minutes=variability)
+        )
+
+        # Expanded cron dates, of which all before the cursor are occupied
+        self.__cron_dates = []
+        self.__cursor = 0
+
+        self.__occupied_dates = sorted(scheduled_dates)
+        self.__reservations = {}
+
+    def __get_cron_date(self, i):
+        while len(self.__cron_dates) <= i:
+            self.__cron_dates.append(self.__cron_spec.next(datetime))
+
+        return self.__cron_dates[i]
+
+    def __get_random_variance(self, i):
+        slot_random = random.Random(f"{self.__seed}:{self.kind}:{i}")
+        return slot_random.randint(-self.variability, self.variability)
+
+    def __is_occupied(self, date):
+        margin = relativedelta(minutes=self.variability + self.min_spacing)
+        i = bisect.bisect_left(self.__occupied_dates, date - margin)
+
+        return (
+            i < len(self.__occupied_dates) and self.__occupied_dates[i] <= date + margin
+        )
+
+    def reserve(self):
+        """
+        Reserve the earliest free slot.
+
+        Returns
+        -------
+        datetime
+            The date of the reserved slot.
+        """
+        i = self.__cursor
+        while self.__is_occupied(self.__get_cron_date(i)):
+            i += 1
+        self.__cursor = i + 1
+
+        random_variance = self.__get_random_variance(i)
+        date = self.__get_cron_date(i) + relativedelta(minutes=random_variance)
+
+        bisect.insort(self.__occupied_dates, date)
+        self.__reservations[date] = i
+
+        return date
+
+    def commit(self, date):
+        """
+        Commit a reserved slot, so it stays occupied.
+
+        Parameters
+        ----------
+        date : datetime
+            The date of the reserved slot, as returned by `reserve`.
+        """
+        del self.__reservations[date]
+
+    def release(self, date):
+        """
+        Release a reserved slot, so it can be handed out again.
+
+        Parameters
+        ----------
+        date : datetime
+            The date of the reserved slot, as returned by `reserve`.
+        """
+        i = self.__reservations.pop(date)
+        self.__occupied_dates.pop(bisect.bisect_left(self.__occupied_dates, date))
+        self.__cursor = min(self.__cursor, i)
+
+
+def plan(post_allocator, story_allocator, amount):
+    """
+    Allocate post and story slots.
+
+    Parameters
+    ----------
+    post_allocator : SlotAllocator
+        The allocator of post slots.
+    story_allocator : SlotAllocator
+        The allocator of story slots.
+    amount : int
+        The number of slots to allocate for both posts and stories.
+
+    Returns
+    -------
+    list of Slot
+        The post slots, followed by the story slots.
+    """
+    slots = []
+    for kind, allocator in (("post", post_allocator), ("story", story_allocator)):
+        for i in range(amount):
+            date = allocator.reserve()
+            allocator.commit(date)
+            slots.append(Slot(kind, i, date))
+
+    return slots
+
+
+def export_plan(slots, file, format="csv"):
+    """
+    Write slots to a file.
+
+    Parameters
+    ----------
+    slots : list of Slot
+        The slots to write.
+    file : file object
+        The text file to write to.
+    format : {"csv", "json"}, default="csv"
+        The format to write.
+    """
+    if format == "json":
+        json.dump(
+            [
+                {"kind": slot.kind, "index": slot.index, "date": slot.date.isoformat()}
+                for slot in slots
+            ],
+            file,
+            indent=2,
+        )
+        file.write("\n")
+    elif format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(Slot._fields)
+        for slot in slots:
+            writer.writerow([slot.kind, slot.index, slot.date.isoformat()])
+    else:
+        raise ValueError(f"Unsupported plan format: {format}")
@@ -0,0 +1,283 @@
+import ffmpeg
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from ig_mbs_scheduler import metrics
+
+PHOTO_MIN_ASPECT_RATIO = 4 / 5
+PHOTO_MAX_ASPECT_RATIO = 1.91
+PHOTO_MAX_WIDTH = 1440
+VIDEO_MAX_WIDTH = 1080
+VIDEO_MAX_DURATION = 60
+VIDEO_MAX_BITRATE = 5000
+# The x264 constant rate factor of videos re-encoded within the maximum bitrate
+VIDEO_CRF = 23
+
+
+class MediaPreprocessError(Exception):
+    """
+    Raised when one or more media files fail to preprocess.
+
+    Parameters
+    ----------
+    errors : list of tuple of (str, Exception)
+        The path and error of each media file that failed to preprocess.
+
+    Attributes
+    ----------
+    errors : list of tuple of (str, Exception)
+        The path and error of each media file that failed to preprocess.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(
+            f"Failed to preprocess {len(errors)} media file(s): "
+            + "; ".join(
+                f"{media_file_path}: {error}" for media_file_path, error in errors
+            )
+        )
+
+
+def __get_preprocessed_file_path(media_file_path):
+    # Write a new file rather than overwriting in place, since the media file may be
+    # hard linked from the media cache
+    root, extension = os.path.splitext(media_file_path)
+    return f"{root}.preprocessed{extension}"
+
+
+def __plan_photo_preprocessing(width, height, max_width, crop_to_feed):
+    # The preprocessings to apply, by name, with their parameters
+    plan = {}
+
+    aspect_ratio = width / height
+    if crop_to_feed and aspect_ratio > PHOTO_MAX_ASPECT_RATIO:
+        width = int(height * PHOTO_MAX_ASPECT_RATIO)
+        plan["crop"] = (width, height)
+    elif crop_to_feed and aspect_ratio < PHOTO_MIN_ASPECT_RATIO:
+        height = int(width / PHOTO_MIN_ASPECT_RATIO)
+        plan["crop"] = (width, height)
+
+    if width > max_width:
+        plan["resize"] = max_width
+
+    return plan
+
+
+def __plan_video_preprocessing(
+    width, duration, bitrate, max_width, max_duration, max_bitrate
+):
+    # The preprocessings to apply, by name, with their parameters
+    plan = {}
+
+    if duration > max_duration:
+        plan["trim"] = max_duration
+    if width > max_width:
+        plan["resize"] = max_width
+    if bitrate > max_bitrate * 1000:
+        plan["transcode"] = max_bitrate
+
+    return plan
+
+
+def __get_video_output_options(plan, max_bitrate, has_audio):
+    output_options = dict(
+        vcodec="libx264",
+        maxrate=f"{max_bitrate}k",
+        bufsize=f"{max_bitrate * 2}k",
+        movflags="+faststart",
+    )
+    # Only target the maximum bitrate when exceeding it, since targeting it would
+    # inflate videos of lower bitrates. Otherwise, keep the quality, capped at it.
+    if "transcode" in plan:
+        output_options["video_bitrate"] = f"{max_bitrate}k"
+    else:
+        output_options["crf"] = VIDEO_CRF
+    if has_audio:
+        output_options["acodec"] = "aac"
+
+    return output_options
+
+
+def __preprocess_photo(photo_file_path, max_width, crop_to_feed):
+    stream_info = ffmpeg.probe(photo_file_path)
+    photo_stream_info = next(
+        stream for stream in stream_info["streams"] if stream["codec_type"] == "video"
+    )
+
+    plan = __plan_photo_preprocessing(
+        photo_stream_info["width"], photo_stream_info["height"], max_width, crop_to_feed
+    )
+    if len(plan) == 0:
+        return None
+
+    photo = ffmpeg.input(photo_file_path)
+    if "crop" in plan:
+        photo = photo.filter("crop", *plan["crop"])
+    if "resize" in plan:
+        photo = photo.filter("scale", plan["resize"], -1)
+
+    preprocessed_file_path = __get_preprocessed_file_path(photo_file_path)
+    try:
+        ffmpeg.output(photo, preprocessed_file_path, **{"q:v": 2}).run()
+        os.replace(preprocessed_file_path, photo_file_path)
+    finally:
+        if os.path.exists(preprocessed_file_path):
+            os.remove(preprocessed_file_path)
+
+    return "+".join(plan)
+
+
+def __preprocess_video(video_file_path, max_width, max_duration, max_bitrate):
+    stream_info = ffmpeg.probe(video_file_path)
+    video_stream_info = next(
+        stream for stream in stream_info["streams"] if stream["codec_type"] == "video"
+    )
+    has_audio = any(
+        stream["codec_type"] == "audio" for stream in stream_info["streams"]
+    )
+
+    duration = float(
+        video_stream_info.get("duration", stream_info["format"]["duration"])
+    )
+    bitrate = int(
+        video_stream_info.get("bit_rate", stream_info["format"].get("bit_rate", 0))
+    )
+
+    plan = __plan_video_preprocessing(
+        video_stream_info["width"],
+        duration,
+        bitrate,
+        max_width,
+        max_duration,
+        max_bitrate,
+    )
+    if len(plan) == 0:
+        return None
+
+    input_options = {"t": plan["trim"]} if "trim" in plan else {}
+    stream = ffmpeg.input(video_file_path, **input_options)
+
+    video = stream.video
+    if "resize" in plan:
+        video = video.filter("scale", plan["resize"], -2)
+
+    output_streams = [video, stream.audio] if has_audio else [video]
+    output_options = __get_video_output_options(plan, max_bitrate, has_audio)
+
+    preprocessed_file_path = __get_preprocessed_file_path(video_file_path)
+    try:
+        ffmpeg.output(*output_streams, preprocessed_file_path, **output_options).run()
+        os.replace(preprocessed_file_path, video_file_path)
+    finally:
+        if os.path.exists(preprocessed_file_path):
+            os.remove(preprocessed_file_path)
+
+    return "+".join(plan)
+
+
+@metrics.timed("preprocess.preprocess_media")
+def preprocess_media(
+    media_dir_path,
+    concurrency=1,
+    max_photo_width=PHOTO_MAX_WIDTH,
+    max_video_width=VIDEO_MAX_WIDTH,
+    max_video_duration=VIDEO_MAX_DURATION,
+    max_video_bitrate=VIDEO_MAX_BITRATE,
+    is_story=False,
+):
+    """
+    Make downloaded media compliant with the limits of MBS before uploading it.
+
+    Photos are cropped to the aspect ratios allowed in the feed (except for stories) and
+    scaled down to a maximum width.
+    Videos are trimmed to a maximum duration, scaled down to a maximum width, and
+    re-encoded at a maximum bitrate if exceeding it. Media already within the limits is
+    left untouched.
+    Preprocessed media replaces the original file.
+
+    Parameters
+    ----------
+    media_dir_path : str
+        The directory path of the media, as downloaded by `utils.download_media`.
+    concurrency : int, default=1
+        The maximum number of media files to preprocess concurrently, in a process
+        pool.
+    max_photo_width : int, default=1440
+        The maximum width (pixels) of photos.
+    max_video_width : int, default=1080
+        The maximum width (pixels) of videos.
+    max_video_duration : int, default=60
+        The maximum duration (seconds) of videos.
+    max_video_bitrate : int, default=5000
+        The maximum bitrate (kbit/s) of videos.
+    is_story : bool, default=False
+        Whether the media is for a story, whose photos are not cropped to the aspect
+        ratios of the feed.
+
+    Returns
+    -------
+    dict
+        The preprocessing applied to each media file ("crop", "resize", "trim" or
+        "transcode", joined with "+"), or `None` if left untouched, by file name.
+
+    Raises
+    ------
+    MediaPreprocessError
+        If one or more media files fail to preprocess. All media files are attempted
+        before raising.
+    """
+    preprocessing_tasks = []
+    for media_file_name in sorted(os.listdir(media_dir_path)):
+        media_file_path = os.path.join(media_dir_path, media_file_name)
+        media_extension = os.path.splitext(media_file_name)[1]
+
+        if media_extension == ".jpg":
+            preprocessing_tasks.append(
+                (
+                    media_file_name,
+                    __preprocess_photo,
+                    (media_file_path, max_photo_width, not is_story),
+                )
+            )
+        elif media_extension == ".mp4":
+            preprocessing_tasks.append(
+                (
+                    media_file_name,
+                    __preprocess_video,
+                    (
+                        media_file_path,
+                        max_video_width,
+                        max_video_duration,
+                        max_video_bitrate,
+                    ),
+                )
+            )
+
+    preprocessings = {}
+    errors = []
+
+    if concurrency == 1:
+        for media_file_name, preprocess, args in preprocessing_tasks:
+            try:
+                preprocessings[media_file_name] = preprocess(*args)
+            except Exception as e:
+                errors.append((media_file_name, e))
+    else:
+        with ProcessPoolExecutor(max_workers=concurrency) as process_pool:
+            futures = [
+                (media_file_name, process_pool.submit(preprocess, *args))
+                for media_file_name, preprocess, args in preprocessing_tasks
+            ]
+            for media_file_name, future in futures:
+                try:
+                    preprocessings[media_file_name] = future.result()
+                except Exception as e:
+                    errors.append((media_file_name, e))
+
+    if len(errors) > 0:
+        raise MediaPreprocessError(errors)
+
+    print(f"Successfully preprocessed media: {preprocessings}")
+
+    return preprocessings
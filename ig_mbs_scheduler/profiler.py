@@ -0,0 +1,82 @@
+import collections
+import os
+import sys
+import threading
+
+
+class SamplingProfiler:
+    """
+    A sampling profiler, which periodically records the call stacks of all threads.
+
+    Samples are written in the collapsed stack format, which can be rendered as a flame
+    graph (for example, with `flamegraph.pl` or speedscope).
+
+    Parameters
+    ----------
+    interval : float, default=0.01
+        The interval (seconds) between samples.
+
+    Attributes
+    ----------
+    interval : float
+        The interval (seconds) between samples.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.__stack_counts = collections.Counter()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __sample(self):
+        sampler_thread_id = threading.get_ident()
+
+        while not self.__stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_thread_id:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                self.__stack_counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """
+        Start sampling in a background thread.
+        """
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__sample, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop sampling.
+        """
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def write(self, file):
+        """
+        Write the samples in the collapsed stack format.
+
+        Parameters
+        ----------
+        file : file object
+            The text file to write to.
+        """
+        for stack, count in self.__stack_counts.most_common():
+            file.write(f"{stack} {count}\n")
@@ -0,0 +1,255 @@
+import click
+import contextlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ig_mbs_scheduler import metrics
+from ig_mbs_scheduler.ig_mbs_scheduler import cli as scheduler_cli
+
+CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+
+# Options set by the runner for every job
+RESERVED_OPTIONS = ["metrics_output", "metrics_format", "profile"]
+
+Job = namedtuple(
+    "Job", ["name", "ig_username", "mbs_session_id", "mbs_asset_id", "args"]
+)
+JobResult = namedtuple("JobResult", ["name", "summary", "error", "observations"])
+
+
+def __get_job_args(job_config):
+    params = {param.name: param for param in scheduler_cli.params}
+
+    args = []
+    options = []
+    for name, param in params.items():
+        if isinstance(param, click.Argument):
+            if name not in job_config:
+                raise click.UsageError(f"Missing '{name}' in job: {job_config}")
+            args.append(str(job_config[name]))
+
+    for name, value in job_config.items():
+        param = params.get(name)
+        if param is None or name in RESERVED_OPTIONS:
+            raise click.UsageError(f"Unsupported option '{name}' in job: {job_config}")
+        if isinstance(param, click.Argument):
+            continue
+
+        option = max(param.opts, key=len)
+        if param.is_flag:
+            if value:
+                options.append(option)
+            elif param.secondary_opts:
+                # Pass boolean options (e.g. `--dedupe/--no-dedupe`) explicitly, in
+                # case they default to True
+                options.append(param.secondary_opts[0])
+        elif param.multiple:
+            for item in value:
+                options += [option, str(item)]
+        else:
+            options += [option, str(value)]
+
+    return args + options
+
+
+def load_jobs(config):
+    """
+    Load scheduler jobs from a config.
+
+    The config is a JSON object with a list of `jobs`, each an object of the scheduler's
+    arguments and options by parameter name (e.g. `ig_username`, `post_cron_spec`,
+    `caption_template`), and optional `defaults` shared by all jobs. A job may also have
+    a `name`.
+
+    Parameters
+    ----------
+    config : file object
+        The JSON config file.
+
+    Returns
+    -------
+    list of Job
+        The jobs, with their validated command line arguments.
+    """
+    try:
+        config = json.load(config)
+    except ValueError as e:
+        raise click.UsageError(f"Invalid config: {e}")
+
+    defaults = config.get("defaults", {})
+
+    jobs = []
+    for job_config in config.get("jobs", []):
+        job_config = {**defaults, **job_config}
+        name = job_config.pop(
+            "name", f"{job_config.get('ig_username')}:{job_config.get('mbs_asset_id')}"
+        )
+        args = __get_job_args(job_config)
+
+        # Validate arguments before starting any job
+        try:
+            with scheduler_cli.make_context("ig-mbs-scheduler", list(args)):
+                pass
+        except click.ClickException as e:
+            raise click.UsageError(f"Invalid job '{name}': {e.format_message()}")
+
+        jobs.append(
+            Job(
+                name,
+                job_config["ig_username"],
+                job_config["mbs_session_id"],
+                str(job_config["mbs_asset_id"]),
+                args,
+            )
+        )
+
+    return jobs
+
+
+def group_jobs(jobs):
+    """
+    Group jobs sharing a browser profile or an MBS asset, so they never run at the same
+    time. Jobs of the same asset share its ledger and media hash index, so running them
+    concurrently would double-book slots.
+
+    Parameters
+    ----------
+    jobs : list of Job
+        The jobs to group.
+
+    Returns
+    -------
+    list of list of Job
+        The groups of jobs, in config order.
+    """
+    # Union jobs by their IG and MBS profiles, and their MBS asset
+    group_ids = list(range(len(jobs)))
+
+    def find(i):
+        while group_ids[i] != i:
+            group_ids[i] = group_ids[group_ids[i]]
+            i = group_ids[i]
+        return i
+
+    resource_job_ids = {}
+    for i, job in enumerate(jobs):
+        for resource in (
+            f"ig/{job.ig_username}",
+            f"mbs/{job.mbs_session_id}",
+            f"asset/{job.mbs_asset_id}",
+        ):
+            j = resource_job_ids.setdefault(resource, i)
+            group_ids[find(i)] = find(j)
+
+    groups = {}
+    for i, job in enumerate(jobs):
+        groups.setdefault(find(i), []).append(job)
+
+    return list(groups.values())
+
+
+def __run_job(job, log_dir):
+    metrics.REGISTRY.reset()
+
+    with contextlib.ExitStack() as stack:
+        if log_dir is not None:
+            log_file_name = "".join(
+                c if c.isalnum() or c in "-_." else "_" for c in job.name
+            )
+            log_file = stack.enter_context(
+                open(os.path.join(log_dir, f"{log_file_name}.log"), "a")
+            )
+            stack.enter_context(contextlib.redirect_stdout(log_file))
+
+        try:
+            summary = scheduler_cli.main(
+                job.args, prog_name="ig-mbs-scheduler", standalone_mode=False
+            )
+            error = None
+        except (Exception, click.exceptions.Abort) as e:
+            print(f"An error occured: {e!r}")
+            summary = None
+            error = repr(e)
+
+    return JobResult(job.name, summary, error, metrics.REGISTRY.get_observations())
+
+
+def __run_job_group(jobs, log_dir):
+    return [__run_job(job, log_dir) for job in jobs]
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.version_option(None, "-v", "--version")
+@click.argument("config", type=click.File("r"))
+@click.option(
+    "--concurrency",
+    "-c",
+    type=click.IntRange(1),
+    default=2,
+    show_default=True,
+    help="Maximum number of jobs to run at the same time, each in its own process with its own IG and MBS browser sessions. Jobs sharing a browser profile or an MBS asset always run one after another.",
+)
+@click.option(
+    "--log-dir",
+    type=click.Path(file_okay=False),
+    help="Directory to write the output of each job to, in a log file per job. If not specified, output is printed.",
+)
+@click.option(
+    "--metrics-output",
+    type=click.File("w"),
+    help="File to write the latency metrics aggregated over all jobs to.",
+)
+@click.option(
+    "--metrics-format",
+    type=click.Choice(["json", "prometheus"]),
+    default="json",
+    show_default=True,
+    help="Format of the latency metrics.",
+)
+def cli(config, concurrency, log_dir, metrics_output, metrics_format):
+    """
+    Run the scheduler for many Instagram account and MBS asset pairs, listed in a JSON
+    config, across a pool of processes.
+    """
+    jobs = load_jobs(config)
+    job_groups = group_jobs(jobs)
+    print(f"Running {len(jobs)} job(s) in {len(job_groups)} group(s)")
+
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+
+    results = []
+    with ProcessPoolExecutor(min(concurrency, len(job_groups) or 1)) as executor:
+        futures = [
+            executor.submit(__run_job_group, job_group, log_dir)
+            for job_group in job_groups
+        ]
+        for future in as_completed(futures):
+            for result in future.result():
+                status = "failed" if result.error else "succeeded"
+                print(f"Job '{result.name}' {status}: {result.summary or result.error}")
+                results.append(result)
+
+    # Aggregate metrics over all jobs
+    registry = metrics.MetricsRegistry()
+    for result in results:
+        registry.merge_observations(result.observations)
+    if metrics_output is not None:
+        metrics_output.write(registry.export(metrics_format))
+
+    schedule_count = sum(
+        (result.summary or {}).get("schedule_count", 0) for result in results
+    )
+    failed_count = sum(1 for result in results if result.error)
+    print(
+        f"Successfully scheduled {schedule_count} item(s) across {len(results) - failed_count}/{len(results)} job(s)"
+    )
+
+    if failed_count > 0:
+        click.get_current_context().exit(1)
+
+
+if __name__ == "__main__":
+    cli()
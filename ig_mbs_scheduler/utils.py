@@ -1,9 +1,43 @@
 import re
 import urllib
 import ffmpeg
-import requests
+import itertools
 import math
 import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from ig_mbs_scheduler import http_client, metrics
+from ig_mbs_scheduler.media_cache import MediaCache
+
+VIDEO_MIN_DURATION = 1
+VIDEO_MIN_ASPECT_RATIO = 4 / 5
+VIDEO_MAX_ASPECT_RATIO = 16 / 9
+
+
+class MediaDownloadError(Exception):
+    """
+    Raised when one or more media items fail to download.
+
+    Parameters
+    ----------
+    errors : list of tuple of (int, str, Exception)
+        The index, URL and error of each media item that failed to download.
+
+    Attributes
+    ----------
+    errors : list of tuple of (int, str, Exception)
+        The index, URL and error of each media item that failed to download.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(
+            f"Failed to download {len(errors)} media item(s): "
+            + "; ".join(
+                f"#{i} ({media_url}): {error}" for i, media_url, error in errors
+            )
+        )
 
 
 def create_final_caption(
@@ -52,54 +86,265 @@ def create_final_caption(
     return final_caption
 
 
-def __download_video(video_url, out_file_path):
-    print(f"Downloading video ({video_url})")
-    stream_info = ffmpeg.probe(video_url)
-    video_duration = float(stream_info["streams"][0]["duration"])
-    min_duration = 1
-    loop_count = math.ceil(min_duration / video_duration) - 1
+def reservoir_sample(items, k=1, random_generator=random, max_items=None):
+    """
+    Pick random items from an iterable of unknown length, with equal probability, in a
+    single pass and without holding every item in memory.
 
-    # Download and loop video
-    stream = ffmpeg.input(filename=video_url, stream_loop=loop_count)
+    Parameters
+    ----------
+    items : iterable
+        The items to pick from.
+    k : int, default=1
+        The number of items to pick.
+    random_generator : random.Random, default=random
+        The random number generator.
+    max_items : int, optional
+        The maximum number of items to consume, after which iteration stops. Picks are
+        then only fair among the first `max_items` items. If not specified, all items
+        are consumed.
+
+    Returns
+    -------
+    list
+        The picked items, or fewer than `k` if there are fewer items.
+    """
+    sample = []
+    for i, item in enumerate(itertools.islice(items, max_items)):
+        if i < k:
+            sample.append(item)
+        else:
+            j = random_generator.randint(0, i)
+            if j < k:
+                sample[j] = item
+
+    return sample
+
+
+def __transform_video(source_file_path, out_file_path, stream_info):
+    video_stream_info = next(
+        stream for stream in stream_info["streams"] if stream["codec_type"] == "video"
+    )
+    has_audio = any(
+        stream["codec_type"] == "audio" for stream in stream_info["streams"]
+    )
+
+    video_duration = float(
+        video_stream_info.get("duration", stream_info["format"]["duration"])
+    )
+    loop_count = math.ceil(VIDEO_MIN_DURATION / video_duration) - 1
+    aspect_ratio = video_stream_info["width"] / video_stream_info["height"]
+    needs_crop = not (VIDEO_MIN_ASPECT_RATIO <= aspect_ratio <= VIDEO_MAX_ASPECT_RATIO)
+
+    stream = ffmpeg.input(filename=source_file_path, stream_loop=loop_count)
+
+    if not needs_crop and loop_count == 0:
+        # Remux without re-encoding
+        ffmpeg.output(stream, out_file_path, c="copy", movflags="+faststart").run()
+        return "copy"
 
     # Crop video if it exceeds allowed aspect ratios
-    video = stream.video.filter("crop", "min(iw, ih * 16 / 9)", "min(ih, iw * 5 / 4)")
+    video = stream.video
+    if needs_crop:
+        video = video.filter("crop", "min(iw, ih * 16 / 9)", "min(ih, iw * 5 / 4)")
 
     # Check for audio and save video
-    if len(stream_info["streams"]) == 1:
-        ffmpeg.output(video, out_file_path).run()
+    if has_audio:
+        ffmpeg.output(video, stream.audio, out_file_path).run()
     else:
-        audio = stream.audio
-        ffmpeg.output(video, audio, out_file_path).run()
-    print(f"Successfully downloaded video ({os.path.abspath(out_file_path)})")
+        ffmpeg.output(video, out_file_path).run()
+
+    return "+".join(
+        transform
+        for transform, is_applied in (("crop", needs_crop), ("loop", loop_count > 0))
+        if is_applied
+    )
+
 
+@metrics.timed("utils.probe_video")
+def __probe_video(video_url, source_file_path, media_cache):
+    probe_key = MediaCache.get_key(video_url, kind="probe")
+    stream_info = media_cache.get_json(probe_key) if media_cache is not None else None
+
+    if stream_info is None:
+        stream_info = ffmpeg.probe(source_file_path)
+        if media_cache is not None:
+            media_cache.put_json(probe_key, stream_info)
+
+    return stream_info
+
+
+@metrics.timed("utils.download_video")
+def __download_video(video_url, out_file_path, media_cache=None):
+    key = MediaCache.get_key(
+        video_url,
+        kind="video",
+        min_duration=VIDEO_MIN_DURATION,
+        min_aspect_ratio=VIDEO_MIN_ASPECT_RATIO,
+        max_aspect_ratio=VIDEO_MAX_ASPECT_RATIO,
+    )
+    if media_cache is not None and media_cache.fetch(key, ".mp4", out_file_path):
+        return (media_cache.get_json(key) or {}).get("transform")
+
+    print(f"Downloading video ({video_url})")
+    source_file_path = f"{out_file_path}.source"
+    http_client.get_default_client().download(
+        video_url,
+        source_file_path,
+        media_cache.get_partial_path(video_url) if media_cache is not None else None,
+    )
+
+    try:
+        stream_info = __probe_video(video_url, source_file_path, media_cache)
+        with metrics.time_operation("utils.transform_video"):
+            transform = __transform_video(source_file_path, out_file_path, stream_info)
+    finally:
+        os.remove(source_file_path)
+
+    if media_cache is not None:
+        media_cache.store(key, ".mp4", out_file_path)
+        media_cache.put_json(key, {"transform": transform})
+
+    print(
+        f"Successfully downloaded video ({os.path.abspath(out_file_path)}, transform: {transform})"
+    )
+
+    return transform
+
+
+@metrics.timed("utils.download_photo")
+def __download_photo(photo_url, out_file_path, media_cache=None):
+    key = MediaCache.get_key(photo_url, kind="photo")
+    if media_cache is not None and media_cache.fetch(key, ".jpg", out_file_path):
+        return None
 
-def __download_photo(photo_url, out_file_path):
     print(f"Downloading photo ({photo_url})")
-    image_data = requests.get(photo_url).content
-    with open(out_file_path, "wb") as file:
-        file.write(image_data)
+    http_client.get_default_client().download(
+        photo_url,
+        out_file_path,
+        media_cache.get_partial_path(photo_url) if media_cache is not None else None,
+    )
+
+    if media_cache is not None:
+        media_cache.store(key, ".jpg", out_file_path)
     print(f"Successfully downloaded photo ({os.path.abspath(out_file_path)})")
 
+    return None
+
 
-def download_media(media_urls, out_dir_path):
+@metrics.timed("utils.download_media")
+def download_media(media_urls, out_dir_path, concurrency=1, media_cache=None):
     """
     Download media from a list URLs.
 
+    Media is saved as "<index>.jpg" or "<index>.mp4", preserving the order of the URLs
+    regardless of the order in which downloads complete. Videos are downloaded once,
+    probed locally, and only re-encoded if they need to be cropped or looped.
+
     Parameters
     ----------
     media_urls : list of str
         The media URLs from which to download media.
     out_dir_path : str
         The directory path to download media to.
+    concurrency : int, default=1
+        The maximum number of media items to download concurrently, in a thread pool.
+        Videos are transformed by `ffmpeg` subprocesses, so they run in parallel too.
+    media_cache : MediaCache, optional
+        The cache of downloaded and transformed media, shared across retries and runs.
+        If not specified, media is always downloaded.
+
+    Returns
+    -------
+    list of str or None
+        The transform applied to each media item ("copy", "crop", "loop" or
+        "crop+loop"), or `None` for photos.
+
+    Raises
+    ------
+    MediaDownloadError
+        If one or more media items fail to download. All media items are attempted
+        before raising.
     """
+    downloads = []
     for i, media_url in enumerate(media_urls):
         media_path = urllib.parse.urlparse(media_url).path
         media_extension = os.path.splitext(media_path)[1]
 
         if media_extension == ".mp4":
             out_file_path = os.path.join(out_dir_path, f"{i}.mp4")
-            __download_video(media_url, out_file_path)
+            downloads.append((i, media_url, __download_video, out_file_path))
         else:
             out_file_path = os.path.join(out_dir_path, f"{i}.jpg")
-            __download_photo(media_url, out_file_path)
+            downloads.append((i, media_url, __download_photo, out_file_path))
+
+    transforms = [None] * len(downloads)
+    errors = []
+
+    if concurrency == 1:
+        for i, media_url, download, out_file_path in downloads:
+            try:
+                transforms[i] = download(
+                    media_url, out_file_path, media_cache=media_cache
+                )
+            except Exception as e:
+                errors.append((i, media_url, e))
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as thread_pool:
+            futures = [
+                (
+                    i,
+                    media_url,
+                    thread_pool.submit(
+                        download, media_url, out_file_path, media_cache=media_cache
+                    ),
+                )
+                for i, media_url, download, out_file_path in downloads
+            ]
+            for i, media_url, future in futures:
+                try:
+                    transforms[i] = future.result()
+                except Exception as e:
+                    errors.append((i, media_url, e))
+
+    if len(errors) > 0:
+        raise MediaDownloadError(errors)
+
+    return transforms
+
+
+def estimate_bytes_saved(media_dir_path, media_selections):
+    """
+    Estimate the bytes saved by downloading smaller renditions of media.
+
+    The size of the largest rendition of each media item is extrapolated from the size
+    of the downloaded rendition, by their ratio of pixel areas.
+
+    Parameters
+    ----------
+    media_dir_path : str
+        The directory path of the media, as downloaded by `download_media`.
+    media_selections : list of tuple of (MediaCandidate, MediaCandidate)
+        The downloaded and the largest rendition of each media item, as selected by
+        `Post.select_media`.
+
+    Returns
+    -------
+    int
+        The estimated number of bytes saved.
+    """
+    bytes_saved = 0
+    for i, (selected, largest) in enumerate(media_selections):
+        selected_area = selected.width * selected.height
+        largest_area = largest.width * largest.height
+        if selected_area == 0 or largest_area <= selected_area:
+            continue
+
+        for media_extension in (".jpg", ".mp4"):
+            media_file_path = os.path.join(media_dir_path, f"{i}{media_extension}")
+            if os.path.exists(media_file_path):
+                media_size = os.path.getsize(media_file_path)
+                bytes_saved += round(media_size * (largest_area / selected_area - 1))
+                break
+
+    return bytes_saved
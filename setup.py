@@ -9,7 +9,7 @@ setup(
     author="",
     author_email="",
     license="",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "tests"]),
     include_package_data=True,
     install_requires=[
         "Click",
@@ -17,6 +17,7 @@ setup(
     entry_points={
         "console_scripts": [
             "ig-mbs-scheduler=ig_mbs_scheduler.ig_mbs_scheduler:cli",
+            "ig-mbs-scheduler-runner=ig_mbs_scheduler.runner:cli",
         ],
     },
 )
@@ -0,0 +1,87 @@
+import pytest
+
+from ig_mbs_scheduler.drivers.ig import collection_inventory
+from ig_mbs_scheduler.drivers.ig.collection_inventory import CollectionInventory
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(collection_inventory.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_empty_inventory():
+    inventory = CollectionInventory()
+
+    assert inventory.get_collection_names() is None
+    assert inventory.get_collection_item_urls("a") is None
+
+
+def test_set_collection_names_drops_removed_collections():
+    inventory = CollectionInventory()
+    inventory.set_collection_names(["a", "b"])
+    inventory.set_collection_item_urls("a", ["1"])
+    inventory.set_collection_item_urls("b", ["2"])
+
+    inventory.set_collection_names(["b", "c"])
+
+    assert inventory.get_collection_names() == ["b", "c"]
+    assert inventory.get_collection_item_urls("a") is None
+    assert inventory.get_collection_item_urls("b") == ["2"]
+
+
+def test_returns_copies():
+    inventory = CollectionInventory()
+    inventory.set_collection_names(["a"])
+    inventory.set_collection_item_urls("a", ["1"])
+
+    inventory.get_collection_names().append("b")
+    inventory.get_collection_item_urls("a").append("2")
+
+    assert inventory.get_collection_names() == ["a"]
+    assert inventory.get_collection_item_urls("a") == ["1"]
+
+
+def test_write_through_removals():
+    inventory = CollectionInventory()
+    inventory.set_collection_names(["a", "b"])
+    inventory.set_collection_item_urls("a", ["1", "2"])
+    inventory.set_collection_item_urls("b", ["2", "3"])
+
+    inventory.remove_item_url("2")
+    assert inventory.get_collection_item_urls("a") == ["1"]
+    assert inventory.get_collection_item_urls("b") == ["3"]
+
+    inventory.remove_collection("a")
+    assert inventory.get_collection_names() == ["b"]
+    assert inventory.get_collection_item_urls("a") is None
+
+
+def test_expires_after_ttl(clock):
+    inventory = CollectionInventory(ttl=60)
+    inventory.set_collection_names(["a"])
+    inventory.set_collection_item_urls("a", ["1"])
+
+    clock[0] += 60
+    assert inventory.get_collection_names() == ["a"]
+
+    clock[0] += 1
+    assert inventory.get_collection_names() is None
+    assert inventory.get_collection_item_urls("a") is None
+
+
+def test_item_urls_start_ttl(clock):
+    inventory = CollectionInventory(ttl=60)
+    inventory.set_collection_item_urls("a", ["1"])
+
+    clock[0] += 61
+    assert inventory.get_collection_item_urls("a") is None
+
+
+def test_never_expires_without_ttl(clock):
+    inventory = CollectionInventory()
+    inventory.set_collection_names(["a"])
+
+    clock[0] += 10**9
+    assert inventory.get_collection_names() == ["a"]
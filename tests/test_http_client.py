@@ -0,0 +1,165 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ig_mbs_scheduler.http_client import HTTPClient, IncompleteDownloadError
+
+CONTENT = bytes(range(256)) * 64
+
+
+class MediaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MediaRequestHandler)
+        # The number of bytes of the body sent by each response before dropping the
+        # connection, or `None` to send the whole body
+        self.body_limits = []
+        self.supports_range = True
+        # Extra bytes announced in the Content-Length, but never sent
+        self.missing_length = 0
+        self.range_headers = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/media.jpg"
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        range_header = self.headers.get("Range")
+        server.range_headers.append(range_header)
+
+        offset = 0
+        if range_header is not None and server.supports_range:
+            offset = int(re.fullmatch(r"bytes=(\d+)-", range_header).group(1))
+            if offset >= len(CONTENT):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(CONTENT)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        body = CONTENT[offset:]
+        if offset > 0:
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {offset}-{len(CONTENT) - 1}/{len(CONTENT)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) + server.missing_length))
+        self.end_headers()
+
+        body_limit = server.body_limits.pop(0) if server.body_limits else None
+        if body_limit is not None:
+            body = body[:body_limit]
+        self.wfile.write(body)
+        if body_limit is not None or server.missing_length > 0:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = MediaServer()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs=dict(poll_interval=0.01), daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def client():
+    return HTTPClient(timeout=5, chunk_size=1024)
+
+
+def test_download(server, client, tmp_path):
+    out_file_path = tmp_path / "media.jpg"
+
+    assert client.download(server.url, str(out_file_path)) == len(CONTENT)
+    assert out_file_path.read_bytes() == CONTENT
+    assert not (tmp_path / "media.jpg.part").exists()
+    assert server.range_headers == [None]
+
+    stats = client.get_stats()
+    assert stats["requests"] == 1
+    assert stats["resumes"] == 0
+    assert stats["bytes"] == len(CONTENT)
+
+
+def test_download_resumes_dropped_connection(server, client, tmp_path):
+    server.body_limits = [5000]
+    out_file_path = tmp_path / "media.jpg"
+
+    assert client.download(server.url, str(out_file_path)) == len(CONTENT)
+    assert out_file_path.read_bytes() == CONTENT
+    assert server.range_headers == [None, "bytes=5000-"]
+    assert client.get_stats()["resumes"] == 1
+
+
+def test_download_resumes_partial_file_of_earlier_call(server, client, tmp_path):
+    partial_file_path = tmp_path / "partial" / "media.jpg.part"
+    partial_file_path.parent.mkdir()
+    partial_file_path.write_bytes(CONTENT[:3000])
+    out_file_path = tmp_path / "media.jpg"
+
+    client.download(server.url, str(out_file_path), str(partial_file_path))
+
+    assert out_file_path.read_bytes() == CONTENT
+    assert not partial_file_path.exists()
+    assert server.range_headers == ["bytes=3000-"]
+
+
+def test_download_completes_complete_partial_file_on_416(server, client, tmp_path):
+    (tmp_path / "media.jpg.part").write_bytes(CONTENT)
+    out_file_path = tmp_path / "media.jpg"
+
+    assert client.download(server.url, str(out_file_path)) == len(CONTENT)
+    assert out_file_path.read_bytes() == CONTENT
+    assert server.range_headers == [f"bytes={len(CONTENT)}-"]
+
+
+def test_download_restarts_oversized_partial_file_on_416(server, client, tmp_path):
+    (tmp_path / "media.jpg.part").write_bytes(CONTENT + b"extra")
+    out_file_path = tmp_path / "media.jpg"
+
+    client.download(server.url, str(out_file_path))
+
+    assert out_file_path.read_bytes() == CONTENT
+    assert server.range_headers == [f"bytes={len(CONTENT) + 5}-", None]
+
+
+def test_download_restarts_when_range_is_ignored(server, client, tmp_path):
+    server.supports_range = False
+    (tmp_path / "media.jpg.part").write_bytes(b"stale")
+    out_file_path = tmp_path / "media.jpg"
+
+    client.download(server.url, str(out_file_path))
+
+    assert out_file_path.read_bytes() == CONTENT
+    assert server.range_headers == ["bytes=5-"]
+
+
+def test_download_raises_on_length_mismatch(server, client, tmp_path):
+    server.supports_range = False
+    server.missing_length = 100
+    out_file_path = tmp_path / "media.jpg"
+
+    with pytest.raises(IncompleteDownloadError):
+        client.download(server.url, str(out_file_path))
+
+    assert not out_file_path.exists()
+    assert len(server.range_headers) == client.max_resume_attempts + 1
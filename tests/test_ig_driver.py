@@ -0,0 +1,97 @@
+import pytest
+
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.fixtures import FixtureSite
+from ig_mbs_scheduler.drivers.base_driver import find_browser_binary
+from ig_mbs_scheduler.drivers.ig.ig_driver import IGWebDriver
+
+pytestmark = pytest.mark.skipif(
+    find_browser_binary() is None, reason="No Chromium based browser found"
+)
+
+
+@pytest.fixture(scope="module")
+def server():
+    site = FixtureSite(collection_count=2, items_per_collection=30, page_size=12)
+    with FixtureServer(site) as server:
+        yield server
+
+
+@pytest.fixture
+def create_ig_driver(server, tmp_path):
+    ig_drivers = []
+
+    def create(**kwargs):
+        ig_driver = IGWebDriver(
+            server.site.username,
+            timeout=5,
+            base_url=server.url,
+            headless=True,
+            scratch_profile=True,
+            profile_root=str(tmp_path),
+            **kwargs,
+        )
+        ig_drivers.append(ig_driver)
+        return ig_driver
+
+    yield create
+
+    for ig_driver in ig_drivers:
+        ig_driver.quit()
+
+
+def test_collections_are_scraped_once(server, create_ig_driver):
+    ig_driver = create_ig_driver()
+    collection_names = list(server.site.collections)
+
+    assert ig_driver.get_saved_collection_names() == collection_names
+    assert ig_driver.page_loads == 1
+    assert ig_driver.get_saved_collection_names() == collection_names
+    assert ig_driver.page_loads == 1
+
+    # The first collection is opened from the already loaded saved page, and scrolled
+    # through every page of items
+    collection_item_urls = ig_driver.get_collection_item_urls(collection_names[0])
+    assert collection_item_urls == [
+        f"{server.url}/p/{code}/"
+        for code in server.site.collections[collection_names[0]]
+    ]
+    assert ig_driver.page_loads == 1
+
+    # Inventoried collections load no page
+    assert (
+        ig_driver.get_collection_item_urls(collection_names[0]) == collection_item_urls
+    )
+    assert not ig_driver.is_collection_empty(collection_names[0])
+    assert ig_driver.page_loads == 1
+
+    ig_driver.get_collection_item_urls(collection_names[1])
+    assert ig_driver.page_loads == 2
+
+
+def test_posts_are_loaded_once(server, create_ig_driver):
+    ig_driver = create_ig_driver()
+    post_urls = [f"{server.url}/p/{code}/" for code in list(server.site.posts)[:2]]
+
+    post = ig_driver.get_post(post_urls[0])
+    assert post.url == post_urls[0]
+    assert ig_driver.page_loads == 1
+    assert ig_driver.get_post(post_urls[0]) == post
+    assert ig_driver.page_loads == 1
+
+    ig_driver.get_post(post_urls[1])
+    assert ig_driver.page_loads == 2
+
+
+def test_http_metadata_backend_skips_post_pages(server, create_ig_driver, tmp_path):
+    ig_driver = create_ig_driver(metadata_backend="http")
+    post_urls = [f"{server.url}/p/{code}/" for code in list(server.site.posts)[:3]]
+
+    # Falls back to the post page until cookies are exported
+    ig_driver.get_post(post_urls[0])
+    assert ig_driver.page_loads == 1
+    assert (tmp_path / "ig" / server.site.username / "cookies.json").exists()
+
+    ig_driver.get_post(post_urls[1])
+    ig_driver.get_post(post_urls[2])
+    assert ig_driver.page_loads == 1
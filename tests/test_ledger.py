@@ -0,0 +1,106 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from ig_mbs_scheduler.ledger import ScheduleLedger
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    return str(tmp_path / "ledger" / "asset.sqlite")
+
+
+@pytest.fixture
+def ledger(ledger_path):
+    with ScheduleLedger(ledger_path) as ledger:
+        yield ledger
+
+
+def get_source_urls(ledger_path, kind):
+    with sqlite3.connect(ledger_path) as connection:
+        return sorted(
+            (slot, source_url)
+            for slot, source_url in connection.execute(
+                "SELECT slot, source_url FROM schedules WHERE kind = ?", (kind,)
+            )
+        )
+
+
+def test_record(ledger):
+    ledger.record("post", datetime(2030, 1, 2, 9), "https://instagram.com/p/a/")
+    ledger.record("post", datetime(2030, 1, 1, 9))
+    ledger.record("story", datetime(2030, 1, 3, 9))
+
+    assert ledger.get_scheduled_dates("post") == [
+        datetime(2030, 1, 1, 9),
+        datetime(2030, 1, 2, 9),
+    ]
+    assert ledger.get_scheduled_dates("story") == [datetime(2030, 1, 3, 9)]
+    assert ledger.get_scheduled_dates("post", after=datetime(2030, 1, 1, 9)) == [
+        datetime(2030, 1, 2, 9)
+    ]
+
+
+def test_records_persist(tmp_path):
+    ledger_path = str(tmp_path / "asset.sqlite")
+    with ScheduleLedger(ledger_path) as ledger:
+        ledger.record("post", datetime(2030, 1, 1, 9, 5, 30))
+
+    with ScheduleLedger(ledger_path) as ledger:
+        assert ledger.get_scheduled_dates("post") == [datetime(2030, 1, 1, 9, 5, 30)]
+
+
+def test_is_reconciliation_due(ledger):
+    assert ledger.get_last_reconciled_at() is None
+    assert ledger.is_reconciliation_due(timedelta(hours=24))
+
+    ledger.reconcile("post", [])
+
+    assert ledger.get_last_reconciled_at() is not None
+    assert not ledger.is_reconciliation_due(timedelta(hours=24))
+    assert ledger.is_reconciliation_due(timedelta(0))
+
+
+def test_reconcile_removes_stale_upcoming_items(ledger):
+    past_date = (datetime.now() - timedelta(days=1)).replace(microsecond=0)
+    ledger.record("post", past_date, "https://instagram.com/p/past/")
+    ledger.record("post", datetime(2030, 1, 1, 9), "https://instagram.com/p/a/")
+    ledger.record("post", datetime(2030, 1, 2, 9), "https://instagram.com/p/b/")
+
+    ledger.reconcile("post", [datetime(2030, 1, 2, 9)])
+
+    # Past items are kept, since MBS no longer lists them
+    assert ledger.get_scheduled_dates("post") == [past_date, datetime(2030, 1, 2, 9)]
+
+
+def test_reconcile_records_missing_items(ledger, ledger_path):
+    ledger.record("post", datetime(2030, 1, 1, 9), "https://instagram.com/p/a/")
+
+    ledger.reconcile("post", [datetime(2030, 1, 1, 9), datetime(2030, 1, 3, 9)])
+
+    assert get_source_urls(ledger_path, "post") == [
+        ("2030-01-01 09:00:00", "https://instagram.com/p/a/"),
+        ("2030-01-03 09:00:00", None),
+    ]
+
+
+def test_reconcile_matches_items_one_to_one(ledger):
+    for _ in range(3):
+        ledger.record("post", datetime(2030, 1, 1, 9))
+
+    ledger.reconcile("post", [datetime(2030, 1, 1, 9)] * 2)
+    assert ledger.get_scheduled_dates("post") == [datetime(2030, 1, 1, 9)] * 2
+
+    ledger.reconcile("post", [datetime(2030, 1, 1, 9)] * 4)
+    assert ledger.get_scheduled_dates("post") == [datetime(2030, 1, 1, 9)] * 4
+
+
+def test_reconcile_only_affects_its_kind(ledger):
+    ledger.record("post", datetime(2030, 1, 1, 9))
+    ledger.record("story", datetime(2030, 1, 1, 9))
+
+    ledger.reconcile("story", [])
+
+    assert ledger.get_scheduled_dates("post") == [datetime(2030, 1, 1, 9)]
+    assert ledger.get_scheduled_dates("story") == []
@@ -0,0 +1,56 @@
+import pytest
+
+from ig_mbs_scheduler.lru_cache import LRUCache
+
+
+def test_get_returns_default_when_missing():
+    cache = LRUCache(2)
+
+    assert cache.get("a") is None
+    assert cache.get("a", 1) == 1
+    assert "a" not in cache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_put_refreshes_existing_entry():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 3)
+    cache.put("c", 4)
+
+    assert cache.get("a") == 3
+    assert "b" not in cache
+
+
+def test_invalidate():
+    cache = LRUCache(3)
+    for key in "abc":
+        cache.put(key, key)
+
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert "a" not in cache
+    assert len(cache) == 2
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_size_must_be_positive():
+    with pytest.raises(ValueError):
+        LRUCache(0)
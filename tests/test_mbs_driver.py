@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.fixtures import FixtureSite
+from ig_mbs_scheduler.drivers.base_driver import find_browser_binary
+from ig_mbs_scheduler.drivers.mbs.mbs_driver import MBSWebDriver
+
+pytestmark = pytest.mark.skipif(
+    find_browser_binary() is None, reason="No Chromium based browser found"
+)
+
+
+@pytest.fixture
+def server():
+    site = FixtureSite(
+        collection_count=1, items_per_collection=1, scheduled_count=30, page_size=12
+    )
+    with FixtureServer(site) as server:
+        yield server
+
+
+@pytest.fixture
+def mbs_driver(server, tmp_path):
+    mbs_driver = MBSWebDriver(
+        server.site.username,
+        server.site.asset_id,
+        timeout=5,
+        base_url=server.url,
+        headless=True,
+        scratch_profile=True,
+        profile_root=str(tmp_path / "profiles"),
+    )
+
+    yield mbs_driver
+
+    mbs_driver.quit()
+
+
+@pytest.fixture
+def media_dir_path(tmp_path):
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    for media_file_name in ("0.jpg", "1.mp4", "2.jpg"):
+        (media_dir / media_file_name).write_bytes(b"")
+
+    return str(media_dir)
+
+
+def test_post_is_scheduled_through_composer(server, mbs_driver, media_dir_path):
+    schedule_date = datetime(2031, 1, 1, 21, 30)
+
+    mbs_driver.schedule_post(schedule_date, media_dir_path, "A caption")
+
+    # Only the photos are sent, to the input accepting them
+    assert [
+        tuple(scheduled_item) for scheduled_item in server.site.scheduled_items
+    ] == [("post", schedule_date, "A caption", (False, True), ("0.jpg", "2.jpg"))]
+
+    # The scheduled post is read back after scrolling through every page of dates
+    scheduled_post_dates = mbs_driver.get_scheduled_post_dates()
+    assert len(scheduled_post_dates) == 31
+    assert scheduled_post_dates[-1] == schedule_date
+
+
+def test_story_is_scheduled_through_composer(server, mbs_driver, media_dir_path):
+    schedule_date = datetime(2031, 1, 2, 9)
+
+    mbs_driver.schedule_story(schedule_date, media_dir_path)
+
+    assert [
+        tuple(scheduled_item) for scheduled_item in server.site.scheduled_items
+    ] == [("story", schedule_date, None, (False, True), ("0.jpg", "1.mp4", "2.jpg"))]
+
+    scheduled_story_dates = mbs_driver.get_scheduled_story_dates()
+    assert len(scheduled_story_dates) == 31
+    assert scheduled_story_dates[-1] == schedule_date
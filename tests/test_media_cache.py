@@ -0,0 +1,131 @@
+import os
+import time
+
+from ig_mbs_scheduler import media_cache as media_cache_module
+from ig_mbs_scheduler.media_cache import MediaCache
+
+
+def test_partial_downloads_are_not_entries(tmp_path):
+    media_cache = MediaCache(str(tmp_path), 100)
+    partial_path = media_cache.get_partial_path("https://cdn.example/a.jpg?sig=1")
+
+    assert os.path.dirname(partial_path) == media_cache.partial_dir_path
+    assert partial_path.endswith(".jpg.part")
+    # Signed query strings do not change the partial download
+    assert partial_path == media_cache.get_partial_path("https://cdn.example/a.jpg")
+
+    with open(partial_path, "wb") as partial_file:
+        partial_file.write(b"x" * 1000)
+    media_cache.put_json("0" * 64, "value")
+
+    # The partial download neither counts towards the cap, nor is evicted
+    assert os.path.exists(partial_path)
+    assert media_cache.get_json("0" * 64) == "value"
+
+
+def test_stale_partial_downloads_are_removed(tmp_path):
+    partial_dir_path = tmp_path / media_cache_module.PARTIAL_DIR_NAME
+    partial_dir_path.mkdir()
+    stale_path = partial_dir_path / "stale.jpg.part"
+    stale_path.write_bytes(b"x")
+    stale_time = time.time() - media_cache_module.PARTIAL_MAX_AGE - 1
+    os.utime(stale_path, (stale_time, stale_time))
+    recent_path = partial_dir_path / "recent.jpg.part"
+    recent_path.write_bytes(b"x")
+
+    MediaCache(str(tmp_path), 100)
+
+    assert not stale_path.exists()
+    assert recent_path.exists()
+
+
+def test_key_ignores_query_string_and_includes_params():
+    assert MediaCache.get_key("https://a/b.jpg?sig=1") == MediaCache.get_key(
+        "https://a/b.jpg?sig=2"
+    )
+    assert MediaCache.get_key("https://a/b.jpg", kind="photo") != MediaCache.get_key(
+        "https://a/b.jpg", kind="video"
+    )
+
+
+def test_store_and_fetch(tmp_path):
+    media_cache = MediaCache(str(tmp_path / "cache"), 1000)
+    source_path = tmp_path / "source.jpg"
+    source_path.write_bytes(b"photo")
+    out_path = tmp_path / "out.jpg"
+    key = MediaCache.get_key("https://a/b.jpg")
+
+    assert not media_cache.fetch(key, ".jpg", str(out_path))
+    media_cache.store(key, ".jpg", str(source_path))
+    assert media_cache.fetch(key, ".jpg", str(out_path))
+    assert out_path.read_bytes() == b"photo"
+
+
+def __put_entries(media_cache, keys, size=100):
+    for i, key in enumerate(keys):
+        media_cache.put_json(key, "x" * (size - 2))
+        # Order the entries from least to most recently used
+        os.utime(__get_entry_path(media_cache, key), (i, i))
+
+
+def __get_entry_path(media_cache, key):
+    return os.path.join(media_cache.cache_dir_path, key[:2], f"{key}.json")
+
+
+def __get_cached_keys(media_cache, keys):
+    return [key for key in keys if os.path.exists(__get_entry_path(media_cache, key))]
+
+
+def __create_keys(count, start=0):
+    return [f"{i:064x}" for i in range(start, start + count)]
+
+
+def test_evicts_least_recently_used_down_to_target(tmp_path):
+    media_cache = MediaCache(str(tmp_path), 1000)
+    keys = __create_keys(10)
+    __put_entries(media_cache, keys)
+    assert __get_cached_keys(media_cache, keys) == keys
+
+    # Crossing the cap evicts down to 90% of it
+    new_key = "f" * 64
+    media_cache.put_json(new_key, "x" * 98)
+
+    assert __get_cached_keys(media_cache, keys) == keys[2:]
+    assert media_cache.get_json(new_key) is not None
+
+
+def test_below_cap_does_not_walk_cache(tmp_path, monkeypatch):
+    media_cache = MediaCache(str(tmp_path), 1000)
+    walks = []
+    walk = os.walk
+    monkeypatch.setattr(
+        os, "walk", lambda *args, **kwargs: walks.append(args) or walk(*args, **kwargs)
+    )
+
+    __put_entries(media_cache, __create_keys(10))
+
+    assert walks == []
+
+
+def test_replacing_entry_frees_its_size(tmp_path):
+    media_cache = MediaCache(str(tmp_path), 1000)
+    keys = __create_keys(10)
+
+    for _ in range(20):
+        __put_entries(media_cache, keys[:1])
+    __put_entries(media_cache, keys)
+
+    assert __get_cached_keys(media_cache, keys) == keys
+
+
+def test_size_is_restored_from_disk(tmp_path):
+    keys = __create_keys(10)
+    __put_entries(MediaCache(str(tmp_path), 1000), keys[:5])
+
+    media_cache = MediaCache(str(tmp_path), 1000)
+    __put_entries(media_cache, keys[5:])
+    assert __get_cached_keys(media_cache, keys) == keys
+
+    # Only evicts when the entries restored from disk count towards the cap
+    media_cache.put_json("f" * 64, "x")
+    assert len(__get_cached_keys(media_cache, keys)) == 8
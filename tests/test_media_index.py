@@ -0,0 +1,99 @@
+import pytest
+
+from ig_mbs_scheduler.media_index import HASH_BITS, MediaHashIndex, compute_dhash
+
+MEDIA_HASH = 0x8F3C_5A69_D2E1_47B0
+
+
+def flip_bits(media_hash, bits):
+    for bit in bits:
+        media_hash ^= 1 << bit
+    return media_hash
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "media_hashes.db")
+
+
+@pytest.fixture
+def media_hash_index(index_path):
+    with MediaHashIndex(index_path, max_distance=4) as media_hash_index:
+        media_hash_index.add([MEDIA_HASH], "https://www.instagram.com/p/original/")
+        yield media_hash_index
+
+
+def test_dhash_sets_bits_of_brighter_pixels():
+    pixels = bytes([9 - x for x in range(9)] * 8)
+    assert compute_dhash(pixels) == (1 << HASH_BITS) - 1
+
+    pixels = bytes([x for x in range(9)] * 8)
+    assert compute_dhash(pixels) == 0
+
+
+def test_identical_media_is_found(media_hash_index):
+    assert (
+        media_hash_index.find([MEDIA_HASH]) == "https://www.instagram.com/p/original/"
+    )
+
+
+@pytest.mark.parametrize("distance", [1, 4])
+def test_media_within_max_distance_is_found(media_hash_index, distance):
+    # Flip one bit in each of the first bands (of 12 or 13 bits), so only the last band
+    # is shared
+    media_hash = flip_bits(MEDIA_HASH, [band * 13 for band in range(distance)])
+
+    assert (
+        media_hash_index.find([media_hash]) == "https://www.instagram.com/p/original/"
+    )
+
+
+def test_media_beyond_max_distance_is_not_found(media_hash_index):
+    # Within a single band, so the hashes share the other bands and are compared
+    assert media_hash_index.find([flip_bits(MEDIA_HASH, range(5))]) is None
+    # Across every band, so the hashes share none
+    assert media_hash_index.find([flip_bits(MEDIA_HASH, [0, 13, 26, 39, 52])]) is None
+
+
+def test_any_media_of_a_post_is_found(media_hash_index):
+    media_hashes = [~MEDIA_HASH & ((1 << HASH_BITS) - 1), flip_bits(MEDIA_HASH, [63])]
+
+    assert (
+        media_hash_index.find(media_hashes) == "https://www.instagram.com/p/original/"
+    )
+
+
+def test_pending_media_is_found(media_hash_index):
+    pending_hash = ~MEDIA_HASH & ((1 << HASH_BITS) - 1)
+    pending_media = [([pending_hash], "https://www.instagram.com/p/pending/")]
+
+    assert (
+        media_hash_index.find([flip_bits(pending_hash, range(4))], pending_media)
+        == "https://www.instagram.com/p/pending/"
+    )
+    assert (
+        media_hash_index.find([flip_bits(pending_hash, range(5))], pending_media)
+        is None
+    )
+
+
+def test_index_is_persisted(index_path, media_hash_index):
+    # Hashes with the highest bit set are stored as negative integers
+    media_hash_index.add([1 << 63], "https://www.instagram.com/p/other/")
+    media_hash_index.close()
+
+    with MediaHashIndex(index_path, max_distance=4) as reopened_index:
+        assert len(reopened_index) == 2
+        assert (
+            reopened_index.find([MEDIA_HASH]) == "https://www.instagram.com/p/original/"
+        )
+        assert (
+            reopened_index.find([flip_bits(1 << 63, [0])])
+            == "https://www.instagram.com/p/other/"
+        )
+
+
+@pytest.mark.parametrize("max_distance", [-1, HASH_BITS])
+def test_invalid_max_distance_raises(index_path, max_distance):
+    with pytest.raises(ValueError):
+        MediaHashIndex(index_path, max_distance)
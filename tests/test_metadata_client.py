@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ig_mbs_scheduler.drivers.ig.ig_driver import IGWebDriver
+from ig_mbs_scheduler.drivers.ig.metadata_client import (
+    IG_APP_ID,
+    PostMetadataClient,
+    PostMetadataError,
+)
+from ig_mbs_scheduler.http_client import HTTPClient
+
+POST_METADATA_PATH = os.path.join(
+    os.path.dirname(__file__), "data", "post_metadata.json"
+)
+COOKIES = [
+    {"name": "sessionid", "value": "session-1234"},
+    {"name": "csrftoken", "value": "csrf-5678"},
+]
+
+
+def read_post_metadata():
+    with open(POST_METADATA_PATH) as post_metadata_file:
+        return json.load(post_metadata_file)
+
+
+class MetadataServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MetadataRequestHandler)
+        self.status = 200
+        self.body = json.dumps(read_post_metadata()).encode()
+        self.requests = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class MetadataRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers))
+
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = MetadataServer()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs=dict(poll_interval=0.01), daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cookies_path(tmp_path):
+    cookies_path = tmp_path / "cookies.json"
+    cookies_path.write_text(json.dumps(COOKIES))
+    return str(cookies_path)
+
+
+@pytest.fixture
+def metadata_client(server, cookies_path):
+    client = HTTPClient(timeout=5)
+    yield PostMetadataClient(cookies_path, server.url, client=client)
+    client.session.close()
+
+
+def test_post_data_is_fetched(server, metadata_client):
+    post_data = metadata_client.get_post_data("https://www.instagram.com/p/C0dE1234567")
+
+    assert post_data == read_post_metadata()["items"][0]
+    assert len(server.requests) == 1
+    path, headers = server.requests[0]
+    assert path == "/p/C0dE1234567/?__a=1&__d=dis"
+    assert headers["Cookie"] == "sessionid=session-1234; csrftoken=csrf-5678"
+    assert headers["X-IG-App-ID"] == IG_APP_ID
+
+
+@pytest.mark.parametrize("status", [302, 404, 429, 500])
+def test_unexpected_status_raises(server, metadata_client, status):
+    server.status = status
+
+    with pytest.raises(PostMetadataError, match=str(status)):
+        metadata_client.get_post_data(f"{server.url}/p/C0dE1234567/")
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"<html>Login</html>", b"{}", b'{"items": []}', b'{"items": [1]}'],
+)
+def test_invalid_response_raises(server, metadata_client, body):
+    server.body = body
+
+    with pytest.raises(PostMetadataError, match="Unexpected response"):
+        metadata_client.get_post_data(f"{server.url}/p/C0dE1234567/")
+
+
+@pytest.mark.parametrize("field", ["media_type", "caption", "user"])
+def test_missing_field_raises(server, metadata_client, field):
+    post_metadata = read_post_metadata()
+    del post_metadata["items"][0][field]
+    server.body = json.dumps(post_metadata).encode()
+
+    with pytest.raises(PostMetadataError, match="Incomplete post metadata"):
+        metadata_client.get_post_data(f"{server.url}/p/C0dE1234567/")
+
+
+def test_missing_cookies_raise(server, tmp_path):
+    metadata_client = PostMetadataClient(str(tmp_path / "cookies.json"), server.url)
+
+    with pytest.raises(PostMetadataError, match="Could not load cookies"):
+        metadata_client.get_post_data(f"{server.url}/p/C0dE1234567/")
+    assert server.requests == []
+
+
+def test_driver_falls_back_to_browser(server, tmp_path, monkeypatch):
+    server.status = 401
+    # No browser is started, since the post page and cookies are stubbed
+    ig_driver = IGWebDriver(
+        "fixture_user",
+        metadata_backend="http",
+        base_url=server.url,
+        profile_root=str(tmp_path),
+    )
+    page_post_urls = []
+
+    def get_page_post_data(post_url):
+        page_post_urls.append(post_url)
+        return read_post_metadata()["items"][0]
+
+    exported_cookies = []
+    monkeypatch.setattr(
+        ig_driver, "_IGWebDriver__get_page_post_data", get_page_post_data
+    )
+    monkeypatch.setattr(ig_driver, "export_cookies", lambda: exported_cookies.append(1))
+
+    post_url = f"{server.url}/p/C0dE1234567/"
+    post = ig_driver.get_post(post_url)
+
+    assert page_post_urls == [post_url]
+    assert exported_cookies == [1]
+    assert post.user == "fixture_user"
+    assert post.caption == "A recorded post"
+    assert post.media_urls == ("https://scontent.cdninstagram.com/v/t51/1080.jpg",)
@@ -0,0 +1,147 @@
+import math
+import pickle
+import random
+
+import pytest
+
+from ig_mbs_scheduler.metrics import BUCKET_BOUNDS, LatencyHistogram, MetricsRegistry
+
+# The maximum relative error of estimated percentiles, the width of a bucket
+MAX_RELATIVE_ERROR = 2 ** (1 / 4) - 1
+
+
+def get_exact_percentile(durations, percentile):
+    durations = sorted(durations)
+    return durations[max(math.ceil(percentile / 100 * len(durations)), 1) - 1]
+
+
+def test_empty_histogram():
+    assert LatencyHistogram().get_percentile(50) == 0
+
+
+@pytest.mark.parametrize("percentile", [1, 50, 95, 99, 100])
+def test_percentiles_are_within_bucket_error(percentile):
+    generator = random.Random(0)
+    durations = [generator.lognormvariate(-2, 1.5) for _ in range(10000)]
+    histogram = LatencyHistogram()
+    for duration in durations:
+        histogram.observe(duration)
+
+    exact_percentile = get_exact_percentile(durations, percentile)
+
+    assert histogram.get_percentile(percentile) == pytest.approx(
+        exact_percentile, rel=MAX_RELATIVE_ERROR
+    )
+
+
+def test_percentiles_are_capped_by_max():
+    histogram = LatencyHistogram()
+    for duration in (0.2, 0.2, 0.2):
+        histogram.observe(duration)
+
+    assert histogram.get_percentile(100) <= 0.2
+    assert histogram.max == 0.2
+
+
+def test_durations_beyond_last_bucket():
+    histogram = LatencyHistogram()
+    histogram.observe(BUCKET_BOUNDS[-1] * 2)
+
+    assert histogram.get_percentile(50) == BUCKET_BOUNDS[-1] * 2
+
+
+def test_size_does_not_grow_with_observations():
+    histogram = LatencyHistogram()
+    for _ in range(100000):
+        histogram.observe(0.05)
+
+    assert len(pickle.dumps(histogram)) < 1000
+
+
+def test_counts_errors():
+    histogram = LatencyHistogram()
+    histogram.observe(0.1)
+    histogram.observe(0.3, error=True)
+
+    assert histogram.count == 2
+    assert histogram.errors == 1
+    assert histogram.sum == pytest.approx(0.4)
+
+
+def test_merge_matches_single_histogram():
+    generator = random.Random(1)
+    durations = [generator.expovariate(10) for _ in range(2000)]
+    histogram = LatencyHistogram()
+    first_half, second_half = LatencyHistogram(), LatencyHistogram()
+    for i, duration in enumerate(durations):
+        histogram.observe(duration, error=i % 10 == 0)
+        (first_half if i < 1000 else second_half).observe(duration, error=i % 10 == 0)
+
+    first_half.merge(second_half)
+
+    assert first_half.count == histogram.count
+    assert first_half.errors == histogram.errors
+    assert first_half.sum == pytest.approx(histogram.sum)
+    assert first_half.max == histogram.max
+    for percentile in (50, 95, 99):
+        assert first_half.get_percentile(percentile) == histogram.get_percentile(
+            percentile
+        )
+
+
+def test_registry_merges_observations_across_registries():
+    registry, other_registry = MetricsRegistry(), MetricsRegistry()
+    registry.observe("a", 0.1)
+    other_registry.observe("a", 0.3, error=True)
+    other_registry.observe("b", 0.2)
+
+    # Observations are sent across processes
+    registry.merge_observations(
+        pickle.loads(pickle.dumps(other_registry.get_observations()))
+    )
+
+    summary = registry.snapshot()
+    assert summary["a"]["count"] == 2
+    assert summary["a"]["errors"] == 1
+    assert summary["a"]["error_rate"] == 0.5
+    assert summary["a"]["max"] == 0.3
+    assert summary["b"]["count"] == 1
+
+
+def test_registry_observations_are_copies():
+    registry = MetricsRegistry()
+    registry.observe("a", 0.1)
+
+    registry.get_observations()["a"].observe(0.2)
+
+    assert registry.snapshot()["a"]["count"] == 1
+
+
+def test_timed_records_errors():
+    registry = MetricsRegistry()
+
+    @registry.timed("operation")
+    def fail():
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        fail()
+    with registry.time("operation"):
+        pass
+
+    summary = registry.snapshot()["operation"]
+    assert summary["count"] == 2
+    assert summary["errors"] == 1
+
+
+def test_export():
+    registry = MetricsRegistry()
+    registry.observe("ig.get_post", 0.1)
+
+    assert '"ig.get_post"' in registry.export("json")
+    assert (
+        'ig_mbs_scheduler_operation_seconds_count{operation="ig.get_post"} 1'
+        in registry.export("prometheus")
+    )
+    with pytest.raises(ValueError):
+        registry.export("xml")
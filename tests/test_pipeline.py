@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from ig_mbs_scheduler import pipeline
+from ig_mbs_scheduler.pipeline import Pipeline, retry
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(pipeline.time, "sleep", lambda delay: None)
+
+
+class Recorder:
+    def __init__(self, item_count, fail_items=(), interrupt_item=None):
+        self.item_count = item_count
+        self.fail_items = set(fail_items)
+        self.interrupt_item = interrupt_item
+        self.prepared = []
+        self.scheduled = []
+        self.finalized = []
+        self.discarded = []
+        self.in_flight = []
+        self.threads = set()
+        self.__lock = threading.Lock()
+
+    def prepare(self, in_flight_items):
+        self.threads.add(threading.current_thread())
+        self.in_flight.append(in_flight_items)
+        if len(self.prepared) == self.item_count:
+            return None
+        item = len(self.prepared)
+        self.prepared.append(item)
+        return item
+
+    def schedule(self, item):
+        if item == self.interrupt_item:
+            raise KeyboardInterrupt
+        if item in self.fail_items:
+            raise RuntimeError(f"Failed to schedule {item}")
+        self.scheduled.append(item)
+
+    def finalize(self, item):
+        self.threads.add(threading.current_thread())
+        with self.__lock:
+            self.finalized.append(item)
+
+    def discard(self, item):
+        with self.__lock:
+            self.discarded.append(item)
+
+    def create_pipeline(self, depth=1):
+        return Pipeline(
+            self.prepare, self.schedule, self.finalize, self.discard, depth=depth
+        )
+
+    def assert_handled_once(self):
+        assert sorted(self.finalized + self.discarded) == self.prepared
+
+
+def test_schedules_every_item():
+    recorder = Recorder(5)
+
+    assert recorder.create_pipeline(depth=2).run() == 5
+    assert recorder.scheduled == [0, 1, 2, 3, 4]
+    assert recorder.finalized == [0, 1, 2, 3, 4]
+    assert recorder.discarded == []
+    # Preparing and finalizing share the worker thread
+    assert len(recorder.threads) == 1
+    assert threading.current_thread() not in recorder.threads
+
+
+def test_prepare_sees_items_in_flight():
+    recorder = Recorder(3)
+
+    recorder.create_pipeline(depth=3).run()
+
+    for in_flight_items in recorder.in_flight:
+        assert len(in_flight_items) <= 3
+    assert any(len(in_flight_items) > 0 for in_flight_items in recorder.in_flight)
+
+
+def test_discards_items_prepared_beyond_amount():
+    recorder = Recorder(10)
+
+    assert recorder.create_pipeline(depth=3).run(amount=2) == 2
+    assert recorder.scheduled == [0, 1]
+    assert recorder.finalized == [0, 1]
+    recorder.assert_handled_once()
+
+
+def test_discards_items_failing_to_schedule():
+    recorder = Recorder(4, fail_items=[1])
+
+    assert recorder.create_pipeline().run() == 3
+    assert recorder.scheduled == [0, 2, 3]
+    assert recorder.finalized == [0, 2, 3]
+    assert recorder.discarded == [1]
+
+
+def test_cleans_up_on_interrupt():
+    recorder = Recorder(10, interrupt_item=2)
+
+    with pytest.raises(KeyboardInterrupt):
+        recorder.create_pipeline(depth=3).run()
+
+    assert recorder.scheduled == [0, 1]
+    assert recorder.finalized == [0, 1]
+    assert 2 in recorder.discarded
+    recorder.assert_handled_once()
+
+
+def test_retry():
+    attempts = []
+
+    def flaky(value):
+        attempts.append(value)
+        if len(attempts) < 3:
+            raise RuntimeError("Flaky")
+        return value * 2
+
+    assert retry(flaky, 21) == 42
+    assert attempts == [21, 21, 21]
+
+
+def test_retry_stops_on_event():
+    stop_event = threading.Event()
+    stop_event.set()
+
+    assert retry(lambda: 1 / 0, stop_event=stop_event) is None
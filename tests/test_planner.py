@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from croniter import croniter
+
+from ig_mbs_scheduler.planner import Slot, SlotAllocator, export_plan, plan
+
+NOW = datetime(2030, 1, 1, 0, 0)
+
+
+def create_allocator(cron_spec="0 * * * *", **kwargs):
+    kwargs.setdefault("now", NOW)
+    return SlotAllocator(croniter(cron_spec, NOW), **kwargs)
+
+
+def reserve(allocator, count):
+    dates = []
+    for _ in range(count):
+        date = allocator.reserve()
+        allocator.commit(date)
+        dates.append(date)
+    return dates
+
+
+def test_earliest_slots_are_allocated():
+    assert reserve(create_allocator(), 3) == [
+        datetime(2030, 1, 1, 1),
+        datetime(2030, 1, 1, 2),
+        datetime(2030, 1, 1, 3),
+    ]
+
+
+def test_gaps_between_scheduled_dates_are_filled():
+    allocator = create_allocator(
+        scheduled_dates=[datetime(2030, 1, 1, 2), datetime(2030, 1, 1, 4)]
+    )
+
+    assert reserve(allocator, 3) == [
+        datetime(2030, 1, 1, 1),
+        datetime(2030, 1, 1, 3),
+        datetime(2030, 1, 1, 5),
+    ]
+
+
+@pytest.mark.parametrize(
+    "scheduled_date, expected_date",
+    [
+        # Exactly `min_spacing` minutes away is occupied
+        (datetime(2030, 1, 1, 1, 15), datetime(2030, 1, 1, 2)),
+        (datetime(2030, 1, 1, 0, 45), datetime(2030, 1, 1, 2)),
+        # Just beyond is free
+        (datetime(2030, 1, 1, 1, 16), datetime(2030, 1, 1, 1)),
+        (datetime(2030, 1, 1, 0, 44), datetime(2030, 1, 1, 1)),
+    ],
+)
+def test_slots_are_min_spacing_away_from_scheduled_dates(scheduled_date, expected_date):
+    allocator = create_allocator(scheduled_dates=[scheduled_date], min_spacing=15)
+
+    assert reserve(allocator, 1) == [expected_date]
+
+
+def test_margin_includes_variability():
+    allocator = create_allocator(
+        variability=10,
+        scheduled_dates=[datetime(2030, 1, 1, 1, 25)],
+        seed=1,
+        min_spacing=15,
+    )
+
+    (date,) = reserve(allocator, 1)
+    assert datetime(2030, 1, 1, 1, 50) <= date <= datetime(2030, 1, 1, 2, 10)
+    assert abs(date - datetime(2030, 1, 1, 1, 25)).total_seconds() >= 15 * 60
+
+
+def test_reserved_slots_are_occupied_until_released():
+    allocator = create_allocator(variability=20, seed=1)
+
+    first_date = allocator.reserve()
+    second_date = allocator.reserve()
+    allocator.commit(second_date)
+    allocator.release(first_date)
+
+    # The released slot is handed out again, at the same date, before later slots
+    assert allocator.reserve() == first_date
+    assert allocator.reserve() > second_date
+
+
+def test_committed_slots_stay_occupied():
+    allocator = create_allocator()
+    date = allocator.reserve()
+    allocator.commit(date)
+
+    assert allocator.reserve() != date
+
+
+def test_offsets_depend_on_seed_and_kind():
+    def get_dates(**kwargs):
+        return reserve(create_allocator(variability=30, **kwargs), 10)
+
+    assert get_dates(seed=1) == get_dates(seed=1)
+    assert get_dates(seed=1) != get_dates(seed=2)
+    assert get_dates(seed=1, kind="post") != get_dates(seed=1, kind="story")
+    assert all(
+        abs(date - datetime(2030, 1, 1, i + 1)).total_seconds() <= 30 * 60
+        for i, date in enumerate(get_dates(seed=1))
+    )
+
+
+def test_plan_allocates_posts_then_stories():
+    slots = plan(create_allocator("0 9 * * *"), create_allocator("0 18 * * *"), 2)
+
+    assert slots == [
+        Slot("post", 0, datetime(2030, 1, 1, 9)),
+        Slot("post", 1, datetime(2030, 1, 2, 9)),
+        Slot("story", 0, datetime(2030, 1, 1, 18)),
+        Slot("story", 1, datetime(2030, 1, 2, 18)),
+    ]
+
+
+def test_plan_matches_scheduling():
+    post_allocator = create_allocator(variability=30, seed=1)
+    story_allocator = create_allocator(variability=30, seed=2)
+    slots = plan(post_allocator, story_allocator, 3)
+
+    scheduling_allocator = create_allocator(variability=30, seed=1)
+    for slot in slots[:3]:
+        date = scheduling_allocator.reserve()
+        scheduling_allocator.commit(date)
+        assert date == slot.date
+
+
+def test_export_plan_csv():
+    file = io.StringIO()
+    export_plan([Slot("post", 0, datetime(2030, 1, 1, 9, 5))], file)
+
+    assert list(csv.reader(io.StringIO(file.getvalue()))) == [
+        ["kind", "index", "date"],
+        ["post", "0", "2030-01-01T09:05:00"],
+    ]
+
+
+def test_export_plan_json():
+    file = io.StringIO()
+    export_plan([Slot("story", 1, datetime(2030, 1, 1, 9, 5))], file, "json")
+
+    assert json.loads(file.getvalue()) == [
+        {"kind": "story", "index": 1, "date": "2030-01-01T09:05:00"}
+    ]
+
+
+def test_export_plan_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        export_plan([], io.StringIO(), "xml")
@@ -0,0 +1,71 @@
+import pytest
+
+from ig_mbs_scheduler.drivers.ig.post import (
+    MEDIA_TYPE_CAROUSEL,
+    MediaCandidate,
+    Post,
+    select_candidate,
+)
+
+CANDIDATES = (
+    MediaCandidate("https://cdn/640.jpg", 640, 800),
+    MediaCandidate("https://cdn/1440.jpg", 1440, 1800),
+    MediaCandidate("https://cdn/1080.jpg", 1080, 1350),
+    MediaCandidate("https://cdn/320.jpg", 320, 400),
+)
+
+
+@pytest.mark.parametrize(
+    "target_width, expected_width",
+    [(1, 320), (320, 320), (321, 640), (1080, 1080), (1081, 1440), (1440, 1440)],
+)
+def test_smallest_sufficient_candidate_is_selected(target_width, expected_width):
+    assert select_candidate(CANDIDATES, target_width).width == expected_width
+
+
+@pytest.mark.parametrize("target_width", [None, 0, 2000])
+def test_largest_candidate_is_selected_without_sufficient_target(target_width):
+    assert select_candidate(CANDIDATES, target_width) == CANDIDATES[1]
+
+
+def test_candidates_without_dimensions_select_first():
+    candidates = (
+        MediaCandidate("https://cdn/original.mp4", 0, 0),
+        MediaCandidate("https://cdn/other.mp4", 0, 0),
+    )
+
+    assert select_candidate(candidates, 1080) == candidates[0]
+
+
+def test_candidates_are_compared_by_area():
+    candidates = (
+        MediaCandidate("https://cdn/tall.jpg", 1080, 1920),
+        MediaCandidate("https://cdn/square.jpg", 1080, 1080),
+    )
+
+    assert select_candidate(candidates, 1080) == candidates[1]
+    assert select_candidate(candidates) == candidates[0]
+
+
+def test_media_is_selected_per_carousel_item():
+    video_candidates = (
+        MediaCandidate("https://cdn/720.mp4", 720, 1280),
+        MediaCandidate("https://cdn/480.mp4", 480, 854),
+    )
+    post = Post(
+        url="https://www.instagram.com/p/C0dE1234567/",
+        media_type=MEDIA_TYPE_CAROUSEL,
+        media_urls=(CANDIDATES[0].url, video_candidates[0].url),
+        caption=None,
+        user="user",
+        media_candidates=(CANDIDATES, video_candidates),
+    )
+
+    assert post.select_media(1000) == [
+        (CANDIDATES[2], CANDIDATES[1]),
+        (video_candidates[0], video_candidates[0]),
+    ]
+    assert post.select_media() == [
+        (CANDIDATES[1], CANDIDATES[1]),
+        (video_candidates[0], video_candidates[0]),
+    ]
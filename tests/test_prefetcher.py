@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ig_mbs_scheduler.drivers.ig.metadata_client import PostMetadataError
+from ig_mbs_scheduler.drivers.ig.prefetcher import MetadataPrefetcher, RateLimiter
+
+
+class StubMetadataClient:
+    def __init__(self, failed_post_urls=()):
+        self.base_url = "https://www.instagram.com"
+        self.failed_post_urls = set(failed_post_urls)
+        self.request_times = []
+        self.__lock = threading.Lock()
+
+    def get_post_data(self, post_url):
+        with self.__lock:
+            self.request_times.append(time.monotonic())
+        if post_url in self.failed_post_urls:
+            raise PostMetadataError("Unexpected status code: 429")
+        return {"url": post_url}
+
+
+def acquire(rate_limiter, count):
+    async def acquire_all():
+        loop = asyncio.get_running_loop()
+        acquire_times = []
+        for _ in range(count):
+            await rate_limiter.acquire()
+            acquire_times.append(loop.time())
+        return acquire_times
+
+    return asyncio.run(acquire_all())
+
+
+def test_rate_is_limited():
+    acquire_times = acquire(RateLimiter(rate=20), 5)
+
+    # The first request is allowed immediately, and each next one after 1/rate
+    assert acquire_times[-1] - acquire_times[0] >= 4 / 20 * 0.9
+
+
+def test_burst_is_allowed_at_once():
+    acquire_times = acquire(RateLimiter(rate=20, burst=3), 4)
+
+    assert acquire_times[2] - acquire_times[0] < 1 / 20
+    assert acquire_times[3] - acquire_times[0] >= 1 / 20 * 0.9
+
+
+def test_prefetch_skips_failed_posts():
+    post_urls = [f"https://www.instagram.com/p/{i}/" for i in range(4)]
+    metadata_client = StubMetadataClient(failed_post_urls=post_urls[1:2])
+
+    post_data = MetadataPrefetcher(metadata_client, rate=1000).prefetch(post_urls)
+
+    assert post_data == {
+        post_url: {"url": post_url}
+        for post_url in post_urls
+        if post_url != post_urls[1]
+    }
+
+
+@pytest.mark.parametrize("concurrency", [1, 8])
+def test_burst_does_not_depend_on_concurrency(concurrency):
+    post_urls = [f"https://www.instagram.com/p/{i}/" for i in range(4)]
+    metadata_client = StubMetadataClient()
+
+    MetadataPrefetcher(metadata_client, concurrency, rate=20, burst=2).prefetch(
+        post_urls
+    )
+
+    # Two requests are sent at once, and the next ones at the rate
+    request_times = sorted(metadata_client.request_times)
+    assert request_times[3] - request_times[0] >= 2 / 20 * 0.9
@@ -0,0 +1,95 @@
+import pytest
+
+from ig_mbs_scheduler import preprocess
+
+
+def plan_photo(width, height, max_width=1440, crop_to_feed=True):
+    return preprocess.__plan_photo_preprocessing(width, height, max_width, crop_to_feed)
+
+
+def plan_video(width=1080, duration=30, bitrate=4_000_000, **kwargs):
+    return preprocess.__plan_video_preprocessing(
+        width,
+        duration,
+        bitrate,
+        kwargs.get("max_width", 1080),
+        kwargs.get("max_duration", 60),
+        kwargs.get("max_bitrate", 5000),
+    )
+
+
+@pytest.mark.parametrize(
+    "width, height", [(1080, 1350), (1080, 1080), (1080, 566), (1200, 1500)]
+)
+def test_photo_within_limits_is_untouched(width, height):
+    assert plan_photo(width, height) == {}
+
+
+def test_wide_photo_is_cropped_to_max_aspect_ratio():
+    assert plan_photo(1000, 400) == {"crop": (764, 400)}
+
+
+def test_tall_photo_is_cropped_to_min_aspect_ratio():
+    assert plan_photo(800, 2000) == {"crop": (800, 1000)}
+
+
+def test_story_photo_is_not_cropped():
+    assert plan_photo(800, 2000, crop_to_feed=False) == {}
+    assert plan_photo(2000, 4000, crop_to_feed=False) == {"resize": 1440}
+
+
+def test_wide_photo_is_scaled_down():
+    assert plan_photo(2880, 2880) == {"resize": 1440}
+
+
+def test_photo_is_only_scaled_down_when_wider_once_cropped():
+    assert plan_photo(3000, 1000) == {"crop": (1910, 1000), "resize": 1440}
+    assert plan_photo(3000, 700) == {"crop": (1337, 700)}
+
+
+def test_video_within_limits_is_untouched():
+    assert plan_video(width=1080, duration=60, bitrate=5_000_000) == {}
+
+
+def test_video_exceeding_limits_is_trimmed_scaled_down_and_transcoded():
+    assert plan_video(width=1920, duration=90.5, bitrate=8_000_000) == {
+        "trim": 60,
+        "resize": 1080,
+        "transcode": 5000,
+    }
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected_plan",
+    [
+        (dict(duration=61), {"trim": 60}),
+        (dict(width=1440), {"resize": 1080}),
+        (dict(bitrate=5_000_001), {"transcode": 5000}),
+        (dict(duration=20, max_duration=15), {"trim": 15}),
+        (dict(bitrate=3_000_000, max_bitrate=2500), {"transcode": 2500}),
+    ],
+)
+def test_video_limits(kwargs, expected_plan):
+    assert plan_video(**kwargs) == expected_plan
+
+
+def test_transcoded_video_targets_max_bitrate():
+    output_options = preprocess.__get_video_output_options(
+        {"transcode": 5000}, 5000, has_audio=True
+    )
+
+    assert output_options["video_bitrate"] == "5000k"
+    assert output_options["maxrate"] == "5000k"
+    assert output_options["acodec"] == "aac"
+    assert "crf" not in output_options
+
+
+def test_video_below_max_bitrate_keeps_its_quality():
+    output_options = preprocess.__get_video_output_options(
+        {"trim": 60}, 5000, has_audio=False
+    )
+
+    assert output_options["crf"] == preprocess.VIDEO_CRF
+    assert output_options["maxrate"] == "5000k"
+    assert "video_bitrate" not in output_options
+    assert "acodec" not in output_options
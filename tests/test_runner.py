@@ -0,0 +1,142 @@
+import io
+import json
+
+import click
+import pytest
+
+from ig_mbs_scheduler import runner
+from ig_mbs_scheduler.runner import Job, group_jobs, load_jobs
+
+JOB_CONFIG = {
+    "ig_username": "user",
+    "mbs_session_id": "session",
+    "mbs_asset_id": 1234,
+    "post_cron_spec": "0 12 * * *",
+    "story_cron_spec": "0 18 * * *",
+}
+
+
+def get_job_args(job_config):
+    return runner.__get_job_args(job_config)
+
+
+def create_job(name, ig_username, mbs_session_id, mbs_asset_id):
+    return Job(name, ig_username, mbs_session_id, mbs_asset_id, [])
+
+
+def test_arguments_are_positional_in_order():
+    job_config = dict(reversed(list(JOB_CONFIG.items())))
+
+    assert get_job_args(job_config) == [
+        "user",
+        "session",
+        "1234",
+        "0 12 * * *",
+        "0 18 * * *",
+    ]
+
+
+def test_options_are_converted():
+    args = get_job_args(
+        {
+            **JOB_CONFIG,
+            "caption_template": "{caption} {hashtags}",
+            "hashtags": ["a", "b"],
+            "headless": True,
+            "scratch_profile": False,
+            "dedupe": False,
+        }
+    )
+
+    assert args[5:] == [
+        "--caption-template",
+        "{caption} {hashtags}",
+        "--hashtags",
+        "a",
+        "--hashtags",
+        "b",
+        "--headless",
+        "--no-dedupe",
+    ]
+
+
+def test_missing_argument_raises():
+    job_config = dict(JOB_CONFIG)
+    del job_config["mbs_asset_id"]
+
+    with pytest.raises(click.UsageError, match="Missing 'mbs_asset_id'"):
+        get_job_args(job_config)
+
+
+@pytest.mark.parametrize("name", ["unknown_option", "metrics_output", "profile"])
+def test_unsupported_option_raises(name):
+    with pytest.raises(click.UsageError, match=f"Unsupported option '{name}'"):
+        get_job_args({**JOB_CONFIG, name: "value"})
+
+
+def test_jobs_are_loaded_with_defaults():
+    config = {
+        "defaults": {"mbs_session_id": "session", "headless": True},
+        "jobs": [
+            {**JOB_CONFIG, "name": "first"},
+            {**JOB_CONFIG, "mbs_session_id": "other", "mbs_asset_id": 5678},
+        ],
+    }
+
+    jobs = load_jobs(io.StringIO(json.dumps(config)))
+
+    assert [job.name for job in jobs] == ["first", "user:5678"]
+    assert jobs[0].mbs_asset_id == "1234"
+    assert jobs[1].mbs_session_id == "other"
+    assert all("--headless" in job.args for job in jobs)
+
+
+def test_invalid_job_raises():
+    config = {"jobs": [{**JOB_CONFIG, "name": "invalid", "timeout": "soon"}]}
+
+    with pytest.raises(click.UsageError, match="Invalid job 'invalid'"):
+        load_jobs(io.StringIO(json.dumps(config)))
+
+
+def test_independent_jobs_are_not_grouped():
+    jobs = [
+        create_job("a", "ig1", "mbs1", "1"),
+        create_job("b", "ig2", "mbs2", "2"),
+    ]
+
+    assert group_jobs(jobs) == [[jobs[0]], [jobs[1]]]
+
+
+@pytest.mark.parametrize(
+    "other_job",
+    [
+        create_job("b", "ig1", "mbs2", "2"),
+        create_job("b", "ig2", "mbs1", "2"),
+        create_job("b", "ig2", "mbs2", "1"),
+    ],
+)
+def test_jobs_sharing_a_resource_are_grouped(other_job):
+    jobs = [create_job("a", "ig1", "mbs1", "1"), other_job]
+
+    assert group_jobs(jobs) == [jobs]
+
+
+def test_jobs_are_grouped_transitively_in_config_order():
+    jobs = [
+        create_job("a", "ig1", "mbs1", "1"),
+        create_job("b", "ig2", "mbs2", "2"),
+        create_job("c", "ig3", "mbs2", "3"),
+        create_job("d", "ig3", "mbs1", "4"),
+    ]
+
+    assert group_jobs(jobs) == [jobs]
+
+
+def test_groups_keep_config_order():
+    jobs = [
+        create_job("a", "ig1", "mbs1", "1"),
+        create_job("b", "ig2", "mbs2", "2"),
+        create_job("c", "ig1", "mbs3", "3"),
+    ]
+
+    assert group_jobs(jobs) == [[jobs[0], jobs[2]], [jobs[1]]]
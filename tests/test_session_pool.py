@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from ig_mbs_scheduler.drivers.session_pool import SessionPool
+
+
+class Sessions:
+    def __init__(self):
+        self.started = []
+        self.stopped = []
+        # Health check results by session, `None` for an unresponsive session
+        self.health = {}
+        self.__lock = threading.Lock()
+
+    def start(self):
+        with self.__lock:
+            session = len(self.started)
+            self.started.append(session)
+        return session
+
+    def stop(self, session):
+        with self.__lock:
+            self.stopped.append(session)
+
+    def check(self, session):
+        is_healthy = self.health.get(session, True)
+        if is_healthy is None:
+            raise RuntimeError("Session is unresponsive")
+        return is_healthy
+
+
+@pytest.fixture
+def sessions():
+    return Sessions()
+
+
+@pytest.fixture
+def create_session_pool(sessions):
+    session_pools = []
+
+    def create(**kwargs):
+        session_pool = SessionPool(
+            sessions.start, sessions.stop, sessions.check, **kwargs
+        )
+        session_pools.append(session_pool)
+        return session_pool
+
+    yield create
+
+    for session_pool in session_pools:
+        session_pool.close()
+
+
+def test_session_is_recycled_after_max_operations(sessions, create_session_pool):
+    session_pool = create_session_pool(max_operations=3)
+
+    assert [session_pool.lease() for _ in range(4)] == [0, 0, 0, 1]
+    assert sessions.stopped == [0]
+    assert session_pool.recycle_count == 1
+
+
+def test_replacement_is_prewarmed_near_max_operations(sessions, create_session_pool):
+    session_pool = create_session_pool(
+        max_operations=10, prewarm=True, isolated=True, prewarm_operations=2
+    )
+
+    for _ in range(7):
+        session_pool.lease()
+    assert sessions.started == [0]
+
+    for _ in range(3):
+        assert session_pool.lease() == 0
+    assert session_pool.lease() == 1
+
+    # The next replacement is only pre-warmed near max operations again
+    assert sessions.started == [0, 1]
+
+
+def test_unresponsive_session_is_recycled_at_once(sessions, create_session_pool):
+    session_pool = create_session_pool(prewarm=True, isolated=True)
+    session_pool.lease()
+    sessions.health[0] = None
+
+    assert not session_pool.check()
+    assert session_pool.session == 1
+    assert sessions.started == [0, 1]
+
+
+def test_unhealthy_session_is_used_until_replacement_starts(sessions):
+    can_start = threading.Event()
+
+    def start():
+        if len(sessions.started) > 0:
+            can_start.wait(5)
+        return sessions.start()
+
+    session_pool = SessionPool(
+        start, sessions.stop, sessions.check, prewarm=True, isolated=True
+    )
+    try:
+        session_pool.lease()
+        sessions.health[0] = False
+
+        assert not session_pool.check()
+        assert session_pool.lease() == 0
+        assert session_pool.recycle_count == 0
+
+        can_start.set()
+        deadline = time.monotonic() + 5
+        while session_pool.lease() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert session_pool.session == 1
+        assert session_pool.recycle_count == 1
+    finally:
+        can_start.set()
+        session_pool.close()
+
+    assert sorted(sessions.stopped) == [0, 1]
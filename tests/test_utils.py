@@ -0,0 +1,37 @@
+import random
+from collections import Counter
+
+from ig_mbs_scheduler import utils
+
+
+def test_reservoir_sample_returns_fewer_items_than_k():
+    assert sorted(utils.reservoir_sample(iter([1, 2]), 3)) == [1, 2]
+    assert utils.reservoir_sample(iter([]), 1) == []
+
+
+def test_reservoir_sample_is_uniform():
+    generator = random.Random(0)
+    counts = Counter(
+        item
+        for _ in range(20000)
+        for item in utils.reservoir_sample(range(10), 2, generator)
+    )
+
+    assert set(counts) == set(range(10))
+    for count in counts.values():
+        assert abs(count - 4000) < 300
+
+
+def test_reservoir_sample_stops_after_max_items():
+    consumed = []
+
+    def items():
+        for i in range(1000):
+            consumed.append(i)
+            yield i
+
+    sample = utils.reservoir_sample(items(), 5, random.Random(0), max_items=10)
+
+    assert len(consumed) == 10
+    assert all(item < 10 for item in sample)
+    assert len(sample) == 5